@@ -0,0 +1,141 @@
+"""
+Caché en memoria de los usuarios autenticados (clientes y distribuidores).
+
+get_current_cliente / get_current_distribuidor buscaban al usuario por email
+en cada petición protegida. Con esta caché, durante AUTH_CACHE_TTL_S
+segundos se reutiliza una copia de sus columnas, clave (rol, sub del token),
+y se adjunta a la sesión con `merge(load=False)`, sin SELECT: el objeto
+queda persistente y los cambios que haga la ruta se guardan normalmente.
+
+Las entradas se invalidan cuando se confirma (COMMIT) una sesión que
+actualizó o borró el registro por el ORM (desde los servicios o desde las
+rutas) y al aplicar posiciones GPS por lotes. Cada worker tiene su propia caché: un cambio hecho en otro proceso
+se ve, como máximo, AUTH_CACHE_TTL_S segundos después.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.cliente_model import Cliente
+from app.models.distribuidor_model import Distribuidor
+
+TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "30"))
+CAPACIDAD = int(os.getenv("AUTH_CACHE_CAPACIDAD", "10000"))
+
+ROLES = {"cliente": Cliente, "distribuidor": Distribuidor}
+
+
+class CachePrincipales:
+    def __init__(self, ttl_s: float = TTL_S, capacidad: int = CAPACIDAD):
+        self.ttl_s = ttl_s
+        self.capacidad = capacidad
+        # (rol, email) -> (expira_en, {columna: valor})
+        self._entradas: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        # (rol, id) -> (rol, email), para invalidar cuando sólo se conoce el id
+        self._por_id: dict = {}
+        self._lock = threading.Lock()
+        self.estadisticas = {"hits": 0, "misses": 0, "invalidaciones": 0}
+
+    def obtener(self, db: Session, rol: str, email: str):
+        """Usuario adjuntado a `db` o None si no está en caché (o venció)."""
+        instancia = self._instancia(rol, email)
+        return db.merge(instancia, load=False) if instancia is not None else None
+
+    async def obtener_async(self, db: AsyncSession, rol: str, email: str):
+        """Como `obtener`, para una AsyncSession."""
+        instancia = self._instancia(rol, email)
+        return await db.merge(instancia, load=False) if instancia is not None else None
+
+    def _instancia(self, rol: str, email: str):
+        modelo = ROLES[rol]
+        with self._lock:
+            entrada = self._entradas.get((rol, email))
+            if entrada is None or entrada[0] < time.monotonic():
+                self.estadisticas["misses"] += 1
+                return None
+            self._entradas.move_to_end((rol, email))
+            self.estadisticas["hits"] += 1
+            valores = entrada[1]
+
+        instancia = modelo()
+        for columna, valor in valores.items():
+            set_committed_value(instancia, columna, valor)
+        make_transient_to_detached(instancia)
+        return instancia
+
+    def guardar(self, rol: str, usuario):
+        valores = {
+            atributo.key: getattr(usuario, atributo.key)
+            for atributo in inspect(ROLES[rol]).column_attrs
+        }
+        with self._lock:
+            self._entradas[(rol, usuario.email)] = (time.monotonic() + self.ttl_s, valores)
+            self._entradas.move_to_end((rol, usuario.email))
+            self._por_id[(rol, usuario.id)] = (rol, usuario.email)
+            while len(self._entradas) > self.capacidad:
+                (rol_viejo, _), valores_viejos = self._entradas.popitem(last=False)
+                self._por_id.pop((rol_viejo, valores_viejos[1]["id"]), None)
+
+    def invalidar(self, rol: str, usuario_id=None, email: str | None = None):
+        with self._lock:
+            clave = self._por_id.pop((rol, usuario_id), None) if usuario_id is not None else None
+            for c in {clave, (rol, email) if email else None} - {None}:
+                if self._entradas.pop(c, None) is not None:
+                    self.estadisticas["invalidaciones"] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_id.clear()
+
+
+cache_principales = CachePrincipales()
+
+
+# Clave de session.info con las identidades (rol, id, email) a invalidar al confirmar
+_PENDIENTES = "cache_principales_invalidar"
+
+
+def _anotar_por_evento(rol: str):
+    def anotar(mapper, connection, objetivo):
+        # after_update/after_delete corren durante el flush, antes del COMMIT:
+        # invalidar ahí dejaría que otra petición volviera a cachear la fila
+        # vieja antes de que se confirme el cambio. Se anotan en la sesión y
+        # se invalidan en after_commit. También el email anterior, por si el
+        # cambio fue justamente el email.
+        sesion = object_session(objetivo)
+        if sesion is None:
+            return
+        historial = inspect(objetivo).attrs.email.history
+        pendientes = sesion.info.setdefault(_PENDIENTES, set())
+        for email in {objetivo.email, *historial.deleted}:
+            pendientes.add((rol, objetivo.id, email))
+    return anotar
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_al_confirmar(sesion):
+    # after_commit también corre al liberar un savepoint; sólo cuenta el COMMIT real
+    if sesion.in_nested_transaction():
+        return
+    for rol, usuario_id, email in sesion.info.pop(_PENDIENTES, ()):
+        cache_principales.invalidar(rol, usuario_id, email)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_al_revertir(sesion, transaccion_previa):
+    # Sólo al revertir la transacción de más afuera: un savepoint revertido
+    # no deshace lo que la transacción principal todavía puede confirmar
+    if transaccion_previa.parent is None:
+        sesion.info.pop(_PENDIENTES, None)
+
+
+for _rol, _modelo in ROLES.items():
+    event.listen(_modelo, "after_update", _anotar_por_evento(_rol))
+    event.listen(_modelo, "after_delete", _anotar_por_evento(_rol))
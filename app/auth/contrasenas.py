@@ -0,0 +1,110 @@
+"""
+Hash y verificación de contraseñas con bcrypt fuera del event loop.
+
+bcrypt es deliberadamente lento (~250 ms con costo 12) y, llamado dentro de
+una ruta, ocupaba un hilo del threadpool o directamente el event loop. Aquí
+el trabajo va a un ProcessPoolExecutor propio de BCRYPT_PROCESOS procesos
+(uno por CPU por defecto) y las rutas async lo esperan con `await`. Como
+máximo hay BCRYPT_MAX_PENDIENTES operaciones en curso o en cola; las demás
+esperan su turno antes de entrar al pool, así una ráfaga de logins no
+acumula trabajo sin límite.
+
+BCRYPT_ROUNDS fija el costo de los hashes nuevos. Los hashes guardados con
+otro costo se siguen aceptando y se rehacen al iniciar sesión
+(ver `necesita_rehash`). Con BCRYPT_PROCESOS=0 se usa el threadpool.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from fastapi.concurrency import run_in_threadpool
+
+RONDAS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PROCESOS = int(os.getenv("BCRYPT_PROCESOS", str(os.cpu_count() or 1)))
+MAX_PENDIENTES = int(os.getenv("BCRYPT_MAX_PENDIENTES", str(max(PROCESOS, 1) * 8)))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_semaforos = weakref.WeakKeyDictionary()   # event loop -> asyncio.Semaphore
+
+
+# ─── Funciones síncronas (se ejecutan en los procesos del pool) ──
+def hashear_sync(password: str, rondas: int = RONDAS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rondas)).decode("utf-8")
+
+
+def verificar_sync(password: str, hash_guardado: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hash_guardado.encode("utf-8"))
+    except ValueError:
+        # Hash con formato inválido (p. ej. contraseña sin hashear en la BD)
+        return False
+
+
+def costo(hash_guardado: str) -> int | None:
+    """Costo de un hash bcrypt ("$2b$12$..." -> 12) o None si no tiene ese formato."""
+    partes = hash_guardado.split("$")
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+
+def necesita_rehash(hash_guardado: str, rondas: int = RONDAS) -> bool:
+    return costo(hash_guardado) != rondas
+
+
+# ─── Pool de procesos ────────────────────────────────────────
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los workers no heredan hilos ni conexiones abiertas del proceso web
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESOS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def iniciar():
+    """Crea el pool y levanta sus procesos para que el primer login no pague el arranque."""
+    if PROCESOS <= 0:
+        return
+    pool = _obtener_pool()
+    list(pool.map(costo, ["$2b$04$"] * PROCESOS))
+
+
+def cerrar():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _semaforo() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        semaforo = _semaforos[loop] = asyncio.Semaphore(MAX_PENDIENTES)
+    return semaforo
+
+
+async def _ejecutar(funcion, *args):
+    async with _semaforo():
+        if PROCESOS <= 0:
+            return await run_in_threadpool(funcion, *args)
+        return await asyncio.get_running_loop().run_in_executor(_obtener_pool(), funcion, *args)
+
+
+# ─── API async para las rutas ────────────────────────────────
+async def hashear(password: str, rondas: int = RONDAS) -> str:
+    return await _ejecutar(hashear_sync, password, rondas)
+
+
+async def verificar(password: str, hash_guardado: str) -> bool:
+    return await _ejecutar(verificar_sync, password, hash_guardado)
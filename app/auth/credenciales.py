@@ -0,0 +1,134 @@
+"""
+Búsqueda de credenciales para el login en una sola consulta.
+
+El login buscaba el email en `cliente` y, si no estaba, en `distribuidor`:
+dos idas a la BD para cada distribuidor y para cada intento fallido. Aquí
+un UNION ALL de ambas tablas (cada rama usa el índice único de email)
+devuelve rol, id y hash en una sola ida. Si el email existiera en ambas
+tablas gana `cliente`, como antes.
+
+Los emails que no existen se recuerdan LOGIN_CACHE_NEGATIVO_TTL_S segundos
+(hasta LOGIN_CACHE_NEGATIVO_CAPACIDAD): los intentos repetidos con emails
+inexistentes (relleno de credenciales) se rechazan sin tocar la BD ni
+bcrypt. La entrada se borra al confirmar (COMMIT) la creación de un usuario
+con ese email o el cambio de email de uno existente por el ORM; en otros
+workers, como máximo LOGIN_CACHE_NEGATIVO_TTL_S segundos después.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, literal_column, select, union_all
+from sqlalchemy.orm import Session, object_session
+
+from app.models.cliente_model import Cliente
+from app.models.distribuidor_model import Distribuidor
+
+TTL_NEGATIVO_S = float(os.getenv("LOGIN_CACHE_NEGATIVO_TTL_S", "60"))
+CAPACIDAD_NEGATIVA = int(os.getenv("LOGIN_CACHE_NEGATIVO_CAPACIDAD", "100000"))
+
+
+def consulta_credenciales(email: str):
+    """SELECT rol, id, email, password de quien tenga ese email (cliente primero)."""
+    ramas = [
+        select(
+            literal_column(f"'{rol}'").label("rol"),
+            literal_column(str(orden)).label("orden"),
+            modelo.id.label("id"),
+            modelo.email.label("email"),
+            modelo.password.label("password"),
+        ).where(modelo.email == email)
+        for orden, (rol, modelo) in enumerate((("cliente", Cliente), ("distribuidor", Distribuidor)))
+    ]
+    union = union_all(*ramas).subquery("credenciales")
+    return (
+        select(union.c.rol, union.c.id, union.c.email, union.c.password)
+        .order_by(union.c.orden)
+        .limit(1)
+    )
+
+
+class CacheNegativa:
+    """Emails que no corresponden a ningún usuario, con vencimiento."""
+
+    def __init__(self, ttl_s: float = TTL_NEGATIVO_S, capacidad: int = CAPACIDAD_NEGATIVA):
+        self.ttl_s = ttl_s
+        self.capacidad = capacidad
+        self._entradas: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {"hits": 0, "agregados": 0, "invalidaciones": 0}
+
+    def contiene(self, email: str) -> bool:
+        with self._lock:
+            expira_en = self._entradas.get(email)
+            if expira_en is None:
+                return False
+            if expira_en < time.monotonic():
+                del self._entradas[email]
+                return False
+            self.estadisticas["hits"] += 1
+            return True
+
+    def agregar(self, email: str):
+        with self._lock:
+            self._entradas[email] = time.monotonic() + self.ttl_s
+            self._entradas.move_to_end(email)
+            self.estadisticas["agregados"] += 1
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def quitar(self, email: str):
+        with self._lock:
+            if self._entradas.pop(email, None) is not None:
+                self.estadisticas["invalidaciones"] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_negativa = CacheNegativa()
+
+
+def buscar_credenciales(db: Session, email: str):
+    """Fila (rol, id, email, password) o None; None también si el email está en la caché negativa."""
+    if cache_negativa.contiene(email):
+        return None
+    fila = db.execute(consulta_credenciales(email)).first()
+    if fila is None:
+        cache_negativa.agregar(email)
+    return fila
+
+
+# Clave de session.info con los emails a quitar de la caché negativa al confirmar
+_PENDIENTES = "cache_negativa_quitar"
+
+
+def _anotar_por_evento(mapper, connection, objetivo):
+    # after_insert/after_update corren durante el flush: si se quitara ahí,
+    # un login concurrente que todavía no ve la fila volvería a agregar el
+    # email antes del COMMIT. Se anota en la sesión y se quita en after_commit.
+    sesion = object_session(objetivo)
+    if sesion is not None and objetivo.email:
+        sesion.info.setdefault(_PENDIENTES, set()).add(objetivo.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _quitar_al_confirmar(sesion):
+    # after_commit también corre al liberar un savepoint; sólo cuenta el COMMIT real
+    if sesion.in_nested_transaction():
+        return
+    for email in sesion.info.pop(_PENDIENTES, ()):
+        cache_negativa.quitar(email)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_al_revertir(sesion, transaccion_previa):
+    if transaccion_previa.parent is None:
+        sesion.info.pop(_PENDIENTES, None)
+
+
+for _modelo in (Cliente, Distribuidor):
+    event.listen(_modelo, "after_insert", _anotar_por_evento)
+    event.listen(_modelo, "after_update", _anotar_por_evento)
@@ -1,10 +1,13 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, get_async_db_lectura
 from app.models.cliente_model import Cliente
 from app.models.distribuidor_model import Distribuidor
 from app.auth.jwt_utils import verificar_token
+from app.auth.cache_principales import cache_principales
 
 security = HTTPBearer()
 
@@ -25,11 +28,42 @@ def get_current_cliente(credentials: HTTPAuthorizationCredentials = Depends(secu
     if payload.get("role") != "cliente":
         raise HTTPException(status_code=403, detail="Acceso denegado: se requiere rol de cliente")
     
-    user = db.query(Cliente).filter(Cliente.email == payload["sub"]).first()
+    user = cache_principales.obtener(db, "cliente", payload["sub"])
+    if user is None:
+        user = db.query(Cliente).filter(Cliente.email == payload["sub"]).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="Usuario no encontrado")
+        cache_principales.guardar("cliente", user)
+    return user
+
+async def _cliente_async(db: AsyncSession, email: str) -> Cliente | None:
+    user = await cache_principales.obtener_async(db, "cliente", email)
+    if user is None:
+        user = (await db.execute(select(Cliente).where(Cliente.email == email))).scalars().first()
+        if user:
+            cache_principales.guardar("cliente", user)
+    return user
+
+async def get_current_cliente_async(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db_lectura)):
+    """Como get_current_cliente, para rutas async (usa la misma AsyncSession que la ruta)."""
+    payload = verificar_token(credentials.credentials)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    if payload.get("role") != "cliente":
+        raise HTTPException(status_code=403, detail="Acceso denegado: se requiere rol de cliente")
+
+    user = await _cliente_async(db, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado")
     return user
 
+async def cliente_desde_token_async(token: str, db: AsyncSession) -> Cliente | None:
+    """Cliente dueño de un token JWT o None; para conexiones sin cabecera Authorization (WebSocket)."""
+    payload = verificar_token(token) if token else None
+    if not payload or payload.get("role") != "cliente":
+        return None
+    return await _cliente_async(db, payload["sub"])
+
 def get_current_distribuidor(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     token = credentials.credentials
     payload = verificar_token(token)
@@ -40,7 +74,10 @@ def get_current_distribuidor(credentials: HTTPAuthorizationCredentials = Depends
     if payload.get("role") != "distribuidor":
         raise HTTPException(status_code=403, detail="Acceso denegado: se requiere rol de distribuidor")
     
-    user = db.query(Distribuidor).filter(Distribuidor.email == payload["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Distribuidor no encontrado")
+    user = cache_principales.obtener(db, "distribuidor", payload["sub"])
+    if user is None:
+        user = db.query(Distribuidor).filter(Distribuidor.email == payload["sub"]).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="Distribuidor no encontrado")
+        cache_principales.guardar("distribuidor", user)
     return user
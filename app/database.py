@@ -1,19 +1,382 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy.sql.dml import UpdateBase
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # URL de la base de datos
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Réplicas de sólo lectura, separadas por comas (vacío = todo va a la primaria)
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+
+def _entero(nombre: str, por_defecto: int) -> int:
+    return int(os.getenv(nombre, str(por_defecto)))
+
+
+def _booleano(nombre: str, por_defecto: bool) -> bool:
+    return os.getenv(nombre, str(por_defecto)).lower() in ("1", "true", "si", "sí")
+
+
+# Pool de conexiones (por entorno, vía variables de entorno)
+POOL_CONFIG = {
+    "pool_size": _entero("DB_POOL_SIZE", 10),
+    "max_overflow": _entero("DB_MAX_OVERFLOW", 20),
+    "pool_timeout": _entero("DB_POOL_TIMEOUT_S", 10),        # espera máxima por una conexión
+    "pool_recycle": _entero("DB_POOL_RECYCLE_S", 1800),      # renovar conexiones viejas
+    "pool_pre_ping": _booleano("DB_POOL_PRE_PING", True),    # descartar sockets muertos tras un failover
+}
+# Límites por sesión de PostgreSQL (0 = sin límite)
+STATEMENT_TIMEOUT_MS = _entero("DB_STATEMENT_TIMEOUT_MS", 30000)
+LOCK_TIMEOUT_MS = _entero("DB_LOCK_TIMEOUT_MS", 5000)
+APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "sig-backend")
+
+# Límites del histograma de espera por conexión, en milisegundos
+LIMITES_ESPERA_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolInstrumentado(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión libre y
+    cuántos fallan por timeout. `metricas()` agrega el uso actual del pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self._reiniciar_contadores()
+
+    def _reiniciar_contadores(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total_s = 0.0
+        self.espera_maxima_s = 0.0
+        self.histograma = [0] * (len(LIMITES_ESPERA_MS) + 1)
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.checkouts += 1
+                self.espera_total_s += espera
+                self.espera_maxima_s = max(self.espera_maxima_s, espera)
+                espera_ms = espera * 1000
+                cubeta = next(
+                    (i for i, limite in enumerate(LIMITES_ESPERA_MS) if espera_ms <= limite),
+                    len(LIMITES_ESPERA_MS),
+                )
+                self.histograma[cubeta] += 1
+
+    def recreate(self):
+        # Lo usa dispose(); las métricas siguen acumulándose en el pool nuevo
+        nuevo = super().recreate()
+        with self._lock_metricas:
+            nuevo.checkouts, nuevo.timeouts = self.checkouts, self.timeouts
+            nuevo.espera_total_s, nuevo.espera_maxima_s = self.espera_total_s, self.espera_maxima_s
+            nuevo.histograma = list(self.histograma)
+        return nuevo
+
+    def metricas(self, reiniciar: bool = False) -> dict:
+        capacidad = self.size() + self._max_overflow
+        en_uso = self.checkedout()
+        with self._lock_metricas:
+            datos = {
+                "tamano": self.size(),
+                "max_overflow": self._max_overflow,
+                "en_uso": en_uso,
+                "libres": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "saturacion": round(en_uso / capacidad, 3) if capacidad > 0 else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": round(self.espera_total_s / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima_s * 1000, 3),
+                "histograma_espera_ms": {
+                    **{f"<={limite}": n for limite, n in zip(LIMITES_ESPERA_MS, self.histograma)},
+                    f">{LIMITES_ESPERA_MS[-1]}": self.histograma[-1],
+                },
+            }
+            if reiniciar:
+                self._reiniciar_contadores()
+        return datos
+
+
+class PoolAsyncInstrumentado(PoolInstrumentado, AsyncAdaptedQueuePool):
+    """El mismo pool instrumentado para el engine async."""
+
+
+# Drivers async equivalentes a los de DATABASE_URL
+DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def url_async(url: str) -> str:
+    esquema, resto = url.split("://", 1)
+    return f"{DRIVERS_ASYNC.get(esquema, esquema)}://{resto}"
+
+
+def crear_engine(url: str = DATABASE_URL, **pool):
+    """Engine con el pool instrumentado; `pool` sobrescribe valores de POOL_CONFIG."""
+    config = {**POOL_CONFIG, **pool}
+    connect_args = {}
+    if url.startswith("postgresql"):
+        opciones = []
+        if STATEMENT_TIMEOUT_MS:
+            opciones.append(f"-c statement_timeout={STATEMENT_TIMEOUT_MS}")
+        if LOCK_TIMEOUT_MS:
+            opciones.append(f"-c lock_timeout={LOCK_TIMEOUT_MS}")
+        connect_args = {"application_name": APPLICATION_NAME, "options": " ".join(opciones)}
+    return create_engine(url, poolclass=PoolInstrumentado, connect_args=connect_args, **config)
+
+
+def crear_engine_async(url: str = DATABASE_URL, **pool):
+    """Engine async (asyncpg) con la misma configuración de pool y límites que el síncrono."""
+    config = {**POOL_CONFIG, **pool}
+    url = url_async(url)
+    connect_args = {}
+    if url.startswith("postgresql"):
+        ajustes = {"application_name": APPLICATION_NAME}
+        if STATEMENT_TIMEOUT_MS:
+            ajustes["statement_timeout"] = str(STATEMENT_TIMEOUT_MS)
+        if LOCK_TIMEOUT_MS:
+            ajustes["lock_timeout"] = str(LOCK_TIMEOUT_MS)
+        connect_args = {"server_settings": ajustes}
+    return create_async_engine(url, poolclass=PoolAsyncInstrumentado, connect_args=connect_args, **config)
+
 
 # Motor SQLAlchemy
-engine = create_engine(DATABASE_URL)
+engine = crear_engine(DATABASE_URL)
 
 # Sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor y sesión async, para las rutas de lectura más frecuentes
+try:
+    async_engine = crear_engine_async(DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+except ImportError as e:
+    async_engine = AsyncSessionLocal = None
+    print(f"Sin driver async para la base de datos ({e}); las rutas async no estarán disponibles")
+
+
+async def get_async_db():
+    """
+    Dependencia con una AsyncSession. A diferencia de los get_db de cada
+    router, es una sola función compartida: FastAPI la resuelve una vez por
+    petición, así la autenticación y la ruta usan la misma sesión.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Falta el driver async de la base de datos (asyncpg)")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ─── Réplicas de lectura ─────────────────────────────────────
+REPLICA_CHEQUEO_S = float(os.getenv("REPLICA_CHEQUEO_S", "5"))
+# Retraso de replicación máximo aceptado (PostgreSQL); 0 = no se mide
+REPLICA_RETRASO_MAX_S = float(os.getenv("REPLICA_RETRASO_MAX_S", "0"))
+
+
+class Replica:
+    """Una réplica de lectura con su engine síncrono, el async y su estado de salud."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = crear_engine(url)
+        try:
+            self.async_engine = crear_engine_async(url)
+        except ImportError:
+            self.async_engine = None
+        self.sana = True
+        self.ultimo_error: str | None = None
+        for motor in (self.engine, self.async_engine and self.async_engine.sync_engine):
+            if motor is not None:
+                event.listen(motor, "handle_error", self._al_fallar)
+
+    def _al_fallar(self, contexto):
+        # Una conexión caída saca a la réplica de la rotación hasta el próximo chequeo
+        if contexto.is_disconnect:
+            self._marcar(False, str(contexto.original_exception))
+
+    def _marcar(self, sana: bool, error: str | None = None):
+        if sana != self.sana:
+            print(f"Réplica {self.engine.url.render_as_string(hide_password=True)} "
+                  f"{'recuperada' if sana else f'fuera de rotación: {error}'}")
+        self.sana, self.ultimo_error = sana, error
+
+    def verificar(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                if REPLICA_RETRASO_MAX_S and self.engine.dialect.name == "postgresql":
+                    retraso = conn.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+                    if retraso > REPLICA_RETRASO_MAX_S:
+                        self._marcar(False, f"retraso de replicación de {retraso:.1f} s")
+                        return False
+        except Exception as e:
+            self._marcar(False, str(e))
+            return False
+        self._marcar(True)
+        return True
+
+
+class EnrutadorReplicas:
+    """
+    Reparte las sesiones de lectura entre las réplicas sanas en round-robin.
+    Un hilo las verifica cada REPLICA_CHEQUEO_S segundos (SELECT 1 y, si se
+    configura, el retraso de replicación); sin réplicas sanas, las lecturas
+    van a la primaria.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turno = itertools.count()
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def elegir(self) -> Replica | None:
+        sanas = [r for r in self.replicas if r.sana]
+        if not sanas:
+            return None
+        return sanas[next(self._turno) % len(sanas)]
+
+    def verificar(self):
+        for replica in self.replicas:
+            replica.verificar()
+
+    def iniciar(self, intervalo_s: float = REPLICA_CHEQUEO_S):
+        if self._hilo is not None or not self.replicas:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, args=(intervalo_s,), daemon=True)
+        self._hilo.start()
+
+    async def cerrar(self):
+        """Detiene los chequeos y cierra las conexiones de las réplicas."""
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+            self._hilo = None
+        for replica in self.replicas:
+            replica.engine.dispose()
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+
+    def _ciclo(self, intervalo_s: float):
+        while not self._detener.is_set():
+            self.verificar()
+            self._detener.wait(intervalo_s)
+
+    def estado(self) -> list[dict]:
+        return [
+            {
+                "url": r.engine.url.render_as_string(hide_password=True),
+                "sana": r.sana,
+                "ultimo_error": r.ultimo_error,
+                "pool": r.engine.pool.metricas(),
+            }
+            for r in self.replicas
+        ]
+
+
+enrutador_replicas = EnrutadorReplicas(DATABASE_REPLICA_URLS)
+
+
+def _es_escritura(clause) -> bool:
+    if isinstance(clause, UpdateBase):              # INSERT / UPDATE / DELETE
+        return True
+    if isinstance(clause, Select):
+        return clause._for_update_arg is not None   # SELECT ... FOR UPDATE
+    return isinstance(clause, TextClause)           # SQL de texto: no se sabe, a la primaria
+
+
+class SesionEnrutada(Session):
+    """
+    Sesión que lee de una réplica y escribe en la primaria.
+
+    La réplica se elige una vez por sesión (toda la petición lee del mismo
+    servidor). Desde la primera escritura (flush, INSERT/UPDATE/DELETE o
+    SELECT ... FOR UPDATE) todo lo que queda de la sesión va a la primaria,
+    así la petición lee lo que acaba de escribir. Entre peticiones distintas
+    puede verse el retraso de replicación.
+
+    La primaria es el `bind` de la sesión o, si no se indica, el engine de
+    DATABASE_URL; `enrutador` permite usar otras réplicas (p. ej. en pruebas).
+    """
+    _asincrona = False
+
+    def __init__(self, *args, enrutador: EnrutadorReplicas | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enrutador = enrutador or enrutador_replicas
+        self._replica: Replica | None = None
+        self.escribio = False
+
+    def _motor(self, replica: Replica | None):
+        if replica is None:
+            if self.bind is not None:
+                return self.bind
+            return async_engine.sync_engine if self._asincrona else engine
+        return replica.async_engine.sync_engine if self._asincrona else replica.engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.escribio or _es_escritura(clause):
+            self.escribio = True
+            return self._motor(None)
+        if self._replica is None or not self._replica.sana:
+            self._replica = self.enrutador.elegir()
+        if self._replica is None or (self._asincrona and self._replica.async_engine is None):
+            return self._motor(None)
+        return self._motor(self._replica)
+
+
+@event.listens_for(SesionEnrutada, "before_flush")
+def _marcar_escritura(sesion, contexto, instancias):
+    # El flush escribe: sus sentencias y todo lo que siga van a la primaria
+    sesion.escribio = True
+
+
+class SesionEnrutadaAsync(SesionEnrutada):
+    """La misma política, como sync_session_class de una AsyncSession."""
+    _asincrona = True
+
+
+# Sesiones para rutas de sólo lectura (catálogo, perfiles, seguimiento)
+SessionLectura = sessionmaker(class_=SesionEnrutada, autocommit=False, autoflush=False)
+AsyncSessionLectura = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=SesionEnrutadaAsync, autoflush=False, expire_on_commit=False
+) if async_engine is not None else None
+
+
+async def get_async_db_lectura():
+    """Como get_async_db, con una sesión que lee de las réplicas (ver SesionEnrutada)."""
+    if AsyncSessionLectura is None:
+        raise RuntimeError("Falta el driver async de la base de datos (asyncpg)")
+    async with AsyncSessionLectura() as db:
+        yield db
+
+
 # Base para modelos
 Base = declarative_base()
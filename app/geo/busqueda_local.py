@@ -0,0 +1,131 @@
+"""
+Mejora de rutas por búsqueda local (2-opt y Or-opt).
+
+Se aplica después de la construcción (vecino más cercano) sobre la misma
+matriz de distancias: el índice 0 es el punto de inicio fijo y la ruta es
+abierta (no regresa al inicio). Cada operador evalúa todos los movimientos
+de una posición con operaciones vectorizadas y la mejora completa se corta
+al agotar el presupuesto de tiempo.
+
+Los operadores se registran en `OPERADORES` con la firma
+`operador(matriz, tour, limite) -> bool`, donde `tour` es un np.ndarray
+que se modifica en el lugar y el retorno indica si hubo mejora.
+"""
+import os
+import time
+
+import numpy as np
+
+from app.geo.rutas import longitud_ruta
+
+TIEMPO_MEJORA_S = float(os.getenv("RUTAS_TIEMPO_MEJORA_S", "0.5"))
+
+_EPS = 1e-9
+
+
+def dos_opt(matriz: np.ndarray, tour: np.ndarray, limite: float) -> bool:
+    """Invierte el tramo tour[i..j] cuando reduce la longitud de la ruta."""
+    n = len(tour) - 1
+    mejoro = False
+    for i in range(1, n):
+        if time.perf_counter() > limite:
+            break
+        a, b = tour[i - 1], tour[i]
+        js = np.arange(i + 1, n + 1)
+        c = tour[js]
+        tiene_siguiente = js < n
+        siguiente = tour[np.minimum(js + 1, n)]
+        delta = matriz[a, c] - matriz[a, b] + np.where(
+            tiene_siguiente, matriz[b, siguiente] - matriz[c, siguiente], 0.0
+        )
+        k = int(delta.argmin())
+        if delta[k] < -_EPS:
+            j = int(js[k])
+            tour[i:j + 1] = tour[i:j + 1][::-1].copy()
+            mejoro = True
+    return mejoro
+
+
+def or_opt(matriz: np.ndarray, tour: np.ndarray, limite: float, max_segmento: int = 3) -> bool:
+    """Reubica tramos de 1 a `max_segmento` paradas (opcionalmente invertidos)."""
+    n = len(tour) - 1
+    mejoro = False
+    for largo in range(1, max_segmento + 1):
+        i = 1
+        while i + largo - 1 <= n:
+            if time.perf_counter() > limite:
+                return mejoro
+            p, s0, se = tour[i - 1], tour[i], tour[i + largo - 1]
+            if i + largo <= n:
+                nx = tour[i + largo]
+                ganancia = matriz[p, s0] + matriz[se, nx] - matriz[p, nx]
+            else:
+                ganancia = matriz[p, s0]
+
+            resto = np.concatenate([tour[:i], tour[i + largo:]])
+            a = resto
+            tiene_b = np.arange(len(resto)) < len(resto) - 1
+            b = resto[np.minimum(np.arange(len(resto)) + 1, len(resto) - 1)]
+            base_ab = np.where(tiene_b, matriz[a, b], 0.0)
+            costo = matriz[a, s0] + np.where(tiene_b, matriz[se, b], 0.0) - base_ab
+            costo_inv = matriz[a, se] + np.where(tiene_b, matriz[s0, b], 0.0) - base_ab
+            costo[i - 1] = np.inf
+            costo_inv[i - 1] = np.inf
+
+            k, k_inv = int(costo.argmin()), int(costo_inv.argmin())
+            invertir = costo_inv[k_inv] < costo[k]
+            if invertir:
+                k = k_inv
+            mejor = costo_inv[k] if invertir else costo[k]
+            if mejor - ganancia < -_EPS:
+                segmento = tour[i:i + largo].copy()
+                if invertir:
+                    segmento = segmento[::-1]
+                tour[:] = np.concatenate([resto[:k + 1], segmento, resto[k + 1:]])
+                mejoro = True
+            else:
+                i += 1
+    return mejoro
+
+
+OPERADORES = {
+    "2opt": dos_opt,
+    "or-opt": or_opt,
+}
+
+
+def mejorar_ruta(
+    matriz: np.ndarray,
+    orden: list[int],
+    operadores: tuple[str, ...] = ("2opt", "or-opt"),
+    tiempo_limite_s: float = None,
+) -> list[int]:
+    """
+    Aplica los operadores de búsqueda local hasta que ninguno mejore la ruta
+    o se agote el tiempo.
+
+    Args:
+        matriz: Matriz de distancias con el inicio en el índice 0
+        orden: Índices (1..n) de la ruta construida
+        operadores: Nombres registrados en OPERADORES, en orden de aplicación
+        tiempo_limite_s: Presupuesto de tiempo; por defecto RUTAS_TIEMPO_MEJORA_S
+
+    Returns:
+        Nueva lista de índices (1..n), nunca más larga que la original
+    """
+    if len(orden) < 3:
+        return list(orden)
+
+    limite = time.perf_counter() + (TIEMPO_MEJORA_S if tiempo_limite_s is None else tiempo_limite_s)
+    tour = np.asarray([0] + list(orden), dtype=np.intp)
+    mejoro = True
+    while mejoro and time.perf_counter() < limite:
+        mejoro = False
+        for nombre in operadores:
+            mejoro = OPERADORES[nombre](matriz, tour, limite) or mejoro
+
+    mejorado = tour[1:].tolist()
+    # Con matrices asimétricas (red vial) una inversión puede no ser mejora real
+    if longitud_ruta(matriz, mejorado) > longitud_ruta(matriz, orden):
+        return list(orden)
+    return mejorado
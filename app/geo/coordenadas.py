@@ -0,0 +1,56 @@
+"""
+Coordenadas como columnas numéricas.
+
+Los modelos conservan las columnas de texto "lat,lon" por compatibilidad con
+la API, pero cada una tiene su par de columnas Float que se mantiene en
+sincronía desde el modelo (`@validates`). Las consultas y los cálculos usan
+siempre las columnas numéricas; `parsear_coordenadas` sólo se usa al
+escribir.
+"""
+import math
+
+from sqlalchemy import and_, func
+
+from app.geo.distancias import RADIO_TIERRA_KM
+
+KM_POR_GRADO_LAT = 111.32
+
+
+def parsear_coordenadas(texto) -> tuple[float, float] | None:
+    """'lat,lon' -> (lat, lon), o None si el texto está vacío o no es válido."""
+    if not texto:
+        return None
+    try:
+        lat, lon = (float(parte) for parte in str(texto).split(","))
+    except (ValueError, TypeError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+
+def distancia_km_sql(lat_col, lon_col, punto: tuple):
+    """Expresión SQL haversine (km) entre las columnas y un punto fijo."""
+    lat, lon = float(punto[0]), float(punto[1])
+    dlat = func.radians(lat_col - lat) / 2
+    dlon = func.radians(lon_col - lon) / 2
+    a = (
+        func.power(func.sin(dlat), 2)
+        + func.cos(func.radians(lat)) * func.cos(func.radians(lat_col)) * func.power(func.sin(dlon), 2)
+    )
+    return 2 * RADIO_TIERRA_KM * func.asin(func.sqrt(a))
+
+
+def dentro_de_radio_sql(lat_col, lon_col, punto: tuple, radio_km: float):
+    """
+    Condición SQL "a menos de radio_km del punto": una caja lat/lon que puede
+    usar el índice sobre (latitud, longitud) y luego la distancia exacta.
+    """
+    lat, lon = float(punto[0]), float(punto[1])
+    dlat = radio_km / KM_POR_GRADO_LAT
+    dlon = radio_km / (KM_POR_GRADO_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return and_(
+        lat_col.between(lat - dlat, lat + dlat),
+        lon_col.between(lon - dlon, lon + dlon),
+        distancia_km_sql(lat_col, lon_col, punto) <= radio_km,
+    )
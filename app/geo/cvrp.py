@@ -0,0 +1,272 @@
+"""
+Ruteo de vehículos con capacidad (CVRP) para la asignación automática.
+
+Cada vehículo parte de su punto de inicio (la tienda donde recoge) y
+recorre una ruta abierta. El resolvedor:
+
+    1. Agrupa los pedidos en el punto de inicio más cercano.
+    2. Construye rutas por ahorros de Clarke–Wright (versión de ruta abierta:
+       ahorro(i, j) = d(inicio, j) - d(i, j)), evaluando sólo los k vecinos
+       más cercanos de cada pedido para escalar a miles de puntos.
+    3. Asigna las rutas a los vehículos disponibles por capacidad; una ruta
+       que no cabe en ningún vehículo libre se corta en tramos que sí caben.
+    4. Inserta los pedidos sobrantes en la ruta con holgura donde resulten
+       más baratos.
+    5. Mejora cada ruta con 2-opt / Or-opt dentro del presupuesto de tiempo.
+
+Los pedidos que no caben en ningún vehículo se devuelven como no asignados.
+"""
+import time
+
+import numpy as np
+
+from app.geo.distancias import matriz_distancias, distancias_desde, distancias_pares
+from app.geo.rutas import matriz_ruta, longitud_ruta
+from app.geo.busqueda_local import mejorar_ruta
+
+VECINOS_AHORROS = 25
+_BLOQUE_VECINOS = 512
+
+
+def resolver_cvrp(
+    vehiculos: list[dict],
+    coords: list[tuple],
+    demandas: list[float],
+    tiempo_limite_s: float = 2.0,
+    vecinos: int = VECINOS_AHORROS,
+) -> dict:
+    """
+    Reparte los pedidos entre los vehículos respetando la capacidad y
+    minimizando los kilómetros totales.
+
+    Args:
+        vehiculos: Lista de dicts {"inicio": (lat, lon), "capacidad": int}
+        coords: Coordenadas (lat, lon) de cada pedido
+        demandas: Cajas de cada pedido (misma longitud que coords)
+        tiempo_limite_s: Presupuesto total de tiempo para la mejora local
+        vecinos: Cantidad de vecinos evaluados por pedido en los ahorros
+
+    Returns:
+        {
+            "rutas": [{"vehiculo": int, "paradas": [int], "carga": float, "distancia_km": float}],
+            "no_asignados": [int]
+        }
+        Los índices se refieren a `vehiculos` y `coords`.
+    """
+    if len(coords) != len(demandas):
+        raise ValueError("coords y demandas deben tener la misma longitud")
+    if not vehiculos or not coords:
+        return {"rutas": [], "no_asignados": list(range(len(coords)))}
+
+    puntos = np.asarray(coords, dtype=np.float64)
+    carga = np.asarray(demandas, dtype=np.float64)
+    capacidades = np.asarray([v["capacidad"] for v in vehiculos], dtype=np.float64)
+
+    # 1. Puntos de inicio únicos y pedido -> inicio más cercano
+    inicios, vehiculo_a_inicio = np.unique(
+        np.round(np.asarray([v["inicio"] for v in vehiculos], dtype=np.float64), 6),
+        axis=0, return_inverse=True,
+    )
+    vehiculo_a_inicio = vehiculo_a_inicio.reshape(-1)
+    distancias_inicio = matriz_distancias(puntos, inicios)
+    pedido_a_inicio = distancias_inicio.argmin(axis=1)
+
+    no_asignados = np.flatnonzero(carga > capacidades.max()).tolist()
+    excluidos = set(no_asignados)
+
+    # 2. Ahorros de Clarke–Wright por grupo de inicio
+    rutas_candidatas = []  # (inicio, [pedidos], carga)
+    for g in range(len(inicios)):
+        miembros = np.asarray(
+            [i for i in np.flatnonzero(pedido_a_inicio == g) if i not in excluidos],
+            dtype=np.intp,
+        )
+        if not len(miembros):
+            continue
+        cap_grupo = capacidades[vehiculo_a_inicio == g].max()
+        for ruta in _ahorros(puntos[miembros], distancias_inicio[miembros, g], carga[miembros], cap_grupo, vecinos):
+            pedidos = miembros[ruta].tolist()
+            rutas_candidatas.append((g, pedidos, float(carga[pedidos].sum())))
+
+    # 3. Asignar rutas a vehículos: primero las de mayor carga, al vehículo
+    #    más chico que la admita (del mismo inicio si es posible). Si ninguno
+    #    la admite, cortarla en tramos para los vehículos libres más grandes.
+    rutas_candidatas.sort(key=lambda r: -r[2])
+    libres = np.ones(len(vehiculos), dtype=bool)
+    asignadas = []
+    for g, pedidos, carga_ruta in rutas_candidatas:
+        while pedidos:
+            vehiculo = _elegir_vehiculo(capacidades, libres, vehiculo_a_inicio, g, carga_ruta)
+            if vehiculo is None:
+                vehiculo = _vehiculo_mas_grande(capacidades, libres, vehiculo_a_inicio, g)
+            if vehiculo is None:
+                no_asignados.extend(pedidos)
+                break
+            acumulada = np.cumsum(carga[pedidos])
+            corte = int(np.searchsorted(acumulada, capacidades[vehiculo], side="right"))
+            if corte == 0:
+                no_asignados.extend(pedidos)
+                break
+            libres[vehiculo] = False
+            asignadas.append([vehiculo, pedidos[:corte], float(acumulada[corte - 1])])
+            pedidos = pedidos[corte:]
+            carga_ruta -= float(acumulada[corte - 1])
+
+    # 4. Inserción más barata de los pedidos sobrantes en rutas con holgura
+    if no_asignados and asignadas:
+        no_asignados = _insertar_sobrantes(
+            puntos, carga, capacidades, vehiculos, asignadas, no_asignados
+        )
+
+    # 5. Mejora local de cada ruta con el presupuesto repartido
+    limite = time.perf_counter() + tiempo_limite_s
+    rutas = []
+    for k, (vehiculo, pedidos, carga_ruta) in enumerate(asignadas):
+        matriz = matriz_ruta(vehiculos[vehiculo]["inicio"], puntos[pedidos])
+        orden = list(range(1, len(pedidos) + 1))
+        restante = max(0.0, limite - time.perf_counter())
+        if restante > 0:
+            orden = mejorar_ruta(matriz, orden, tiempo_limite_s=restante / (len(asignadas) - k))
+        rutas.append({
+            "vehiculo": int(vehiculo),
+            "paradas": [pedidos[i - 1] for i in orden],
+            "carga": carga_ruta,
+            "distancia_km": longitud_ruta(matriz, orden),
+        })
+
+    return {"rutas": rutas, "no_asignados": sorted(no_asignados)}
+
+
+def _elegir_vehiculo(capacidades, libres, vehiculo_a_inicio, inicio, carga_ruta):
+    for mismo_inicio in (True, False):
+        candidatos = libres & (capacidades >= carga_ruta)
+        if mismo_inicio:
+            candidatos &= vehiculo_a_inicio == inicio
+        if candidatos.any():
+            indices = np.flatnonzero(candidatos)
+            return int(indices[capacidades[indices].argmin()])
+    return None
+
+
+def _vehiculo_mas_grande(capacidades, libres, vehiculo_a_inicio, inicio):
+    for mismo_inicio in (True, False):
+        candidatos = libres.copy()
+        if mismo_inicio:
+            candidatos &= vehiculo_a_inicio == inicio
+        if candidatos.any():
+            indices = np.flatnonzero(candidatos)
+            return int(indices[capacidades[indices].argmax()])
+    return None
+
+
+def _insertar_sobrantes(puntos, carga, capacidades, vehiculos, asignadas, pendientes) -> list[int]:
+    """
+    Inserta cada pedido pendiente (de menor a mayor carga) en la posición de
+    menor costo adicional entre todas las rutas con holgura suficiente.
+    Modifica `asignadas` en el lugar y retorna los pedidos que no cupieron.
+    """
+    # Por ruta: tramos (a -> b) incluyendo el tramo final abierto (b = NaN)
+    def tramos(vehiculo, pedidos):
+        a = np.vstack([np.asarray(vehiculos[vehiculo]["inicio"], dtype=np.float64), puntos[pedidos]])
+        b = np.vstack([puntos[pedidos], np.full((1, 2), np.nan)])
+        d_ab = np.zeros(len(a))
+        if pedidos:
+            d_ab[:-1] = distancias_pares(a[:-1], b[:-1])
+        return a, b, d_ab
+
+    cache = [tramos(v, p) for v, p, _ in asignadas]
+    sin_lugar = []
+    for pedido in sorted(pendientes, key=lambda x: carga[x]):
+        holgura = np.asarray([capacidades[v] - c for v, _, c in asignadas])
+        aptas = np.flatnonzero(holgura >= carga[pedido])
+        if not len(aptas):
+            sin_lugar.append(pedido)
+            continue
+        a = np.vstack([cache[r][0] for r in aptas])
+        b = np.vstack([cache[r][1] for r in aptas])
+        d_ab = np.concatenate([cache[r][2] for r in aptas])
+        ruta_de = np.repeat(aptas, [len(cache[r][0]) for r in aptas])
+        posicion = np.concatenate([np.arange(len(cache[r][0])) for r in aptas])
+
+        tiene_b = ~np.isnan(b[:, 0])
+        d_ap = distancias_desde(puntos[pedido], a)
+        d_pb = np.zeros(len(b))
+        d_pb[tiene_b] = distancias_desde(puntos[pedido], b[tiene_b])
+        costo = d_ap + d_pb - d_ab
+        k = int(costo.argmin())
+
+        r = int(ruta_de[k])
+        asignadas[r][1].insert(int(posicion[k]), pedido)
+        asignadas[r][2] += float(carga[pedido])
+        cache[r] = tramos(asignadas[r][0], asignadas[r][1])
+    return sin_lugar
+
+
+def _vecinos_cercanos(puntos: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Índices y distancias de los k vecinos más cercanos de cada punto, por bloques."""
+    n = len(puntos)
+    k = min(k, n - 1)
+    indices = np.empty((n, k), dtype=np.intp)
+    distancias = np.empty((n, k), dtype=np.float64)
+    for inicio in range(0, n, _BLOQUE_VECINOS):
+        fin = min(inicio + _BLOQUE_VECINOS, n)
+        bloque = matriz_distancias(puntos[inicio:fin], puntos)
+        bloque[np.arange(fin - inicio), np.arange(inicio, fin)] = np.inf
+        cercanos = np.argpartition(bloque, k - 1, axis=1)[:, :k]
+        indices[inicio:fin] = cercanos
+        distancias[inicio:fin] = np.take_along_axis(bloque, cercanos, axis=1)
+    return indices, distancias
+
+
+def _ahorros(puntos, d_inicio, carga, capacidad, vecinos) -> list[np.ndarray]:
+    """
+    Clarke–Wright para rutas abiertas desde un mismo inicio.
+    Retorna listas de índices locales (0..n-1) en orden de visita.
+    """
+    n = len(puntos)
+    if n == 1:
+        return [np.asarray([0])]
+
+    vecino_idx, vecino_dist = _vecinos_cercanos(puntos, vecinos)
+    i = np.repeat(np.arange(n), vecino_idx.shape[1])
+    j = vecino_idx.reshape(-1)
+    # Unir la ruta que termina en i con la que empieza en j
+    ahorro = d_inicio[j] - vecino_dist.reshape(-1)
+    positivos = ahorro > 0
+    i, j, ahorro = i[positivos], j[positivos], ahorro[positivos]
+    orden = np.argsort(-ahorro, kind="stable")
+
+    padre = list(range(n))
+    primero = list(range(n))
+    ultimo = list(range(n))
+    carga_ruta = carga.tolist()
+    siguiente = [-1] * n
+
+    def raiz(x):
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    for a, b in zip(i[orden].tolist(), j[orden].tolist()):
+        ra, rb = raiz(a), raiz(b)
+        if ra == rb or ultimo[ra] != a or primero[rb] != b:
+            continue
+        if carga_ruta[ra] + carga_ruta[rb] > capacidad:
+            continue
+        siguiente[a] = b
+        padre[rb] = ra
+        ultimo[ra] = ultimo[rb]
+        carga_ruta[ra] += carga_ruta[rb]
+
+    rutas = []
+    for x in range(n):
+        if raiz(x) != x:
+            continue
+        ruta = []
+        nodo = primero[x]
+        while nodo != -1:
+            ruta.append(nodo)
+            nodo = siguiente[nodo]
+        rutas.append(np.asarray(ruta, dtype=np.intp))
+    return rutas
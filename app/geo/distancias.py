@@ -0,0 +1,159 @@
+"""
+Cálculo vectorizado de distancias geográficas.
+
+Todos los puntos se reciben como pares (latitud, longitud) en grados y las
+distancias se devuelven en kilómetros. Las matrices N×M se resuelven en una
+sola operación NumPy en lugar de una llamada a `geopy` por cada par.
+
+Modos disponibles:
+    - "haversine": esfera de radio medio (rápido, error < 0.5 %).
+    - "elipsoide": fórmula inversa de Vincenty sobre WGS-84, vectorizada.
+"""
+import os
+
+import numpy as np
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Elipsoide WGS-84 (km)
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+MODO_HAVERSINE = "haversine"
+MODO_ELIPSOIDE = "elipsoide"
+MODO_POR_DEFECTO = os.getenv("GEO_MODO_DISTANCIA", MODO_HAVERSINE)
+
+_MAX_ITERACIONES_VINCENTY = 200
+_TOLERANCIA_VINCENTY = 1e-12
+
+
+def a_arreglo(puntos) -> np.ndarray:
+    """
+    Convierte un punto (lat, lon) o una secuencia de puntos en un arreglo
+    de forma (N, 2) en float64.
+    """
+    arr = np.asarray(puntos, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr.reshape(1, 2)
+    if arr.ndim != 2 or arr.shape[1] != 2:
+        raise ValueError("Se esperaban puntos con forma (latitud, longitud)")
+    return arr
+
+
+def matriz_distancias(origenes, destinos=None, modo: str = None) -> np.ndarray:
+    """
+    Calcula la matriz de distancias en km entre todos los orígenes y destinos.
+
+    Args:
+        origenes: Secuencia de N puntos (lat, lon)
+        destinos: Secuencia de M puntos (lat, lon). Si es None se usan los orígenes.
+        modo: "haversine" o "elipsoide"
+
+    Returns:
+        np.ndarray de forma (N, M)
+    """
+    o = a_arreglo(origenes)
+    d = o if destinos is None else a_arreglo(destinos)
+    lat1, lon1 = o[:, 0:1], o[:, 1:2]
+    lat2, lon2 = d[:, 0][np.newaxis, :], d[:, 1][np.newaxis, :]
+    return _calcular(lat1, lon1, lat2, lon2, modo or MODO_POR_DEFECTO)
+
+
+def distancias_pares(origenes, destinos, modo: str = None) -> np.ndarray:
+    """
+    Calcula la distancia elemento a elemento entre origenes[i] y destinos[i].
+    Útil para costear los tramos consecutivos de una ruta.
+    """
+    o = a_arreglo(origenes)
+    d = a_arreglo(destinos)
+    if o.shape != d.shape:
+        raise ValueError("Orígenes y destinos deben tener la misma cantidad de puntos")
+    return _calcular(o[:, 0], o[:, 1], d[:, 0], d[:, 1], modo or MODO_POR_DEFECTO)
+
+
+def distancias_desde(punto, puntos, modo: str = None) -> np.ndarray:
+    """Distancias en km desde un punto a cada uno de `puntos` (vector de M)."""
+    return matriz_distancias(punto, puntos, modo)[0]
+
+
+def distancia_km(origen, destino, modo: str = None) -> float:
+    """Distancia en km entre dos puntos (lat, lon)."""
+    return float(matriz_distancias(origen, destino, modo)[0, 0])
+
+
+def _calcular(lat1, lon1, lat2, lon2, modo: str) -> np.ndarray:
+    if modo == MODO_HAVERSINE:
+        return _haversine(lat1, lon1, lat2, lon2)
+    if modo == MODO_ELIPSOIDE:
+        return _vincenty(lat1, lon1, lat2, lon2)
+    raise ValueError(f"Modo de distancia desconocido: {modo}")
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _vincenty(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Fórmula inversa de Vincenty sobre WGS-84 resuelta para todos los pares a la vez.
+    Los pares que no convergen (casi antipodales) usan la distancia haversine.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *map(np.radians, (lat1, lon1, lat2, lon2))
+    )
+    f = WGS84_F
+    L = lon2 - lon1
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    pendientes = np.ones(L.shape, dtype=bool)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(_MAX_ITERACIONES_VINCENTY):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt(
+                (cosU2 * sin_lam) ** 2
+                + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2
+            )
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma > 0, cosU1 * cosU2 * sin_lam / sin_sigma, 0.0)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(
+                cos2_alpha > 0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha, 0.0
+            )
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_nuevo = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (
+                    cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                )
+            )
+            pendientes = np.abs(lam_nuevo - lam) > _TOLERANCIA_VINCENTY
+            lam = lam_nuevo
+            if not pendientes.any():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (
+            cos_2sigma_m + B / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+            )
+        )
+        distancia = WGS84_B * A * (sigma - delta_sigma)
+
+    distancia = np.where(sin_sigma == 0, 0.0, distancia)
+    if pendientes.any():
+        respaldo = _haversine(*map(np.degrees, (lat1, lon1, lat2, lon2)))
+        distancia = np.where(pendientes, respaldo, distancia)
+    return distancia
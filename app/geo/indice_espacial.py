@@ -0,0 +1,108 @@
+"""
+Índice espacial en memoria sobre una grilla regular de celdas lat/lon.
+
+Cada punto se guarda en la celda (⌊lat/celda⌋, ⌊lon/celda⌋). Una consulta
+por radio sólo mide la distancia a los puntos de las celdas que cubren el
+círculo, y k vecinos amplía el radio hasta reunir k candidatos. Las altas,
+cambios y bajas son O(1), por lo que el índice se mantiene al día a medida
+que cambian las coordenadas.
+"""
+import math
+import threading
+
+import numpy as np
+
+from app.geo.distancias import distancias_desde
+
+KM_POR_GRADO = 111.32
+
+
+class IndiceEspacial:
+    def __init__(self, celda_grados: float = 0.01):
+        self.celda = celda_grados
+        self._posiciones: dict = {}
+        self._celdas: dict[tuple[int, int], set] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    def __contains__(self, clave):
+        return clave in self._posiciones
+
+    def _celda_de(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.celda), math.floor(lon / self.celda)
+
+    # ─── Mantenimiento ────────────────────────────────────────────
+    def upsert(self, clave, lat: float, lon: float):
+        with self._lock:
+            self.quitar(clave)
+            self._posiciones[clave] = (float(lat), float(lon))
+            self._celdas.setdefault(self._celda_de(lat, lon), set()).add(clave)
+
+    def quitar(self, clave):
+        with self._lock:
+            posicion = self._posiciones.pop(clave, None)
+            if posicion is None:
+                return
+            celda = self._celda_de(*posicion)
+            miembros = self._celdas.get(celda)
+            if miembros is not None:
+                miembros.discard(clave)
+                if not miembros:
+                    del self._celdas[celda]
+
+    def reconstruir(self, puntos):
+        """Reemplaza el contenido por `puntos`: iterable de (clave, lat, lon)."""
+        with self._lock:
+            self._posiciones.clear()
+            self._celdas.clear()
+            for clave, lat, lon in puntos:
+                self.upsert(clave, lat, lon)
+
+    # ─── Consultas ────────────────────────────────────────────────
+    def radio(self, punto: tuple, radio_km: float) -> list[tuple]:
+        """Lista de (clave, distancia_km) dentro del radio, de la más cercana a la más lejana."""
+        with self._lock:
+            candidatos = self._candidatos(punto, radio_km)
+            if not candidatos:
+                return []
+            distancias = distancias_desde(punto, [self._posiciones[c] for c in candidatos])
+        dentro = np.flatnonzero(distancias <= radio_km)
+        dentro = dentro[np.argsort(distancias[dentro], kind="stable")]
+        return [(candidatos[i], float(distancias[i])) for i in dentro]
+
+    def cercanos(self, punto: tuple, k: int = 1) -> list[tuple]:
+        """Los k puntos más cercanos como (clave, distancia_km)."""
+        with self._lock:
+            total = len(self._posiciones)
+            if not total or k <= 0:
+                return []
+            radio_km = self.celda * KM_POR_GRADO
+            while True:
+                encontrados = self.radio(punto, radio_km)
+                if len(encontrados) >= min(k, total):
+                    return encontrados[:k]
+                radio_km *= 2
+
+    def mas_cercano(self, punto: tuple):
+        """Clave del punto más cercano o None si el índice está vacío."""
+        cercanos = self.cercanos(punto, 1)
+        return cercanos[0][0] if cercanos else None
+
+    def _candidatos(self, punto: tuple, radio_km: float) -> list:
+        lat, lon = float(punto[0]), float(punto[1])
+        filas = math.ceil(radio_km / KM_POR_GRADO / self.celda)
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + filas * self.celda, 89.0))), 1e-6)
+        columnas = math.ceil(radio_km / (KM_POR_GRADO * cos_lat) / self.celda)
+        if (2 * filas + 1) * (2 * columnas + 1) >= len(self._celdas):
+            # El círculo cubre más celdas de las que hay ocupadas: recorrer todas
+            return list(self._posiciones)
+        ci, cj = self._celda_de(lat, lon)
+        candidatos = []
+        for i in range(ci - filas, ci + filas + 1):
+            for j in range(cj - columnas, cj + columnas + 1):
+                miembros = self._celdas.get((i, j))
+                if miembros:
+                    candidatos.extend(miembros)
+        return candidatos
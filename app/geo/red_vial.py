@@ -0,0 +1,247 @@
+"""
+Motor de ruteo offline sobre una red vial local.
+
+La red se compila una vez desde una lista de aristas en CSV a arreglos CSR
+(.npy) y cada worker la abre con `np.load(..., mmap_mode="r")`, de modo que
+el arranque no depende del tamaño de la red y las páginas se comparten
+entre procesos.
+
+Formato del CSV (con encabezado):
+
+    lat_origen,lon_origen,lat_destino,lon_destino,metros,segundos,doble_sentido
+
+`segundos` puede quedar vacío (se estima con VELOCIDAD_DEFECTO_KMH) y
+`doble_sentido` es 1 por defecto. Los nodos se identifican por sus
+coordenadas redondeadas a 7 decimales.
+
+Los caminos mínimos se resuelven con `scipy.sparse.csgraph.dijkstra` sobre
+los mismos arreglos CSR (un Dijkstra en C por cada origen distinto, en
+RED_VIAL_HILOS hilos) y los puntos se ajustan al nodo más cercano con un
+KD-tree. Ambas estructuras se arman en memoria la primera vez que se usan.
+
+Compilar:
+
+    python -m app.geo.red_vial compilar red.csv directorio_salida/
+
+y apuntar RED_VIAL_PATH al directorio de salida.
+"""
+import csv
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from app.geo.distancias import RADIO_TIERRA_KM, matriz_distancias
+
+VELOCIDAD_DEFECTO_KMH = 30.0
+# Tramo entre el punto pedido y el nodo más cercano de la red
+MINUTOS_POR_KM_ACCESO = 2.5
+HILOS = int(os.getenv("RED_VIAL_HILOS", "4"))
+# Orígenes por tarea del pool (cada uno es un Dijkstra completo)
+ORIGENES_POR_TAREA = 4
+
+_ARCHIVOS = ("nodos", "indptr", "indices", "metros", "segundos")
+
+
+def compilar_red(ruta_csv: str, directorio: str) -> dict:
+    """Convierte la lista de aristas a arreglos CSR en `directorio`."""
+    ids: dict[tuple, int] = {}
+    coords = []
+    origenes, destinos, metros, segundos = [], [], [], []
+
+    def nodo(lat, lon):
+        clave = (round(float(lat), 7), round(float(lon), 7))
+        if clave not in ids:
+            ids[clave] = len(coords)
+            coords.append(clave)
+        return ids[clave]
+
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            a = nodo(fila["lat_origen"], fila["lon_origen"])
+            b = nodo(fila["lat_destino"], fila["lon_destino"])
+            m = float(fila["metros"])
+            s = float(fila["segundos"]) if fila.get("segundos") else m / 1000 / VELOCIDAD_DEFECTO_KMH * 3600
+            sentidos = [(a, b), (b, a)] if fila.get("doble_sentido", "1") not in ("0", "false", "False") else [(a, b)]
+            for u, v in sentidos:
+                origenes.append(u)
+                destinos.append(v)
+                metros.append(m)
+                segundos.append(s)
+
+    origenes = np.asarray(origenes, dtype=np.int32)
+    orden = np.argsort(origenes, kind="stable")
+    indptr = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origenes, minlength=len(coords)), out=indptr[1:])
+
+    os.makedirs(directorio, exist_ok=True)
+    arreglos = {
+        "nodos": np.asarray(coords, dtype=np.float64),
+        "indptr": indptr,
+        "indices": np.asarray(destinos, dtype=np.int32)[orden],
+        "metros": np.asarray(metros, dtype=np.float32)[orden],
+        "segundos": np.asarray(segundos, dtype=np.float32)[orden],
+    }
+    for nombre, arreglo in arreglos.items():
+        np.save(os.path.join(directorio, f"{nombre}.npy"), arreglo)
+    return {"nodos": len(coords), "aristas": len(origenes)}
+
+
+def _unitarios(puntos: np.ndarray) -> np.ndarray:
+    """(lat, lon) en grados -> vectores unitarios 3D (la cuerda crece con el arco)."""
+    lat, lon = np.radians(puntos[:, 0]), np.radians(puntos[:, 1])
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class RedVial:
+    def __init__(self, directorio: str):
+        for nombre in _ARCHIVOS:
+            setattr(self, nombre, np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r"))
+        self._arbol = None
+        self._grafo = None
+        self._lock = threading.Lock()
+
+    def _preparar(self):
+        """KD-tree de nodos y grafo de tiempos; se arman una vez, al primer uso."""
+        if self._grafo is not None:
+            return
+        with self._lock:
+            if self._grafo is not None:
+                return
+            n = len(self.nodos)
+            indptr = np.asarray(self.indptr)
+            origen = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+            destino = np.asarray(self.indices, dtype=np.int64)
+            segundos = np.asarray(self.segundos, dtype=np.float64)
+            # Entre aristas paralelas sólo cuenta la más rápida
+            orden = np.lexsort((segundos, destino, origen))
+            claves = origen[orden] * n + destino[orden]
+            primera = np.ones(len(claves), dtype=bool)
+            primera[1:] = claves[1:] != claves[:-1]
+            orden = orden[primera]
+            self._claves = claves[primera]
+            self._metros_arista = np.asarray(self.metros, dtype=np.float64)[orden]
+            # Un peso 0 explícito no es arista para csgraph
+            pesos = np.maximum(segundos[orden], 1e-3)
+            self._arbol = cKDTree(_unitarios(np.asarray(self.nodos)))
+            self._grafo = csr_matrix((pesos, (origen[orden], destino[orden])), shape=(n, n))
+
+    # ─── Ajuste de puntos a la red ────────────────────────────────
+    def nodos_cercanos(self, puntos) -> tuple[np.ndarray, np.ndarray]:
+        """Índices de los nodos más cercanos a `puntos` y distancias en km hasta ellos."""
+        self._preparar()
+        cuerdas, nodos = self._arbol.query(_unitarios(np.asarray(puntos, dtype=np.float64).reshape(-1, 2)))
+        return nodos, 2 * RADIO_TIERRA_KM * np.arcsin(np.clip(cuerdas / 2, 0.0, 1.0))
+
+    def nodo_cercano(self, punto) -> tuple[int, float]:
+        """Índice del nodo más cercano y distancia en km hasta él."""
+        nodos, km = self.nodos_cercanos([punto])
+        return int(nodos[0]), float(km[0])
+
+    # ─── Caminos mínimos ──────────────────────────────────────────
+    def _caminos(self, origenes: np.ndarray, objetivos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Camino más rápido de cada origen a cada objetivo (índices de nodo).
+        Retorna (metros, segundos) de forma len(origenes) × len(objetivos);
+        np.inf donde no hay camino.
+        """
+        segundos, predecesores = dijkstra(self._grafo, indices=origenes, return_predecessors=True)
+        segundos = segundos[:, objetivos]
+        metros = self._metros_caminos(predecesores, objetivos)
+        metros[~np.isfinite(segundos)] = np.inf
+        return metros, segundos
+
+    def _metros_caminos(self, predecesores: np.ndarray, objetivos: np.ndarray) -> np.ndarray:
+        """
+        Metros de los caminos hasta `objetivos` según los predecesores de
+        Dijkstra: se retrocede un tramo por pasada en todos los pares a la vez.
+        """
+        n = len(self.nodos)
+        filas, columnas = np.meshgrid(np.arange(len(predecesores)), np.arange(len(objetivos)), indexing="ij")
+        filas, columnas = filas.ravel(), columnas.ravel()
+        actual = np.asarray(objetivos, dtype=np.int64)[columnas]
+        metros = np.zeros(len(filas))
+        while len(filas):
+            padres = predecesores[filas, actual].astype(np.int64)
+            siguen = padres >= 0
+            filas, columnas, actual, padres = filas[siguen], columnas[siguen], actual[siguen], padres[siguen]
+            tramos = self._metros_arista[np.searchsorted(self._claves, padres * n + actual)]
+            metros[filas * len(objetivos) + columnas] += tramos  # un tramo por par en cada pasada
+            actual = padres
+        return metros.reshape(len(predecesores), len(objetivos))
+
+    def matriz(self, origenes: list, destinos: list = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Distancias (km) y tiempos (s) de manejo de todos los orígenes a
+        todos los destinos. Los pares sin camino quedan en np.inf.
+        """
+        destinos = origenes if destinos is None else destinos
+        km = np.full((len(origenes), len(destinos)), np.inf)
+        seg = np.full_like(km, np.inf)
+        if not len(origenes) or not len(destinos):
+            return km, seg
+        nodos_o, acceso_o = self.nodos_cercanos(origenes)
+        nodos_d, acceso_d = self.nodos_cercanos(destinos)
+
+        # Un Dijkstra por nodo de origen distinto, repartidos en el pool
+        unicos_o, fila_de = np.unique(nodos_o, return_inverse=True)
+        unicos_d, columna_de = np.unique(nodos_d, return_inverse=True)
+        tareas = [unicos_o[i:i + ORIGENES_POR_TAREA] for i in range(0, len(unicos_o), ORIGENES_POR_TAREA)]
+        if len(tareas) > 1 and HILOS > 1:
+            with ThreadPoolExecutor(max_workers=min(HILOS, len(tareas))) as executor:
+                resultados = list(executor.map(lambda t: self._caminos(t, unicos_d), tareas))
+        else:
+            resultados = [self._caminos(t, unicos_d) for t in tareas]
+        metros = np.vstack([m for m, _ in resultados])[fila_de][:, columna_de]
+        segundos = np.vstack([s for _, s in resultados])[fila_de][:, columna_de]
+
+        acceso = acceso_o[:, None] + acceso_d[None, :]
+        km = metros / 1000 + acceso
+        seg = segundos + acceso * MINUTOS_POR_KM_ACCESO * 60
+        # Mismo nodo: no tiene sentido ir y volver por la red
+        mismo = nodos_o[:, None] == nodos_d[None, :]
+        if mismo.any():
+            directo = matriz_distancias(origenes, destinos)
+            km[mismo] = directo[mismo]
+            seg[mismo] = directo[mismo] * MINUTOS_POR_KM_ACCESO * 60
+        return km, seg
+
+    def ruta(self, origen, destino) -> tuple[float, float] | None:
+        """(km, segundos) de origen a destino o None si no hay camino."""
+        km, seg = self.matriz([origen], [destino])
+        if not np.isfinite(km[0, 0]):
+            return None
+        return float(km[0, 0]), float(seg[0, 0])
+
+
+_red = None
+_red_cargada = False
+_lock = threading.Lock()
+
+
+def obtener_red() -> RedVial | None:
+    """Red vial configurada en RED_VIAL_PATH (cargada una vez) o None."""
+    global _red, _red_cargada
+    if not _red_cargada:
+        with _lock:
+            if not _red_cargada:
+                directorio = os.getenv("RED_VIAL_PATH")
+                if directorio:
+                    try:
+                        _red = RedVial(directorio)
+                    except (OSError, ValueError) as e:
+                        print(f"No se pudo cargar la red vial de {directorio}: {e}")
+                _red_cargada = True
+    return _red
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "compilar":
+        print("Uso: python -m app.geo.red_vial compilar red.csv directorio_salida/")
+        sys.exit(1)
+    print(compilar_red(sys.argv[2], sys.argv[3]))
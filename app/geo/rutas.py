@@ -0,0 +1,78 @@
+"""
+Construcción de rutas sobre una matriz de distancias precalculada.
+
+La matriz se arma una sola vez con el punto de inicio en el índice 0 y las
+paradas en los índices 1..n. La siguiente parada se elige con un argmin
+enmascarado sobre la fila del punto actual, por lo que construir una ruta
+de n paradas cuesta O(n²) operaciones vectorizadas.
+"""
+import numpy as np
+
+from app.geo.distancias import matriz_distancias
+
+
+def matriz_ruta(inicio, paradas, modo: str = None) -> np.ndarray:
+    """
+    Matriz de distancias (n+1)×(n+1) donde el índice 0 es el punto de
+    inicio y el índice i (1..n) es paradas[i-1].
+    """
+    puntos = [tuple(inicio)] + [tuple(p) for p in paradas]
+    return matriz_distancias(puntos, modo=modo)
+
+
+def vecino_mas_cercano(matriz: np.ndarray) -> list[int]:
+    """
+    Construye una ruta abierta desde el índice 0 visitando todas las
+    paradas por el algoritmo del vecino más cercano.
+
+    Returns:
+        Lista de índices de la matriz (1..n) en orden de visita
+    """
+    n = matriz.shape[0]
+    visitado = np.zeros(n, dtype=bool)
+    visitado[0] = True
+    orden = []
+    actual = 0
+    for _ in range(n - 1):
+        fila = np.where(visitado, np.inf, matriz[actual])
+        actual = int(fila.argmin())
+        visitado[actual] = True
+        orden.append(actual)
+    return orden
+
+
+def longitud_ruta(matriz: np.ndarray, orden: list[int]) -> float:
+    """Longitud en km de la ruta abierta 0 → orden[0] → … → orden[-1]."""
+    if not orden:
+        return 0.0
+    secuencia = np.asarray([0] + list(orden))
+    return float(matriz[secuencia[:-1], secuencia[1:]].sum())
+
+
+def ordenar_paradas(
+    inicio,
+    paradas,
+    modo: str = None,
+    mejorar: bool = False,
+    tiempo_limite_s: float = None,
+) -> tuple[list[int], float]:
+    """
+    Ordena las paradas partiendo de `inicio`.
+
+    Args:
+        inicio: Tupla (lat, lon) del punto de partida
+        paradas: Lista de tuplas (lat, lon)
+        mejorar: Si es True aplica 2-opt / Or-opt después de la construcción
+        tiempo_limite_s: Presupuesto de tiempo para la mejora
+
+    Returns:
+        Tupla (orden, distancia_km) donde `orden` son índices de `paradas`
+    """
+    if not paradas:
+        return [], 0.0
+    matriz = matriz_ruta(inicio, paradas, modo)
+    orden = vecino_mas_cercano(matriz)
+    if mejorar:
+        from app.geo.busqueda_local import mejorar_ruta
+        orden = mejorar_ruta(matriz, orden, tiempo_limite_s=tiempo_limite_s)
+    return [i - 1 for i in orden], longitud_ruta(matriz, orden)
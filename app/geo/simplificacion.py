@@ -0,0 +1,63 @@
+"""
+Simplificación de recorridos GPS con Douglas–Peucker.
+
+Los puntos se proyectan a metros con una proyección equirectangular local
+(centrada en el recorrido), suficiente para las escalas de una ciudad, y se
+conserva todo punto que se aparte más de `tolerancia_m` del segmento que
+une a los puntos conservados vecinos.
+"""
+import numpy as np
+
+from app.geo.distancias import RADIO_TIERRA_KM, a_arreglo, distancias_pares
+
+
+def _a_metros(puntos: np.ndarray) -> np.ndarray:
+    lat0 = np.radians(puntos[:, 0].mean())
+    escala = RADIO_TIERRA_KM * 1000 * np.pi / 180
+    return np.column_stack([
+        puntos[:, 1] * escala * np.cos(lat0),
+        puntos[:, 0] * escala,
+    ])
+
+
+def douglas_peucker(puntos, tolerancia_m: float) -> np.ndarray:
+    """Índices (ordenados) de los puntos que se conservan; siempre incluye el primero y el último."""
+    puntos = a_arreglo(puntos) if len(puntos) else np.empty((0, 2))
+    n = len(puntos)
+    if n <= 2:
+        return np.arange(n)
+
+    xy = _a_metros(puntos)
+    conservar = np.zeros(n, dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, n - 1)]
+    while pila:
+        i, j = pila.pop()
+        if j - i < 2:
+            continue
+        a, b = xy[i], xy[j]
+        intermedios = xy[i + 1:j]
+        ab = b - a
+        largo2 = ab @ ab
+        if largo2 == 0:
+            distancias = np.hypot(*(intermedios - a).T)
+        else:
+            # Distancia al segmento AB (no a la recta): un punto más allá de A
+            # o de B, como la vuelta de un trayecto de ida y vuelta, se conserva
+            t = np.clip((intermedios - a) @ ab / largo2, 0.0, 1.0)
+            distancias = np.hypot(*(intermedios - (a + t[:, None] * ab)).T)
+        k = int(distancias.argmax())
+        if distancias[k] > tolerancia_m:
+            medio = i + 1 + k
+            conservar[medio] = True
+            pila.append((i, medio))
+            pila.append((medio, j))
+    return np.flatnonzero(conservar)
+
+
+def longitud_recorrido(puntos) -> float:
+    """Kilómetros recorridos sumando los tramos entre puntos consecutivos."""
+    if len(puntos) < 2:
+        return 0.0
+    puntos = a_arreglo(puntos)
+    return float(distancias_pares(puntos[:-1], puntos[1:]).sum())
@@ -1,6 +1,9 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
+from app.database import async_engine, enrutador_replicas
+from app.migraciones.migrador import verificar_esquema
 
 # Rutas
 from app.routes import (
@@ -15,12 +18,32 @@ from app.routes import (
     auth_routes,
     asignacion_vehiculo_routes,
     tienda_routes,
-    entregas_routes
+    entregas_routes,
+    metricas_routes
 )
 
+from app.services.ubicacion_service import buffer_ubicaciones
+from app.auth import contrasenas
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El esquema lo migra `python -m app.migraciones` (release); aquí sólo se comprueba
+    verificar_esquema()
+    buffer_ubicaciones.iniciar()
+    contrasenas.iniciar()
+    enrutador_replicas.iniciar()
+    yield
+    buffer_ubicaciones.detener()
+    contrasenas.cerrar()
+    await enrutador_replicas.cerrar()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
 app = FastAPI(
     title="API Distribución de Zapatos",
-  
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -59,13 +82,6 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
-Base.metadata.create_all(bind=engine)
-from sqlalchemy import text
-with engine.begin() as conn:
-    conn.execute(text(
-        "ALTER TABLE entrega ADD COLUMN IF NOT EXISTS asignacion_id UUID REFERENCES asignacion_entrega(id) ON DELETE CASCADE"
-    ))
-
 # Registrar routers
 app.include_router(auth_routes.router)
 
@@ -79,4 +95,5 @@ app.include_router(ruta_entrega_routes.router)
 app.include_router(asignacion_routes.router)
 app.include_router(asignacion_vehiculo_routes.router)
 app.include_router(tienda_routes.router)
-app.include_router(entregas_routes.router)
\ No newline at end of file
+app.include_router(entregas_routes.router)
+app.include_router(metricas_routes.router)
\ No newline at end of file
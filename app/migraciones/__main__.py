@@ -0,0 +1,22 @@
+"""
+Aplica las migraciones pendientes del esquema.
+
+Uso:
+    python -m app.migraciones           aplica lo pendiente (fase release del Procfile)
+    python -m app.migraciones estado    muestra la versión actual y lo pendiente
+"""
+import sys
+
+from app.migraciones.migrador import VERSION_ESPERADA, migrar, pendientes, version_actual
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] != "estado"):
+        print("Uso: python -m app.migraciones [estado]")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        print(f"Versión del esquema: {version_actual()} (el código espera {VERSION_ESPERADA})")
+        for migracion in pendientes():
+            print(f"  pendiente {migracion.version:03d} {migracion.nombre}: {migracion.descripcion}")
+        sys.exit(0)
+    aplicadas = migrar()
+    print(f"Migraciones aplicadas: {aplicadas}" if aplicadas else "El esquema ya estaba al día")
@@ -0,0 +1,175 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada archivo `versiones/vNNN_descripcion.py` es una migración: su docstring
+la describe y `aplicar(conn)` la ejecuta dentro de una transacción, en la
+que también se registra la versión en `esquema_version`. Si falla, no queda
+registrada y se reintenta la próxima vez. Se aplican en orden las de versión
+mayor a la registrada. Las que declaran `TRANSACCIONAL = False` (p. ej. para
+CREATE INDEX CONCURRENTLY) reciben una conexión en autocommit y la versión
+se registra después; tienen que poder repetirse si fallan a medias.
+
+Las migraciones se aplican una sola vez por despliegue con
+`python -m app.migraciones` (fase `release` del Procfile), no al importar la
+app: así los workers de uvicorn arrancan sin tomar locks de DDL sobre tablas
+con tráfico. En PostgreSQL un advisory lock de sesión serializa a los
+procesos que migran a la vez; el que llega segundo espera y luego no
+encuentra nada pendiente.
+
+Las migraciones que ya existían antes de este sistema son idempotentes (IF
+NOT EXISTS, comprobaciones previas), porque las BD ya creadas las reciben
+con `esquema_version` vacía.
+"""
+import os
+import pkgutil
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from importlib import import_module
+from pathlib import Path
+
+from sqlalchemy import (
+    TIMESTAMP, Column, Integer, MetaData, String, Table, func, inspect, select, text
+)
+
+from app.database import engine as engine_principal
+
+# Clave del advisory lock de PostgreSQL reservada para las migraciones
+CLAVE_BLOQUEO = 7_245_001
+MIGRAR_AL_ARRANCAR = os.getenv("MIGRAR_AL_ARRANCAR", "false").lower() in ("1", "true", "si", "sí", "yes")
+
+metadata_migraciones = MetaData()
+
+esquema_version = Table(
+    "esquema_version",
+    metadata_migraciones,
+    Column("version", Integer, primary_key=True),
+    Column("nombre", String(200), nullable=False),
+    Column("aplicada_en", TIMESTAMP, nullable=False, default=datetime.utcnow),
+)
+
+
+class Migracion:
+    def __init__(self, version: int, nombre: str, modulo):
+        self.version = version
+        self.nombre = nombre
+        # Primera línea del docstring de la migración
+        self.descripcion = (modulo.__doc__ or "").strip().split("\n")[0]
+        self.aplicar = modulo.aplicar
+        self.transaccional = getattr(modulo, "TRANSACCIONAL", True)
+
+
+def _cargar_migraciones() -> list[Migracion]:
+    carpeta = Path(__file__).parent / "versiones"
+    migraciones = []
+    for modulo in pkgutil.iter_modules([str(carpeta)]):
+        coincidencia = re.fullmatch(r"v(\d+)_(\w+)", modulo.name)
+        if not coincidencia:
+            continue
+        migraciones.append(Migracion(
+            int(coincidencia.group(1)),
+            coincidencia.group(2),
+            import_module(f"app.migraciones.versiones.{modulo.name}"),
+        ))
+    migraciones.sort(key=lambda m: m.version)
+    versiones = [m.version for m in migraciones]
+    if len(set(versiones)) != len(versiones):
+        raise RuntimeError(f"Hay versiones de migración repetidas: {versiones}")
+    return migraciones
+
+
+def version_actual(engine=engine_principal) -> int:
+    """Última versión aplicada; 0 si la BD nunca se migró."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(esquema_version.name):
+            return 0
+        return conn.execute(select(func.max(esquema_version.c.version))).scalar() or 0
+
+
+def pendientes(engine=engine_principal) -> list[Migracion]:
+    actual = version_actual(engine)
+    return [m for m in MIGRACIONES if m.version > actual]
+
+
+def agregar_columna(conn, tabla: str, columna: str, definicion: str):
+    """ALTER TABLE ... ADD COLUMN si la columna no existe (ADD COLUMN IF NOT EXISTS no existe en SQLite)."""
+    if columna in {c["name"] for c in inspect(conn).get_columns(tabla)}:
+        return
+    conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}"))
+
+
+@contextmanager
+def _bloqueo(engine):
+    """Advisory lock de sesión en PostgreSQL; en otros motores no hay concurrencia que cuidar."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        # Esperar lo que haga falta a que termine el otro proceso, sin los
+        # timeouts de las peticiones (valen sólo para esta transacción)
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text("SET LOCAL lock_timeout = 0"))
+        conn.execute(text("SELECT pg_advisory_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": CLAVE_BLOQUEO})
+            conn.commit()
+
+
+def migrar(engine=engine_principal) -> list[int]:
+    """Aplica las migraciones pendientes; retorna las versiones aplicadas."""
+    aplicadas = []
+    with _bloqueo(engine):
+        with engine.begin() as conn:
+            esquema_version.create(conn, checkfirst=True)
+        for migracion in pendientes(engine):
+            print(f"Aplicando migración {migracion.version:03d} {migracion.nombre}: {migracion.descripcion}")
+            if not migracion.transaccional:
+                with engine.connect() as conn:
+                    conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                    if engine.dialect.name == "postgresql":
+                        conn.execute(text("SET statement_timeout = 0"))
+                    try:
+                        migracion.aplicar(conn)
+                    finally:
+                        if engine.dialect.name == "postgresql":
+                            conn.execute(text("RESET statement_timeout"))
+            with engine.begin() as conn:
+                if migracion.transaccional:
+                    if engine.dialect.name == "postgresql":
+                        # Copias y rellenos pueden tardar más que DB_STATEMENT_TIMEOUT_MS;
+                        # lock_timeout se mantiene para no encolar el tráfico detrás del DDL
+                        conn.execute(text("SET LOCAL statement_timeout = 0"))
+                    migracion.aplicar(conn)
+                conn.execute(esquema_version.insert().values(
+                    version=migracion.version, nombre=migracion.nombre
+                ))
+            aplicadas.append(migracion.version)
+    return aplicadas
+
+
+def verificar_esquema(engine=engine_principal):
+    """
+    Comprobación al arrancar: la BD tiene que estar en la versión que espera
+    el código. Con MIGRAR_AL_ARRANCAR=true (desarrollo) aplica lo pendiente
+    en lugar de fallar.
+    """
+    actual = version_actual(engine)
+    if actual < VERSION_ESPERADA:
+        if MIGRAR_AL_ARRANCAR:
+            migrar(engine)
+            return
+        raise RuntimeError(
+            f"El esquema de la BD está en la versión {actual} y el código espera la "
+            f"{VERSION_ESPERADA}: ejecutar `python -m app.migraciones`"
+        )
+    if actual > VERSION_ESPERADA:
+        # Despliegue gradual: el código anterior sigue atendiendo con el esquema nuevo
+        print(f"El esquema de la BD (versión {actual}) es más nuevo que el código ({VERSION_ESPERADA})")
+
+
+# Al final: las migraciones importan agregar_columna de este módulo
+MIGRACIONES = _cargar_migraciones()
+VERSION_ESPERADA = MIGRACIONES[-1].version if MIGRACIONES else 0
@@ -0,0 +1,26 @@
+"""
+Tablas de todos los modelos.
+
+En una BD vacía crea el esquema completo con la definición actual de los
+modelos (columnas e índices incluidos), por lo que las migraciones
+siguientes no encuentran nada que hacer. En una BD existente sólo crea las
+tablas que falten.
+"""
+from app.database import Base
+from app.models import (  # registran sus tablas en Base.metadata
+    asignacion_model,
+    asignacion_vehiculo_model,
+    cliente_model,
+    distribuidor_model,
+    historial_ubicacion_model,
+    pago_model,
+    pedido_model,
+    producto_model,
+    ruta_entrega_model,
+    tienda_model,
+    vehiculo_model,
+)
+
+
+def aplicar(conn):
+    Base.metadata.create_all(bind=conn)
@@ -0,0 +1,9 @@
+"""Columna entrega.asignacion_id (entregas agrupadas por asignación)."""
+from app.migraciones.migrador import agregar_columna
+
+
+def aplicar(conn):
+    agregar_columna(
+        conn, "entrega", "asignacion_id",
+        "UUID REFERENCES asignacion_entrega(id) ON DELETE CASCADE",
+    )
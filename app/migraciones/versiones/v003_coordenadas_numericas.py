@@ -0,0 +1,17 @@
+"""Coordenadas numéricas junto a las columnas de texto "lat,lon"."""
+from sqlalchemy import text
+
+from app.migraciones.migrador import agregar_columna
+
+
+def aplicar(conn):
+    for tabla, columna in [
+        ("cliente", "latitud"), ("cliente", "longitud"),
+        ("entrega", "latitud_fin"), ("entrega", "longitud_fin"),
+        ("ruta_entrega", "latitud_inicio"), ("ruta_entrega", "longitud_inicio"),
+        ("ruta_entrega", "latitud_fin"), ("ruta_entrega", "longitud_fin"),
+    ]:
+        agregar_columna(conn, tabla, columna, "DOUBLE PRECISION")
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_cliente_latitud_longitud ON cliente (latitud, longitud)"
+    ))
@@ -0,0 +1,16 @@
+"""
+Relleno de las coordenadas numéricas de las filas existentes.
+
+Va en una migración aparte porque tiene que ver las columnas de la migración
+anterior ya confirmadas. No es transaccional: con la conexión en autocommit
+cada lote de rellenar_coordenadas() se confirma por separado, sin retener
+los locks de filas de toda la tabla; si se corta, repetirla sólo completa
+lo que falta.
+"""
+from app.services.coordenadas_service import rellenar_coordenadas
+
+TRANSACCIONAL = False
+
+
+def aplicar(conn):
+    print(rellenar_coordenadas(conn))
@@ -0,0 +1,6 @@
+"""Columna distribuidor.ubicacion_actualizada_en (hora del último GPS aplicado)."""
+from app.migraciones.migrador import agregar_columna
+
+
+def aplicar(conn):
+    agregar_columna(conn, "distribuidor", "ubicacion_actualizada_en", "TIMESTAMP")
@@ -0,0 +1,27 @@
+"""
+Índice único de cliente.email.
+
+Si hay emails duplicados la migración falla con la lista de duplicados y no
+queda registrada: el modelo declara el email único y el registro de
+clientes confía en el índice, así que no se sigue sin él. Hay que unificar
+o corregir esas cuentas y volver a ejecutar `python -m app.migraciones`.
+"""
+from sqlalchemy import text
+
+# Cuántos emails duplicados se muestran en el error
+MAX_LISTADOS = 50
+
+
+def aplicar(conn):
+    duplicados = conn.execute(text(
+        "SELECT email, COUNT(*) FROM cliente GROUP BY email HAVING COUNT(*) > 1 ORDER BY email"
+    )).all()
+    if duplicados:
+        listado = "\n".join(f"  {email} ({cantidad} clientes)" for email, cantidad in duplicados[:MAX_LISTADOS])
+        if len(duplicados) > MAX_LISTADOS:
+            listado += f"\n  ... y {len(duplicados) - MAX_LISTADOS} más"
+        raise RuntimeError(
+            f"No se puede crear ix_cliente_email: hay {len(duplicados)} email(s) de cliente "
+            f"duplicados; corregirlos y volver a migrar:\n{listado}"
+        )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_cliente_email ON cliente (email)"))
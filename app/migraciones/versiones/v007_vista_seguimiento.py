@@ -0,0 +1,11 @@
+"""
+Vista vista_seguimiento_entrega.
+
+Se define a partir de los modelos: si cambian las columnas que usa, una
+migración nueva tiene que volver a llamar a crear_vista_seguimiento().
+"""
+from app.models.seguimiento_model import crear_vista_seguimiento
+
+
+def aplicar(conn):
+    crear_vista_seguimiento(conn)
@@ -0,0 +1,6 @@
+"""historial_ubicacion particionada por día (copia las filas de la tabla anterior)."""
+from app.services.historial_service import convertir_historial_sin_particion
+
+
+def aplicar(conn):
+    convertir_historial_sin_particion(conn)
@@ -0,0 +1,43 @@
+"""
+Índices de las columnas por las que filtran las rutas.
+
+En PostgreSQL se crean con CREATE INDEX CONCURRENTLY para no bloquear las
+escrituras mientras se construyen, lo que no puede ir dentro de una
+transacción. Un CONCURRENTLY interrumpido deja el índice inválido: se borra
+y se vuelve a crear en el siguiente intento.
+"""
+from sqlalchemy import text
+
+TRANSACCIONAL = False
+
+# (nombre, tabla, columnas, condición del índice parcial)
+INDICES = [
+    ("ix_asignacion_entrega_distribuidor_estado", "asignacion_entrega", "id_distribuidor, estado", None),
+    ("ix_asignacion_entrega_distribuidor_fecha", "asignacion_entrega", "id_distribuidor, fecha_asignacion, id", None),
+    ("ix_asignacion_entrega_ruta_estado", "asignacion_entrega", "ruta_id, estado", None),
+    ("ix_asignacion_entrega_pendientes", "asignacion_entrega", "id_distribuidor, fecha_asignacion", "estado = 'pendiente'"),
+    ("ix_pedido_asignado_asignacion", "pedido_asignado", "asignacion_id", None),
+    ("ix_pedido_asignado_pedido", "pedido_asignado", "pedido_id", None),
+    ("ix_asignacion_vehiculo_distribuidor", "asignacion_vehiculo", "id_distribuidor", None),
+    ("ix_entrega_asignacion_estado", "entrega", "asignacion_id, estado", None),
+    ("ix_entrega_cliente_fecha", "entrega", "cliente_id, fecha_hora_reg", None),
+    ("ix_pedido_cliente_fecha", "pedido", "cliente_id, fecha_pedido, id", None),
+    ("ix_pedido_pendientes", "pedido", "fecha_pedido", "estado = 'pendiente'"),
+    ("ix_detalle_pedido_pedido", "detalle_pedido", "pedido_id", None),
+]
+
+
+def aplicar(conn):
+    postgres = conn.dialect.name == "postgresql"
+    for nombre, tabla, columnas, condicion in INDICES:
+        if postgres:
+            invalido = conn.execute(text(
+                "SELECT NOT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(:nombre)"
+            ), {"nombre": nombre}).scalar()
+            if invalido:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY {nombre}"))
+        concurrente = "CONCURRENTLY " if postgres else ""
+        donde = f" WHERE {condicion}" if condicion else ""
+        conn.execute(text(
+            f"CREATE INDEX {concurrente}IF NOT EXISTS {nombre} ON {tabla} ({columnas}){donde}"
+        ))
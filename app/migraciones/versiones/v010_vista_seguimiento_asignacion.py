@@ -0,0 +1,6 @@
+"""Vista vista_seguimiento_entrega con la columna asignacion_id."""
+from app.models.seguimiento_model import crear_vista_seguimiento
+
+
+def aplicar(conn):
+    crear_vista_seguimiento(conn)
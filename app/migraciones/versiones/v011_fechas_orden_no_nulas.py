@@ -0,0 +1,24 @@
+"""
+fecha_pago, fecha_pedido y fecha_asignacion NOT NULL (columnas de orden de la paginación por cursor).
+
+Con un valor NULL el cursor de la página quedaba en NULL y `col < NULL`
+no encuentra nada: se perdían todas las filas siguientes. Las filas sin
+fecha reciben 1970-01-01, así que quedan al final de los listados como las
+más antiguas. En PostgreSQL después se agrega la restricción NOT NULL; en
+SQLite no se puede sin recrear la tabla, pero las BD nuevas ya la tienen
+(v001 crea las tablas desde los modelos) y el ORM siempre pone la fecha.
+"""
+from sqlalchemy import text
+
+COLUMNAS = [
+    ("pago", "fecha_pago"),
+    ("pedido", "fecha_pedido"),
+    ("asignacion_entrega", "fecha_asignacion"),
+]
+
+
+def aplicar(conn):
+    for tabla, columna in COLUMNAS:
+        conn.execute(text(f"UPDATE {tabla} SET {columna} = '1970-01-01 00:00:00' WHERE {columna} IS NULL"))
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN {columna} SET NOT NULL"))
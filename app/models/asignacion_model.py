@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, TIMESTAMP, String
+from sqlalchemy import Column, ForeignKey, TIMESTAMP, String, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,9 +7,23 @@ from app.database import Base
 
 class AsignacionEntrega(Base):
     __tablename__ = "asignacion_entrega"
+    __table_args__ = (
+        # Conteos y filtros por estado del distribuidor
+        Index("ix_asignacion_entrega_distribuidor_estado", "id_distribuidor", "estado"),
+        # Listado paginado (fecha_asignacion DESC, id DESC) y asignaciones de hoy
+        Index("ix_asignacion_entrega_distribuidor_fecha", "id_distribuidor", "fecha_asignacion", "id"),
+        # Otras asignaciones pendientes/aceptadas de la misma ruta
+        Index("ix_asignacion_entrega_ruta_estado", "ruta_id", "estado"),
+        # Pendientes del distribuidor y limpieza de las obsoletas (pocas filas del total)
+        Index(
+            "ix_asignacion_entrega_pendientes", "id_distribuidor", "fecha_asignacion",
+            postgresql_where=text("estado = 'pendiente'"),
+            sqlite_where=text("estado = 'pendiente'"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    fecha_asignacion = Column(TIMESTAMP, default=datetime.utcnow)
+    fecha_asignacion = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
     id_distribuidor = Column(UUID(as_uuid=True), ForeignKey("distribuidor.id", ondelete="SET NULL"))
     ruta_id = Column(UUID(as_uuid=True), ForeignKey("ruta_entrega.ruta_id", ondelete="SET NULL"))
     estado = Column(String(20), default="pendiente")  # pendiente, aceptada, rechazada
@@ -24,9 +38,14 @@ class AsignacionEntrega(Base):
         back_populates="asignacion",
         cascade="all, delete-orphan"
     )
+    ruta = relationship("RutaEntrega")
 
 class PedidoAsignado(Base):
     __tablename__ = "pedido_asignado"
+    __table_args__ = (
+        Index("ix_pedido_asignado_asignacion", "asignacion_id"),
+        Index("ix_pedido_asignado_pedido", "pedido_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     pedido_id = Column(UUID(as_uuid=True), ForeignKey("pedido.id", ondelete="CASCADE"))
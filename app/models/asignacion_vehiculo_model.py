@@ -1,9 +1,13 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 
 class AsignacionVehiculo(Base):
     __tablename__ = "asignacion_vehiculo"
+    # La clave primaria empieza por id_vehiculo; no sirve para buscar por distribuidor
+    __table_args__ = (
+        Index("ix_asignacion_vehiculo_distribuidor", "id_distribuidor"),
+    )
 
     id_vehiculo = Column(UUID(as_uuid=True), ForeignKey("vehiculo.id", ondelete="CASCADE"), primary_key=True)
     id_distribuidor = Column(UUID(as_uuid=True), ForeignKey("distribuidor.id", ondelete="CASCADE"), primary_key=True)
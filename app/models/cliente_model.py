@@ -1,16 +1,36 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Float, Index
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import validates
 import uuid
 from app.database import Base
+from app.geo.coordenadas import parsear_coordenadas
 
 class Cliente(Base):
     __tablename__ = "cliente"
+    __table_args__ = (
+        Index("ix_cliente_latitud_longitud", "latitud", "longitud"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String(100), nullable=False)
     apellido = Column(String(100), nullable=False)
     telefono = Column(String(20), nullable=False)
-    email = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False, unique=True, index=True)
     direccion = Column(String, nullable=False)
     coordenadas = Column(String(100), nullable=True)
+    # Copia numérica de `coordenadas`, sincronizada al asignarla
+    latitud = Column(Float, nullable=True)
+    longitud = Column(Float, nullable=True)
     password = Column(String(255), nullable=False)
+
+    @validates("coordenadas")
+    def _sincronizar_coordenadas(self, key, valor):
+        self.latitud, self.longitud = parsear_coordenadas(valor) or (None, None)
+        return valor
+
+    @property
+    def posicion(self):
+        """Tupla (lat, lon) o None si el cliente no tiene coordenadas válidas."""
+        if self.latitud is None or self.longitud is None:
+            return None
+        return self.latitud, self.longitud
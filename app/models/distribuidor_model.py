@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Float
+from sqlalchemy import Column, String, Boolean, Float, TIMESTAMP
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from app.database import Base
@@ -16,5 +16,6 @@ class Distribuidor(Base):
     password = Column(String(255), nullable=False)
     latitud = Column(Float, nullable=True)
     longitud = Column(Float, nullable=True)
+    ubicacion_actualizada_en = Column(TIMESTAMP, nullable=True)  # hora del último GPS aplicado
     activo = Column(Boolean, default=True)
     estado = Column(String(20), default="disponible")  # disponible, ocupado, inactivo
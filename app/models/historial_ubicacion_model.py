@@ -0,0 +1,42 @@
+from sqlalchemy import Column, ForeignKey, Float, TIMESTAMP, Index, Integer, Date, Text
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+from app.database import Base
+
+class HistorialUbicacion(Base):
+    """
+    Recorrido GPS de los distribuidores (sólo inserciones).
+
+    En PostgreSQL la tabla está particionada por día de `registrado_en`; las
+    particiones las crea historial_service a medida que llegan posiciones y
+    se eliminan completas al compactar los días antiguos.
+    """
+    __tablename__ = "historial_ubicacion"
+    __table_args__ = (
+        Index("ix_historial_ubicacion_distribuidor_fecha", "distribuidor_id", "registrado_en"),
+        {"postgresql_partition_by": "RANGE (registrado_en)"},
+    )
+
+    # La clave de partición tiene que formar parte de la clave primaria
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    registrado_en = Column(TIMESTAMP, primary_key=True)  # hora del GPS
+    distribuidor_id = Column(UUID(as_uuid=True), ForeignKey("distribuidor.id", ondelete="CASCADE"), nullable=False)
+    latitud = Column(Float, nullable=False)
+    longitud = Column(Float, nullable=False)
+    recibido_en = Column(TIMESTAMP, default=datetime.utcnow)
+
+class RecorridoCompactado(Base):
+    """Recorrido de un distribuidor en un día ya compactado (Douglas–Peucker + polyline)."""
+    __tablename__ = "recorrido_compactado"
+
+    distribuidor_id = Column(UUID(as_uuid=True), ForeignKey("distribuidor.id", ondelete="CASCADE"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    polyline = Column(Text, nullable=False)
+    # Segundos desde `inicio` de cada punto conservado, separados por comas
+    tiempos = Column(Text, nullable=False)
+    inicio = Column(TIMESTAMP, nullable=False)
+    fin = Column(TIMESTAMP, nullable=False)
+    puntos_originales = Column(Integer, nullable=False)
+    puntos = Column(Integer, nullable=False)
+    tolerancia_m = Column(Float, nullable=False)
@@ -11,6 +11,6 @@ class Pago(Base):
     metodo_pago = Column(String(50), nullable=False)  # QR, Transferencia, Efectivo
     monto = Column(Numeric(10, 2), nullable=False)
     estado = Column(String(50), default="pendiente")
-    fecha_pago = Column(TIMESTAMP, default=datetime.utcnow)
+    fecha_pago = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
     transaccion_id = Column(String(100), nullable=True)
     pedido_id = Column(UUID(as_uuid=True), ForeignKey("pedido.id", ondelete="CASCADE"), unique=True)
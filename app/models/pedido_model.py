@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, String, Numeric, TIMESTAMP, Integer
+from sqlalchemy import Column, ForeignKey, String, Numeric, TIMESTAMP, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -7,9 +7,19 @@ from app.database import Base
 
 class Pedido(Base):
     __tablename__ = "pedido"
+    __table_args__ = (
+        # Historial del cliente (fecha_pedido DESC, id DESC)
+        Index("ix_pedido_cliente_fecha", "cliente_id", "fecha_pedido", "id"),
+        # Pedidos por asignar: los pendientes son una fracción pequeña de la tabla
+        Index(
+            "ix_pedido_pendientes", "fecha_pedido",
+            postgresql_where=text("estado = 'pendiente'"),
+            sqlite_where=text("estado = 'pendiente'"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    fecha_pedido = Column(TIMESTAMP, default=datetime.utcnow)
+    fecha_pedido = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
     estado = Column(String(50), default="pendiente")
     total = Column(Numeric(10, 2), default=0.0)
     instrucciones_entrega = Column(String, nullable=True)
@@ -19,6 +29,9 @@ class Pedido(Base):
 
 class DetallePedido(Base):
     __tablename__ = "detalle_pedido"
+    __table_args__ = (
+        Index("ix_detalle_pedido_pedido", "pedido_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     cantidad = Column(Integer, nullable=False)
@@ -6,12 +6,13 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
-    Column, String, ForeignKey, Numeric, TIMESTAMP, Integer, UniqueConstraint
+    Column, String, ForeignKey, Numeric, TIMESTAMP, Integer, UniqueConstraint, Float, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from app.database import Base
+from app.geo.coordenadas import parsear_coordenadas
 from app.models.asignacion_model import AsignacionEntrega
 
 
@@ -27,6 +28,11 @@ class RutaEntrega(Base):
     coordenadas_fin    = Column(String(100), nullable=False)
     distancia          = Column(Numeric(10, 2), nullable=True) 
     tiempo_estimado    = Column(String(50),  nullable=True)    
+    # Copias numéricas de las coordenadas de texto
+    latitud_inicio     = Column(Float, nullable=True)
+    longitud_inicio    = Column(Float, nullable=True)
+    latitud_fin        = Column(Float, nullable=True)
+    longitud_fin       = Column(Float, nullable=True)
 
     entregas = relationship(
         "Entrega",
@@ -35,6 +41,27 @@ class RutaEntrega(Base):
         passive_deletes=True,
     )
 
+    @validates("coordenadas_inicio", "coordenadas_fin")
+    def _sincronizar_coordenadas(self, key, valor):
+        lat, lon = parsear_coordenadas(valor) or (None, None)
+        if key == "coordenadas_inicio":
+            self.latitud_inicio, self.longitud_inicio = lat, lon
+        else:
+            self.latitud_fin, self.longitud_fin = lat, lon
+        return valor
+
+    @property
+    def posicion_inicio(self):
+        if self.latitud_inicio is None or self.longitud_inicio is None:
+            return None
+        return self.latitud_inicio, self.longitud_inicio
+
+    @property
+    def posicion_fin(self):
+        if self.latitud_fin is None or self.longitud_fin is None:
+            return None
+        return self.latitud_fin, self.longitud_fin
+
 
 class Entrega(Base):
     """
@@ -45,11 +72,17 @@ class Entrega(Base):
     __tablename__ = "entrega"
     __table_args__ = (
         UniqueConstraint("pedido_id", name="uq_entrega_pedido"),  
+        # Entregas de una asignación, por estado (también en los JOIN con asignacion_entrega)
+        Index("ix_entrega_asignacion_estado", "asignacion_id", "estado"),
+        # Seguimiento del cliente (vista_seguimiento_entrega, fecha_hora_reg DESC)
+        Index("ix_entrega_cliente_fecha", "cliente_id", "fecha_hora_reg"),
     )
 
     id_entrega        = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     fecha_hora_reg    = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
     coordenadas_fin   = Column(String(100), nullable=True)         
+    latitud_fin       = Column(Float, nullable=True)
+    longitud_fin      = Column(Float, nullable=True)
     estado            = Column(String(50), default="pendiente")   
     observaciones     = Column(String, nullable=True)
     orden_entrega     = Column(Integer, nullable=False)            
@@ -86,3 +119,14 @@ class Entrega(Base):
         "AsignacionEntrega",
         back_populates="entregas"
     )
+
+    @validates("coordenadas_fin")
+    def _sincronizar_coordenadas(self, key, valor):
+        self.latitud_fin, self.longitud_fin = parsear_coordenadas(valor) or (None, None)
+        return valor
+
+    @property
+    def posicion_fin(self):
+        if self.latitud_fin is None or self.longitud_fin is None:
+            return None
+        return self.latitud_fin, self.longitud_fin
@@ -0,0 +1,71 @@
+"""
+Vista `vista_seguimiento_entrega`: una fila por entrega con su pedido,
+distribuidor y ruta ya resueltos, para que el seguimiento de los clientes
+se sirva con una sola consulta.
+
+Se mapea en un MetaData propio para que `Base.metadata.create_all` no la
+cree como tabla; la crea `crear_vista_seguimiento()` desde las migraciones,
+a partir de la misma consulta que define sus columnas.
+"""
+from sqlalchemy import Column, MetaData, Table, select, text
+
+from app.models.asignacion_model import AsignacionEntrega
+from app.models.distribuidor_model import Distribuidor
+from app.models.pedido_model import Pedido
+from app.models.ruta_entrega_model import Entrega, RutaEntrega
+
+metadata_vistas = MetaData()
+
+_entrega = Entrega.__table__
+_asignacion = AsignacionEntrega.__table__
+_distribuidor = Distribuidor.__table__
+_ruta = RutaEntrega.__table__
+_pedido = Pedido.__table__
+
+consulta_seguimiento = (
+    select(
+        _entrega.c.id_entrega,
+        _entrega.c.cliente_id,
+        _entrega.c.estado,
+        _entrega.c.orden_entrega,
+        _entrega.c.coordenadas_fin,
+        _entrega.c.fecha_hora_reg,
+        _entrega.c.observaciones,
+        _entrega.c.pedido_id,
+        _pedido.c.estado.label("pedido_estado"),
+        # NULL si la entrega no tiene asignación (el listado las excluye)
+        _asignacion.c.id.label("asignacion_id"),
+        _distribuidor.c.id.label("distribuidor_id"),
+        _distribuidor.c.nombre.label("distribuidor_nombre"),
+        _distribuidor.c.apellido.label("distribuidor_apellido"),
+        _distribuidor.c.telefono.label("distribuidor_telefono"),
+        _distribuidor.c.estado.label("distribuidor_estado"),
+        _distribuidor.c.latitud.label("distribuidor_latitud"),
+        _distribuidor.c.longitud.label("distribuidor_longitud"),
+        _ruta.c.ruta_id,
+        _ruta.c.coordenadas_inicio.label("ruta_coordenadas_inicio"),
+        _ruta.c.coordenadas_fin.label("ruta_coordenadas_fin"),
+        _ruta.c.distancia.label("ruta_distancia"),
+        _ruta.c.tiempo_estimado.label("ruta_tiempo_estimado"),
+    )
+    .select_from(
+        _entrega
+        .outerjoin(_pedido, _pedido.c.id == _entrega.c.pedido_id)
+        .outerjoin(_asignacion, _asignacion.c.id == _entrega.c.asignacion_id)
+        .outerjoin(_distribuidor, _distribuidor.c.id == _asignacion.c.id_distribuidor)
+        .outerjoin(_ruta, _ruta.c.ruta_id == _asignacion.c.ruta_id)
+    )
+)
+
+vista_seguimiento_entrega = Table(
+    "vista_seguimiento_entrega",
+    metadata_vistas,
+    *[Column(c.key, c.type) for c in consulta_seguimiento.selected_columns],
+)
+
+
+def crear_vista_seguimiento(conn):
+    """(Re)crea la vista; se llama dentro de una transacción."""
+    definicion = consulta_seguimiento.compile(dialect=conn.dialect)
+    conn.execute(text("DROP VIEW IF EXISTS vista_seguimiento_entrega"))
+    conn.execute(text(f"CREATE VIEW vista_seguimiento_entrega AS {definicion}"))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
@@ -11,6 +11,7 @@ from app.schemas.asignacion_schema import (
 )
 from app.services import asignacion_service
 from app.services.asignacion_service import asignacion_automatica_propuesta
+from app.services.paginacion_service import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
 
 router = APIRouter(
     prefix="/asignaciones-entrega",
@@ -27,8 +28,19 @@ def get_db():
 
 
 @router.get("", response_model=list[AsignacionEntregaOut])
-def listar_asignaciones(db: Session = Depends(get_db)):
-    return asignacion_service.listar_asignaciones(db)
+def listar_asignaciones(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        filas, siguiente = asignacion_service.listar_asignaciones(db, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return filas
 
 @router.get("/{asignacion_id}", response_model=AsignacionEntregaOut)
 def obtener_asignacion(asignacion_id: UUID, db: Session = Depends(get_db)):
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-import bcrypt
 from uuid import UUID
 
 from app.database import SessionLocal
 from app.models.cliente_model import Cliente
 from app.models.distribuidor_model import Distribuidor
+from app.auth import contrasenas
+from app.auth.cache_principales import ROLES, cache_principales
+from app.auth.credenciales import buscar_credenciales
 from app.auth.jwt_utils import crear_token
 from app.schemas.auth_schema import LoginRequest
 from app.auth.dependencies import get_current_distribuidor, get_current_cliente
@@ -22,22 +25,36 @@ def get_db():
     finally:
         db.close()
 
+def _guardar_rehash(db: Session, credenciales, hash_nuevo: str):
+    # Sólo si nadie cambió la contraseña mientras se calculaba el hash nuevo
+    modelo = ROLES[credenciales.rol]
+    db.query(modelo).filter(
+        modelo.id == credenciales.id, modelo.password == credenciales.password
+    ).update({"password": hash_nuevo}, synchronize_session=False)
+    db.commit()
+    # El UPDATE directo no pasa por los eventos del ORM
+    cache_principales.invalidar(credenciales.rol, credenciales.id, credenciales.email)
+
 @router.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
     email = request.email
     password = request.password
 
-    user = db.query(Cliente).filter(Cliente.email == email).first()
-    role = "cliente"
-
-    if not user:
-        user = db.query(Distribuidor).filter(Distribuidor.email == email).first()
-        role = "distribuidor"
+    credenciales = await run_in_threadpool(buscar_credenciales, db, email)
 
-    if not user or not bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+    if not credenciales or not await contrasenas.verificar(password, credenciales.password):
         raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
 
-    token = crear_token({"sub": user.email, "role": role})
+    if contrasenas.necesita_rehash(credenciales.password):
+        # El costo configurado cambió: se aprovecha que tenemos la contraseña en claro
+        try:
+            hash_nuevo = await contrasenas.hashear(password)
+            await run_in_threadpool(_guardar_rehash, db, credenciales, hash_nuevo)
+        except Exception as e:
+            await run_in_threadpool(db.rollback)
+            print(f"No se pudo actualizar el hash de {email}: {e}")
+
+    token = crear_token({"sub": credenciales.email, "role": credenciales.rol})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/verify-distribuidor", dependencies=[Depends(security)])
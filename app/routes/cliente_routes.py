@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
 
-from app.database import SessionLocal
+from app.database import SessionLocal, AsyncSessionLectura, get_async_db_lectura
 from app.schemas.cliente_schema import ClienteCreate, ClienteUpdate, ClienteOut
-from app.services import cliente_service
-from app.auth.dependencies import get_current_cliente
+from app.services import cliente_service, seguimiento_service
+from app.services.pedido_service import historial_pedidos_cliente_async
+from app.services.paginacion_service import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+from app.auth import contrasenas
+from app.auth.dependencies import get_current_cliente, get_current_cliente_async, cliente_desde_token_async
 from app.models.cliente_model import Cliente
 
+# Segundos sin mensajes tras los que el stream SSE envía un comentario
+LATIDO_SSE_S = float(os.getenv("SSE_LATIDO_S", "20"))
+
 router = APIRouter(
     prefix="/clientes",
     tags=["Clientes"]
@@ -21,12 +35,27 @@ def get_db():
         db.close()
 
 @router.post("", response_model=ClienteOut)
-def crear_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
-    return cliente_service.crear_cliente(db, cliente)
+async def crear_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
+    password_hash = await contrasenas.hashear(cliente.password)
+    try:
+        return await run_in_threadpool(cliente_service.crear_cliente, db, cliente, password_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("", response_model=list[ClienteOut])
-def listar_clientes(db: Session = Depends(get_db)):
-    return cliente_service.listar_clientes(db)
+def listar_clientes(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        filas, siguiente = cliente_service.listar_clientes(db, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return filas
 
 @router.get("/perfil", response_model=ClienteOut)
 def obtener_perfil_cliente(cliente_actual: Cliente = Depends(get_current_cliente)):
@@ -37,166 +66,57 @@ def obtener_perfil_cliente(cliente_actual: Cliente = Depends(get_current_cliente
     return cliente_actual
 
 @router.get("/mis-pedidos")
-def obtener_mis_pedidos(
-    cliente_actual: Cliente = Depends(get_current_cliente),
-    db: Session = Depends(get_db)
+async def obtener_mis_pedidos(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    compacto: bool = False,
+    cliente_actual: Cliente = Depends(get_current_cliente_async),
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
     """
-    Obtiene el historial completo de pedidos del cliente autenticado
+    Obtiene el historial de pedidos del cliente autenticado, paginado por
+    cursor (cabecera X-Next-Cursor). Con compacto=true cada pedido trae sólo
+    total, cantidad de productos y estado del pago, sin las líneas.
     """
-    from app.models.pedido_model import Pedido, DetallePedido
-    from app.models.producto_model import Producto
-    from app.models.pago_model import Pago
-    
-    pedidos = db.query(Pedido).filter(
-        Pedido.cliente_id == cliente_actual.id
-    ).order_by(Pedido.fecha_pedido.desc()).all()
-    
-    if not pedidos:
+    try:
+        pedidos, total_pedidos, siguiente = await historial_pedidos_cliente_async(
+            db, cliente_actual.id, limite, cursor, compacto
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+
+    if not pedidos and not cursor:
         return {
             "pedidos": [],
             "total_pedidos": 0,
             "mensaje": "No tienes pedidos registrados"
         }
-    
-    resultado = []
-    for pedido in pedidos:
-        # Obtener detalles del pedido
-        detalles = db.query(DetallePedido).filter(
-            DetallePedido.pedido_id == pedido.id
-        ).all()
-        
-        productos = []
-        total_pedido = 0
-        
-        for detalle in detalles:
-            producto = db.query(Producto).filter(
-                Producto.id == detalle.producto_id
-            ).first()
-            if producto:
-                subtotal = float(producto.precio) * detalle.cantidad
-                total_pedido += subtotal
-                productos.append({
-                    "producto_id": str(producto.id),
-                    "nombre": producto.nombre,
-                    "precio": float(producto.precio),
-                    "cantidad": detalle.cantidad,
-                    "subtotal": subtotal
-                })
-        
-        # Obtener información del pago
-        pago = db.query(Pago).filter(Pago.pedido_id == pedido.id).first()
-        info_pago = None
-        if pago:
-            info_pago = {
-                "pago_id": str(pago.id_pago),
-                "estado": pago.estado,
-                "metodo_pago": pago.metodo_pago,
-                "fecha_pago": pago.fecha_pago
-            }
-        
-        pedido_data = {
-            "pedido_id": str(pedido.id),
-            "fecha_pedido": pedido.fecha_pedido,
-            "estado": pedido.estado,
-            "total": total_pedido,
-            "productos": productos,
-            "pago": info_pago
-        }
-        resultado.append(pedido_data)
-    
+
     return {
-        "pedidos": resultado,
-        "total_pedidos": len(resultado)
+        "pedidos": pedidos,
+        "total_pedidos": total_pedidos
     }
 
 @router.get("/mis-entregas")
-def obtener_mis_entregas(
-    cliente_actual: Cliente = Depends(get_current_cliente),
-    db: Session = Depends(get_db)
+async def obtener_mis_entregas(
+    cliente_actual: Cliente = Depends(get_current_cliente_async),
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
     """
     Obtiene las entregas del cliente con información del distribuidor y seguimiento
     """
-    from app.models.ruta_entrega_model import Entrega
-    from app.models.asignacion_model import AsignacionEntrega
-    from app.models.distribuidor_model import Distribuidor
-    from app.models.pedido_model import Pedido, DetallePedido
-    from app.models.producto_model import Producto
-    
-    entregas = db.query(Entrega).join(AsignacionEntrega).filter(
-        Entrega.cliente_id == cliente_actual.id
-    ).order_by(Entrega.fecha_hora_reg.desc()).all()
-    
-    if not entregas:
+    resultado = await seguimiento_service.entregas_cliente_async(db, cliente_actual.id)
+
+    if not resultado:
         return {
             "entregas": [],
             "total_entregas": 0,
             "mensaje": "No tienes entregas registradas"
         }
-    
-    resultado = []
-    for entrega in entregas:
-        # Obtener asignación y distribuidor
-        asignacion = db.query(AsignacionEntrega).filter(
-            AsignacionEntrega.id == entrega.asignacion_id
-        ).first()
-        
-        distribuidor = None
-        ubicacion_distribuidor = None
-        
-        if asignacion:
-            distribuidor = db.query(Distribuidor).filter(
-                Distribuidor.id == asignacion.id_distribuidor
-            ).first()
-            
-            # Si la entrega está pendiente, mostrar ubicación del distribuidor
-            if entrega.estado == "pendiente" and distribuidor:
-                # Usar siempre la ubicación actual del perfil del distribuidor
-                ubicacion_distribuidor = f"{distribuidor.latitud},{distribuidor.longitud}"
-        
-        # Obtener información del pedido y productos
-        pedido_info = None
-        if entrega.pedido_id:
-            pedido = db.query(Pedido).filter(Pedido.id == entrega.pedido_id).first()
-            if pedido:
-                detalles = db.query(DetallePedido).filter(
-                    DetallePedido.pedido_id == pedido.id
-                ).all()
-                
-                productos = []
-                for detalle in detalles:
-                    producto = db.query(Producto).filter(
-                        Producto.id == detalle.producto_id
-                    ).first()
-                    if producto:
-                        productos.append({
-                            "nombre": producto.nombre,
-                            "cantidad": detalle.cantidad
-                        })
-                
-                pedido_info = {
-                    "pedido_id": str(pedido.id),
-                    "estado_pedido": pedido.estado,
-                    "productos": productos
-                }
-        
-        entrega_data = {
-            "entrega_id": str(entrega.id_entrega),
-            "fecha_registro": entrega.fecha_hora_reg,
-            "estado": entrega.estado,
-            "orden_entrega": entrega.orden_entrega,
-            "coordenadas_destino": entrega.coordenadas_fin,
-            "observaciones": entrega.observaciones,
-            "pedido": pedido_info,
-            "distribuidor": {
-                "nombre": f"{distribuidor.nombre} {distribuidor.apellido}" if distribuidor else "No asignado",
-                "telefono": distribuidor.telefono if distribuidor else None,
-                "ubicacion_actual": ubicacion_distribuidor if entrega.estado == "pendiente" else None
-            } if distribuidor else None
-        }
-        resultado.append(entrega_data)
-    
+
     return {
         "entregas": resultado,
         "total_entregas": len(resultado),
@@ -205,87 +125,111 @@ def obtener_mis_entregas(
     }
 
 @router.get("/seguimiento-entrega/{entrega_id}")
-def seguimiento_entrega(
+async def seguimiento_entrega(
     entrega_id: UUID,
-    cliente_actual: Cliente = Depends(get_current_cliente),
-    db: Session = Depends(get_db)
+    cliente_actual: Cliente = Depends(get_current_cliente_async),
+    db: AsyncSession = Depends(get_async_db_lectura)
 ):
     """
     Obtiene información detallada de seguimiento para una entrega específica
     """
-    from app.models.ruta_entrega_model import Entrega, RutaEntrega
-    from app.models.asignacion_model import AsignacionEntrega
-    from app.models.distribuidor_model import Distribuidor
-    
-    entrega = db.query(Entrega).filter(
-        Entrega.id_entrega == entrega_id,
-        Entrega.cliente_id == cliente_actual.id
-    ).first()
-    
-    if not entrega:
+    seguimiento = await seguimiento_service.seguimiento_entrega_async(db, cliente_actual.id, entrega_id)
+    if not seguimiento:
         raise HTTPException(
             status_code=404, 
             detail="Entrega no encontrada o no pertenece a este cliente"
         )
-    
-    # Obtener información del distribuidor y asignación
-    asignacion = db.query(AsignacionEntrega).filter(
-        AsignacionEntrega.id == entrega.asignacion_id
-    ).first()
-    
-    distribuidor = None
-    ruta = None
-    ubicacion_distribuidor = None
-    
-    if asignacion:
-        distribuidor = db.query(Distribuidor).filter(
-            Distribuidor.id == asignacion.id_distribuidor
-        ).first()
-        
-        ruta = db.query(RutaEntrega).filter(
-            RutaEntrega.ruta_id == asignacion.ruta_id
-        ).first()
-        
-        # Obtener ubicación actual del distribuidor si la entrega está pendiente
-        if entrega.estado == "pendiente" and distribuidor:
-            # Usar siempre la ubicación actual del perfil del distribuidor
-            ubicacion_distribuidor = f"{distribuidor.latitud},{distribuidor.longitud}"
-    
-    return {
-        "entrega": {
-            "entrega_id": str(entrega.id_entrega),
-            "estado": entrega.estado,
-            "orden_entrega": entrega.orden_entrega,
-            "coordenadas_destino": entrega.coordenadas_fin,
-            "fecha_registro": entrega.fecha_hora_reg,
-            "observaciones": entrega.observaciones
-        },
-        "distribuidor": {
-            "nombre": f"{distribuidor.nombre} {distribuidor.apellido}" if distribuidor else "No asignado",
-            "telefono": distribuidor.telefono if distribuidor else None,
-            "estado": distribuidor.estado if distribuidor else None,
-            "ubicacion_actual": ubicacion_distribuidor if entrega.estado == "pendiente" else None
-        } if distribuidor else None,
-        "ruta": {
-            "coordenadas_inicio": ruta.coordenadas_inicio if ruta else None,
-            "coordenadas_fin": ruta.coordenadas_fin if ruta else None,
-            "distancia": float(ruta.distancia) if ruta and ruta.distancia else None,
-            "tiempo_estimado": ruta.tiempo_estimado if ruta else None
-        } if ruta else None,
-        "seguimiento": {
-            "puede_rastrear": entrega.estado == "pendiente",
-            "mensaje": _obtener_mensaje_seguimiento(entrega.estado)
-        }
-    }
+    return seguimiento
 
-def _obtener_mensaje_seguimiento(estado: str) -> str:
-    """Obtiene un mensaje descriptivo del estado de la entrega"""
-    mensajes = {
-        "pendiente": "Tu pedido está en camino. El distribuidor se dirigirá a tu ubicación pronto.",
-        "entregado": "¡Tu pedido ha sido entregado exitosamente!",
-        "fallido": "Hubo un problema con la entrega. Contacta con soporte."
-    }
-    return mensajes.get(estado, f"Estado desconocido: {estado}")
+async def _cliente_token(token: str):
+    async with AsyncSessionLectura() as db:
+        return await cliente_desde_token_async(token, db)
+
+@router.websocket("/ws/seguimiento-entrega/{entrega_id}")
+async def seguimiento_entrega_en_vivo(websocket: WebSocket, entrega_id: UUID, token: str = ""):
+    """
+    Seguimiento en vivo de una entrega. Envía el estado inicial ("inicial") y
+    después cada cambio de ubicación del distribuidor ("ubicacion") y de
+    estado de la entrega ("estado") sin volver a consultar la BD. La conexión
+    se cierra cuando la entrega deja de estar pendiente.
+
+    El token JWT del cliente va en el parámetro `token`, ya que los
+    navegadores no permiten cabeceras propias en WebSocket.
+    """
+    cliente = await _cliente_token(token)
+    seguimiento = seguimiento_service.SeguimientoEnVivo(cliente.id, entrega_id) if cliente else None
+    if seguimiento is None or not await seguimiento.abrir():
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    recepcion = siguiente = None
+    try:
+        # Se escucha también al cliente para enterarse de que se desconectó
+        recepcion = asyncio.ensure_future(websocket.receive_text())
+        siguiente = asyncio.ensure_future(seguimiento.siguiente())
+        while True:
+            hechos, _ = await asyncio.wait({recepcion, siguiente}, return_when=asyncio.FIRST_COMPLETED)
+            if recepcion in hechos:
+                recepcion.result()
+                recepcion = asyncio.ensure_future(websocket.receive_text())
+            if siguiente not in hechos:
+                continue
+            mensaje = siguiente.result()
+            if mensaje is None:
+                break
+            await websocket.send_json(jsonable_encoder(mensaje))
+            siguiente = asyncio.ensure_future(seguimiento.siguiente())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        seguimiento.cerrar()
+        for tarea in (recepcion, siguiente):
+            if tarea is not None:
+                tarea.cancel()
+
+@router.get("/seguimiento-entrega/{entrega_id}/eventos")
+async def seguimiento_entrega_eventos(entrega_id: UUID, token: str = ""):
+    """
+    Alternativa al WebSocket con Server-Sent Events (EventSource): los mismos
+    mensajes, uno por evento `data:` en JSON, y el stream termina cuando la
+    entrega deja de estar pendiente. Cada LATIDO_SSE_S segundos sin mensajes
+    se envía un comentario para que los proxies no corten la conexión. El
+    token va en el parámetro `token` porque EventSource no envía cabeceras.
+    """
+    cliente = await _cliente_token(token)
+    if not cliente:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    seguimiento = seguimiento_service.SeguimientoEnVivo(cliente.id, entrega_id)
+    if not await seguimiento.abrir():
+        raise HTTPException(
+            status_code=404,
+            detail="Entrega no encontrada o no pertenece a este cliente"
+        )
+
+    async def eventos():
+        try:
+            siguiente = asyncio.ensure_future(seguimiento.siguiente())
+            while True:
+                hechos, _ = await asyncio.wait({siguiente}, timeout=LATIDO_SSE_S)
+                if not hechos:
+                    yield ": latido\n\n"
+                    continue
+                mensaje = siguiente.result()
+                if mensaje is None:
+                    break
+                yield f"data: {json.dumps(jsonable_encoder(mensaje))}\n\n"
+                siguiente = asyncio.ensure_future(seguimiento.siguiente())
+        finally:
+            siguiente.cancel()
+            seguimiento.cerrar()
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{id}", response_model=ClienteOut)
 def obtener_cliente(id: UUID, db: Session = Depends(get_db)):
@@ -295,8 +239,15 @@ def obtener_cliente(id: UUID, db: Session = Depends(get_db)):
     return cliente
 
 @router.put("/{id}", response_model=ClienteOut)
-def actualizar_cliente(id: UUID, datos: ClienteUpdate, db: Session = Depends(get_db)):
-    cliente = cliente_service.actualizar_cliente(db, id, datos)
+async def actualizar_cliente(id: UUID, datos: ClienteUpdate, db: Session = Depends(get_db)):
+    # El 404 antes del hash: un id inexistente no ocupa un lugar del pool de bcrypt
+    if not await run_in_threadpool(cliente_service.obtener_cliente, db, id):
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    password_hash = await contrasenas.hashear(datos.password)
+    try:
+        cliente = await run_in_threadpool(cliente_service.actualizar_cliente, db, id, datos, password_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return cliente
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from uuid import UUID
+from datetime import datetime
 
-from app.database import SessionLocal
+from app.database import SessionLocal, SessionLectura
 from app.schemas.distribuidor_schema import (
-    DistribuidorCreate, DistribuidorUpdate, DistribuidorOut, CambiarEstadoRequest
+    DistribuidorCreate, DistribuidorUpdate, DistribuidorOut, CambiarEstadoRequest, LoteUbicaciones
 )
-from app.services import distribuidor_service
+from app.services import distribuidor_service, indice_espacial_service, ubicacion_service, historial_service
+from app.services.broker_service import publicar_ubicacion_distribuidor
+from app.auth import contrasenas
 from app.auth.dependencies import get_current_distribuidor
 from app.models.distribuidor_model import Distribuidor
 from app.models.asignacion_vehiculo_model import AsignacionVehiculo
@@ -27,9 +31,18 @@ def get_db():
     finally:
         db.close()
 
+def get_db_lectura():
+    # Rutas de sólo lectura: leen de una réplica si hay (ver SesionEnrutada)
+    db = SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("", response_model=DistribuidorOut)
-def crear_distribuidor(distribuidor: DistribuidorCreate, db: Session = Depends(get_db)):
-    return distribuidor_service.crear_distribuidor(db, distribuidor)
+async def crear_distribuidor(distribuidor: DistribuidorCreate, db: Session = Depends(get_db)):
+    password_hash = await contrasenas.hashear(distribuidor.password)
+    return await run_in_threadpool(distribuidor_service.crear_distribuidor, db, distribuidor, password_hash)
 
 @router.get("", response_model=list[DistribuidorOut])
 def listar_distribuidores(db: Session = Depends(get_db)):
@@ -38,7 +51,7 @@ def listar_distribuidores(db: Session = Depends(get_db)):
 @router.get("/mi-perfil", dependencies=[Depends(security)])
 def obtener_mi_perfil(
     distribuidor_actual: Distribuidor = Depends(get_current_distribuidor),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene el perfil completo del distribuidor autenticado con todos sus datos personales,
@@ -187,8 +200,12 @@ def obtener_distribuidor(id: UUID, db: Session = Depends(get_db)):
     return distribuidor
 
 @router.put("/{id}", response_model=DistribuidorOut)
-def actualizar_distribuidor(id: UUID, datos: DistribuidorUpdate, db: Session = Depends(get_db)):
-    distribuidor = distribuidor_service.actualizar_distribuidor(db, id, datos)
+async def actualizar_distribuidor(id: UUID, datos: DistribuidorUpdate, db: Session = Depends(get_db)):
+    # El 404 antes del hash: un id inexistente no ocupa un lugar del pool de bcrypt
+    if not await run_in_threadpool(distribuidor_service.obtener_distribuidor, db, id):
+        raise HTTPException(status_code=404, detail="Distribuidor no encontrado")
+    password_hash = await contrasenas.hashear(datos.password)
+    distribuidor = await run_in_threadpool(distribuidor_service.actualizar_distribuidor, db, id, datos, password_hash)
     if not distribuidor:
         raise HTTPException(status_code=404, detail="Distribuidor no encontrado")
     return distribuidor
@@ -200,6 +217,20 @@ def cambiar_estado_distribuidor(id: UUID, activo: bool, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Distribuidor no encontrado")
     return distribuidor
 
+@router.post("/ubicaciones", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(security)])
+def registrar_ubicaciones(
+    lote: LoteUbicaciones,
+    distribuidor_actual: Distribuidor = Depends(get_current_distribuidor),
+):
+    """
+    Ingesta por lotes de posiciones GPS del distribuidor autenticado, con
+    hora de registro. Las posiciones se encolan y se escriben cada pocos
+    segundos con un UPDATE masivo que conserva la más reciente; los clientes
+    en seguimiento en vivo las reciben de inmediato. Se rechazan las de otro
+    distribuidor y las de hora fuera de rango.
+    """
+    return ubicacion_service.registrar_ubicaciones(distribuidor_actual.id, lote.ubicaciones)
+
 @router.patch("/{id}/ubicacion")
 def actualizar_ubicacion_distribuidor(
     id: UUID, 
@@ -213,10 +244,35 @@ def actualizar_ubicacion_distribuidor(
     
     distribuidor.latitud = latitud
     distribuidor.longitud = longitud
+    distribuidor.ubicacion_actualizada_en = datetime.utcnow()
     db.commit()
     db.refresh(distribuidor)
+    indice_espacial_service.actualizar_distribuidor(distribuidor)
+    publicar_ubicacion_distribuidor(distribuidor)
+    ubicacion_service.buffer_ubicaciones.agregar(
+        [(distribuidor.id, latitud, longitud, distribuidor.ubicacion_actualizada_en)],
+        actualizar_ultima=False,
+    )
     return distribuidor
 
+@router.get("/{id}/recorrido")
+def obtener_recorrido(
+    id: UUID,
+    desde: datetime,
+    hasta: datetime,
+    tolerancia_m: float | None = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Recorrido GPS del distribuidor en una ventana de tiempo (UTC), con los
+    kilómetros recorridos y la polyline. `tolerancia_m` simplifica el
+    recorrido con Douglas–Peucker.
+    """
+    try:
+        return historial_service.recorrido(db, id, desde, hasta, tolerancia_m)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/{id}")
 def eliminar_distribuidor(id: UUID, db: Session = Depends(get_db)):
     distribuidor = distribuidor_service.eliminar_distribuidor(db, id)
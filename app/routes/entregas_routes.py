@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import HTTPBearer
 from uuid import UUID
+from datetime import datetime
 from sqlalchemy.orm import Session
-from geopy.distance import geodesic
-from app.database import SessionLocal
+from app.geo.rutas import ordenar_paradas
+from app.database import SessionLocal, SessionLectura
 from app.schemas.entrega_schema import EntregaUpdate
 from app.schemas.ruta_entrega_schema import EntregaOut, AsignacionEntregaOut
-from app.services.entregas_service import completar_entrega
+from app.services.entregas_service import (
+    completar_entrega, cargar_asignaciones_distribuidor, consulta_asignaciones_distribuidor,
+    serializar_asignacion
+)
+from app.services.paginacion_service import paginar, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+from app.services.indice_espacial_service import tienda_mas_cercana
+from app.services.broker_service import publicar_estado_entrega
 from app.auth.dependencies import get_current_distribuidor
 from app.models.distribuidor_model import Distribuidor
 from app.models.asignacion_model import AsignacionEntrega, PedidoAsignado
@@ -29,6 +36,14 @@ def get_db():
     finally:
         db.close()
 
+def get_db_lectura():
+    # Rutas de sólo lectura: leen de una réplica si hay (ver SesionEnrutada)
+    db = SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.patch("/{entrega_id}", response_model=EntregaOut)
 def patch_entrega(entrega_id: UUID, payload: EntregaUpdate, db: Session = Depends(get_db)):
     ent = completar_entrega(db, entrega_id, payload)
@@ -38,16 +53,41 @@ def patch_entrega(entrega_id: UUID, payload: EntregaUpdate, db: Session = Depend
 
 @router.get("/mis-entregas", response_model=list[AsignacionEntregaOut], dependencies=[Depends(security)])
 def obtener_mis_entregas(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    estado: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
     distribuidor_actual: Distribuidor = Depends(get_current_distribuidor),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
-    Obtiene todas las asignaciones de entregas del distribuidor autenticado
-    con el orden de las entregas, ubicación actual y próxima entrega.
+    Obtiene las asignaciones de entregas del distribuidor autenticado, de la
+    más reciente a la más antigua, con el orden de las entregas, ubicación
+    actual y próxima entrega. Se pagina por cursor: si hay más resultados,
+    el cursor de la página siguiente viene en la cabecera X-Next-Cursor.
     """
-    asignaciones = db.query(AsignacionEntrega).filter(
-        AsignacionEntrega.id_distribuidor == distribuidor_actual.id
-    ).all()
+    filtros = []
+    if estado:
+        filtros.append(AsignacionEntrega.estado == estado)
+    if desde:
+        filtros.append(AsignacionEntrega.fecha_asignacion >= desde)
+    if hasta:
+        filtros.append(AsignacionEntrega.fecha_asignacion <= hasta)
+    try:
+        asignaciones, siguiente = paginar(
+            db,
+            consulta_asignaciones_distribuidor(distribuidor_actual.id, *filtros),
+            AsignacionEntrega.id,
+            AsignacionEntrega.fecha_asignacion,
+            cursor,
+            limite,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
     
     if not asignaciones:
         return []
@@ -58,30 +98,21 @@ def obtener_mis_entregas(
     ).order_by(Entrega.fecha_hora_reg.desc()).first()
     
     ubicacion_actual = None
-    if ultima_entrega_completada and ultima_entrega_completada.coordenadas_fin:
-        try:
-            lat, lon = map(float, ultima_entrega_completada.coordenadas_fin.split(","))
-            ubicacion_actual = {
-                "latitud": lat,
-                "longitud": lon,
-                "descripcion": "Última entrega completada",
-                "entrega_id": str(ultima_entrega_completada.id_entrega)
-            }
-        except (ValueError, TypeError):
-            pass
+    if ultima_entrega_completada and ultima_entrega_completada.posicion_fin:
+        lat, lon = ultima_entrega_completada.posicion_fin
+        ubicacion_actual = {
+            "latitud": lat,
+            "longitud": lon,
+            "descripcion": "Última entrega completada",
+            "entrega_id": str(ultima_entrega_completada.id_entrega)
+        }
     
     if not ubicacion_actual:
-        tiendas = db.query(Tienda).filter(
-            Tienda.latitud.isnot(None), 
-            Tienda.longitud.isnot(None)
-        ).all()
+        tienda_inicial = tienda_mas_cercana(
+            db, (distribuidor_actual.latitud, distribuidor_actual.longitud)
+        )
         
-        if tiendas:
-            tienda_inicial = min(tiendas, key=lambda t: geodesic(
-                (distribuidor_actual.latitud, distribuidor_actual.longitud),
-                (t.latitud, t.longitud)
-            ).km)
-            
+        if tienda_inicial:
             ubicacion_actual = {
                 "latitud": tienda_inicial.latitud,
                 "longitud": tienda_inicial.longitud,
@@ -91,53 +122,23 @@ def obtener_mis_entregas(
     
     resultado = []
     for asignacion in asignaciones:
-        ruta = db.query(RutaEntrega).filter(
-            RutaEntrega.ruta_id == asignacion.ruta_id
-        ).first()
-        
-        if ruta:
-            entregas_ordenadas = db.query(Entrega).filter(
-                Entrega.asignacion_id == asignacion.id
-            ).order_by(Entrega.orden_entrega).all()
-            
-            proxima_entrega = None
-            for entrega in entregas_ordenadas:
-                if entrega.estado == "pendiente":
-                    proxima_entrega = {
-                        "id_entrega": entrega.id_entrega,
-                        "orden_entrega": entrega.orden_entrega,
-                        "coordenadas_fin": entrega.coordenadas_fin,
-                        "cliente_id": entrega.cliente_id
-                    }
-                    break
-            
-            asignacion_data = {
-                "id": asignacion.id,
-                "fecha_asignacion": asignacion.fecha_asignacion,
-                "estado": asignacion.estado,
-                "ubicacion_actual": ubicacion_actual,
-                "proxima_entrega": proxima_entrega,
-                "ruta": {
-                    "ruta_id": ruta.ruta_id,
-                    "coordenadas_inicio": ruta.coordenadas_inicio,
-                    "coordenadas_fin": ruta.coordenadas_fin,
-                    "distancia": float(ruta.distancia) if ruta.distancia else None,
-                    "tiempo_estimado": ruta.tiempo_estimado,
-                    "entregas": [
-                        {
-                            "id_entrega": entrega.id_entrega,
-                            "fecha_hora_reg": entrega.fecha_hora_reg,
-                            "coordenadas_fin": entrega.coordenadas_fin,
-                            "estado": entrega.estado,
-                            "observaciones": entrega.observaciones,
-                            "orden_entrega": entrega.orden_entrega,
-                            "cliente": entrega.cliente,
-                            "pedido": entrega.pedido
-                        }
-                        for entrega in entregas_ordenadas
-                    ]
+        proxima_entrega = None
+        for entrega in sorted(asignacion.entregas, key=lambda e: e.orden_entrega):
+            if entrega.estado == "pendiente":
+                proxima_entrega = {
+                    "id_entrega": entrega.id_entrega,
+                    "orden_entrega": entrega.orden_entrega,
+                    "coordenadas_fin": entrega.coordenadas_fin,
+                    "cliente_id": entrega.cliente_id
                 }
-            }
+                break
+        
+        asignacion_data = serializar_asignacion(
+            asignacion,
+            ubicacion_actual=ubicacion_actual,
+            proxima_entrega=proxima_entrega
+        )
+        if asignacion_data:
             resultado.append(asignacion_data)
     
     return resultado
@@ -145,7 +146,7 @@ def obtener_mis_entregas(
 @router.get("/mis-entregas-hoy", response_model=list[AsignacionEntregaOut], dependencies=[Depends(security)])
 def obtener_mis_entregas_hoy(
     distribuidor_actual: Distribuidor = Depends(get_current_distribuidor),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene las asignaciones de entregas del distribuidor autenticado para el día de hoy
@@ -155,57 +156,11 @@ def obtener_mis_entregas_hoy(
     
     # Buscar asignaciones del distribuidor actual de hoy
     hoy = date.today()
-    asignaciones = db.query(AsignacionEntrega).filter(
-        AsignacionEntrega.id_distribuidor == distribuidor_actual.id,
-        AsignacionEntrega.fecha_asignacion >= hoy
-    ).all()
-    
-    if not asignaciones:
-        return []
-    
-    # Para cada asignación, obtenemos la ruta y las entregas ordenadas
-    resultado = []
-    for asignacion in asignaciones:
-        # Obtener la ruta asociada
-        ruta = db.query(RutaEntrega).filter(
-            RutaEntrega.ruta_id == asignacion.ruta_id
-        ).first()
-        
-        if ruta:
-            # Obtener las entregas ordenadas por orden_entrega
-            entregas_ordenadas = db.query(Entrega).filter(
-                Entrega.asignacion_id == asignacion.id
-            ).order_by(Entrega.orden_entrega).all()
-            
-            # Construir el objeto de respuesta
-            asignacion_data = {
-                "id": asignacion.id,
-                "fecha_asignacion": asignacion.fecha_asignacion,
-                "estado": asignacion.estado,
-                "ruta": {
-                    "ruta_id": ruta.ruta_id,
-                    "coordenadas_inicio": ruta.coordenadas_inicio,
-                    "coordenadas_fin": ruta.coordenadas_fin,
-                    "distancia": float(ruta.distancia) if ruta.distancia else None,
-                    "tiempo_estimado": ruta.tiempo_estimado,
-                    "entregas": [
-                        {
-                            "id_entrega": entrega.id_entrega,
-                            "fecha_hora_reg": entrega.fecha_hora_reg,
-                            "coordenadas_fin": entrega.coordenadas_fin,
-                            "estado": entrega.estado,
-                            "observaciones": entrega.observaciones,
-                            "orden_entrega": entrega.orden_entrega,
-                            "cliente": entrega.cliente,
-                            "pedido": entrega.pedido
-                        }
-                        for entrega in entregas_ordenadas
-                    ]
-                }
-            }
-            resultado.append(asignacion_data)
+    asignaciones = cargar_asignaciones_distribuidor(
+        db, distribuidor_actual.id, AsignacionEntrega.fecha_asignacion >= hoy
+    )
     
-    return resultado
+    return [datos for datos in map(serializar_asignacion, asignaciones) if datos]
 
 @router.patch("/asignacion/{asignacion_id}/aceptar", dependencies=[Depends(security)])
 def aceptar_asignacion(
@@ -293,21 +248,15 @@ def aceptar_asignacion(
             )
         
         # Obtener tienda más cercana al distribuidor (punto de recogida)
-        tiendas = db.query(Tienda).filter(
-            Tienda.latitud.isnot(None), 
-            Tienda.longitud.isnot(None)
-        ).all()
+        tienda_inicial = tienda_mas_cercana(
+            db, (distribuidor_actual.latitud, distribuidor_actual.longitud)
+        )
         
-        if not tiendas:
+        if not tienda_inicial:
             raise HTTPException(
                 status_code=400,
                 detail="No hay tiendas disponibles con coordenadas"
             )
-            
-        tienda_inicial = min(tiendas, key=lambda t: geodesic(
-            (distribuidor_actual.latitud, distribuidor_actual.longitud),
-            (t.latitud, t.longitud)
-        ).km)
         
         # Optimizar orden de entregas basado en la ubicación de la tienda
         punto_inicio = (tienda_inicial.latitud, tienda_inicial.longitud)
@@ -514,80 +463,40 @@ def rechazar_asignacion(
 @router.get("/mis-asignaciones-pendientes", response_model=list[AsignacionEntregaOut], dependencies=[Depends(security)])
 def obtener_asignaciones_pendientes(
     distribuidor_actual: Distribuidor = Depends(get_current_distribuidor),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene todas las asignaciones pendientes del distribuidor autenticado.
     Solo muestra asignaciones que realmente están disponibles para aceptar.
     """
     # Buscar asignaciones pendientes del distribuidor actual
-    asignaciones = db.query(AsignacionEntrega).filter(
-        AsignacionEntrega.id_distribuidor == distribuidor_actual.id,
-        AsignacionEntrega.estado == "pendiente"
-    ).all()
+    asignaciones = cargar_asignaciones_distribuidor(
+        db, distribuidor_actual.id, AsignacionEntrega.estado == "pendiente"
+    )
     
     if not asignaciones:
         return []
     
-    # Verificar que no haya asignaciones de la misma ruta ya aceptadas por otros
+    # Rutas que ya fueron aceptadas por otro distribuidor (una sola consulta)
+    rutas_aceptadas = {
+        ruta_id for (ruta_id,) in db.query(AsignacionEntrega.ruta_id).filter(
+            AsignacionEntrega.ruta_id.in_({a.ruta_id for a in asignaciones if a.ruta_id}),
+            AsignacionEntrega.estado == "aceptada"
+        ).distinct()
+    }
+    
     asignaciones_validas = []
     for asignacion in asignaciones:
-        # Verificar si hay alguna asignación aceptada para la misma ruta
-        asignacion_aceptada_existente = db.query(AsignacionEntrega).filter(
-            AsignacionEntrega.ruta_id == asignacion.ruta_id,
-            AsignacionEntrega.estado == "aceptada",
-            AsignacionEntrega.id != asignacion.id
-        ).first()
-        
-        # Si no hay ninguna asignación aceptada para esta ruta, es válida
-        if not asignacion_aceptada_existente:
-            asignaciones_validas.append(asignacion)
-        else:
+        if asignacion.ruta_id in rutas_aceptadas:
             # Marcar como rechazada automáticamente si ya fue aceptada por otro
             asignacion.estado = "rechazada"
-            db.commit()
+        else:
+            asignaciones_validas.append(asignacion)
     
-    # Para cada asignación válida, obtenemos la ruta y las entregas ordenadas
-    resultado = []
-    for asignacion in asignaciones_validas:
-        # Obtener la ruta asociada
-        ruta = db.query(RutaEntrega).filter(
-            RutaEntrega.ruta_id == asignacion.ruta_id
-        ).first()
-        
-        if ruta:
-            # Obtener las entregas ordenadas por orden_entrega
-            entregas_ordenadas = db.query(Entrega).filter(
-                Entrega.asignacion_id == asignacion.id
-            ).order_by(Entrega.orden_entrega).all()
-            
-            # Construir el objeto de respuesta
-            asignacion_data = {
-                "id": asignacion.id,
-                "fecha_asignacion": asignacion.fecha_asignacion,
-                "estado": asignacion.estado,
-                "ruta": {
-                    "ruta_id": ruta.ruta_id,
-                    "coordenadas_inicio": ruta.coordenadas_inicio,
-                    "coordenadas_fin": ruta.coordenadas_fin,
-                    "distancia": float(ruta.distancia) if ruta.distancia else None,
-                    "tiempo_estimado": ruta.tiempo_estimado,
-                    "entregas": [
-                        {
-                            "id_entrega": entrega.id_entrega,
-                            "fecha_hora_reg": entrega.fecha_hora_reg,
-                            "coordenadas_fin": entrega.coordenadas_fin,
-                            "estado": entrega.estado,
-                            "observaciones": entrega.observaciones,
-                            "orden_entrega": entrega.orden_entrega,
-                            "cliente": entrega.cliente,
-                            "pedido": entrega.pedido
-                        }
-                        for entrega in entregas_ordenadas
-                    ]
-                }
-            }
-            resultado.append(asignacion_data)
+    # Serializar antes del commit para no recargar las instancias expiradas
+    resultado = [datos for datos in map(serializar_asignacion, asignaciones_validas) if datos]
+    if len(asignaciones_validas) != len(asignaciones):
+        db.commit()
     
     return resultado
 
@@ -703,12 +612,8 @@ def _crear_asignacion_para_sobrante(db: Session, pedidos_sobrantes: list, radio_
         pedido = db.query(Pedido).filter(Pedido.id == info["pedido_id"]).first()
         if pedido:
             cliente = db.query(Cliente).filter(Cliente.id == pedido.cliente_id).first()
-            if cliente and cliente.coordenadas:
-                try:
-                    lat, lon = map(float, cliente.coordenadas.split(","))
-                    pedidos_validos.append((pedido, cliente, (lat, lon)))
-                except (ValueError, TypeError):
-                    continue
+            if cliente and cliente.posicion:
+                pedidos_validos.append((pedido, cliente, cliente.posicion))
     
     if not pedidos_validos:
         return None
@@ -757,18 +662,12 @@ def _crear_asignacion_para_sobrante(db: Session, pedidos_sobrantes: list, radio_
                 pedidos_pendientes.remove(pedido_asignado)
         
         # Crear ruta simple sin optimización avanzada
-        tiendas = db.query(Tienda).filter(
-            Tienda.latitud.isnot(None), 
-            Tienda.longitud.isnot(None)
-        ).all()
+        tienda_inicial = tienda_mas_cercana(
+            db, (distribuidor.latitud, distribuidor.longitud)
+        )
         
-        if not tiendas:
+        if not tienda_inicial:
             continue
-            
-        tienda_inicial = min(tiendas, key=lambda t: geodesic(
-            (distribuidor.latitud, distribuidor.longitud),
-            (t.latitud, t.longitud)
-        ).km)
         
         # Crear ruta simple
         coords_inicio = f"{tienda_inicial.latitud},{tienda_inicial.longitud}"
@@ -933,6 +832,8 @@ def marcar_entrega_completada(
                 estado_pedido = "fallido"
     
     db.commit()
+    # Avisar a los clientes que siguen la entrega por /ws/seguimiento-entrega
+    publicar_estado_entrega(entrega)
     
     entregas_reoptimizadas = False
     ruta_actualizada = False
@@ -944,7 +845,7 @@ def marcar_entrega_completada(
         try:
             lat, lon = map(float, datos_entrega.coordenadas_fin.split(","))
             ultima_ubicacion = (lat, lon)
-            _reoptimizar_entregas_pendientes(db, distribuidor_actual.id, ultima_ubicacion)
+            distancia_restante = _reoptimizar_entregas_pendientes(db, entrega.asignacion_id, ultima_ubicacion)
             entregas_reoptimizadas = True
             
             ruta = db.query(RutaEntrega).filter(
@@ -953,6 +854,8 @@ def marcar_entrega_completada(
             
             if ruta:
                 ruta.coordenadas_inicio = datos_entrega.coordenadas_fin
+                # Distancia que le queda a esta ruta desde la ubicación actual
+                ruta.distancia = round(distancia_restante, 2)
                 nuevas_coordenadas_inicio = datos_entrega.coordenadas_fin
                 ruta_actualizada = True
                 db.commit()
@@ -1007,22 +910,13 @@ def _optimizar_orden_entregas(db: Session, pedidos_asignados: list, punto_inicio
         if pedido:
             cliente = db.query(Cliente).filter(Cliente.id == pedido.cliente_id).first()
             if cliente and cliente.coordenadas:
-                try:
-                    lat, lon = map(float, cliente.coordenadas.split(","))
-                    pedidos_con_ubicacion.append({
-                        'pedido_asignado': pedido_asignado,
-                        'pedido': pedido,
-                        'cliente': cliente,
-                        'coordenadas': (lat, lon)
-                    })
-                except (ValueError, TypeError):
-                    # Si hay error en coordenadas, agregar al final
-                    pedidos_con_ubicacion.append({
-                        'pedido_asignado': pedido_asignado,
-                        'pedido': pedido,
-                        'cliente': cliente,
-                        'coordenadas': None
-                    })
+                # Si las coordenadas no son válidas `posicion` es None y va al final
+                pedidos_con_ubicacion.append({
+                    'pedido_asignado': pedido_asignado,
+                    'pedido': pedido,
+                    'cliente': cliente,
+                    'coordenadas': cliente.posicion
+                })
     
     if not pedidos_con_ubicacion:
         return pedidos_asignados
@@ -1034,27 +928,9 @@ def _optimizar_orden_entregas(db: Session, pedidos_asignados: list, punto_inicio
     if not pedidos_con_coords:
         return pedidos_asignados
     
-    # Algoritmo del vecino más cercano
-    ruta_optimizada = []
-    pedidos_restantes = pedidos_con_coords.copy()
-    ubicacion_actual = punto_inicio
-    
-    while pedidos_restantes:
-        # Encontrar el pedido más cercano a la ubicación actual
-        pedido_mas_cercano = None
-        distancia_minima = float('inf')
-        
-        for pedido_info in pedidos_restantes:
-            distancia = geodesic(ubicacion_actual, pedido_info['coordenadas']).km
-            if distancia < distancia_minima:
-                distancia_minima = distancia
-                pedido_mas_cercano = pedido_info
-        
-        if pedido_mas_cercano:
-            # Agregar a la ruta optimizada y actualizar ubicación actual
-            ruta_optimizada.append(pedido_mas_cercano)
-            ubicacion_actual = pedido_mas_cercano['coordenadas']
-            pedidos_restantes.remove(pedido_mas_cercano)
+    # Algoritmo del vecino más cercano + mejora 2-opt / Or-opt
+    orden, _ = ordenar_paradas(punto_inicio, [p['coordenadas'] for p in pedidos_con_coords], mejorar=True)
+    ruta_optimizada = [pedidos_con_coords[i] for i in orden]
     
     # Agregar pedidos sin coordenadas al final
     ruta_optimizada.extend(pedidos_sin_coords)
@@ -1084,108 +960,58 @@ def _optimizar_orden_entregas_sobrantes(pedidos_info: list, punto_inicio: tuple)
         return pedidos_info
     
     # Algoritmo del vecino más cercano
-    ruta_optimizada = []
-    pedidos_restantes = pedidos_con_coords.copy()
-    ubicacion_actual = punto_inicio
-    
-    while pedidos_restantes:
-        # Encontrar el pedido más cercano a la ubicación actual
-        pedido_mas_cercano = None
-        distancia_minima = float('inf')
-        
-        for pedido_info in pedidos_restantes:
-            distancia = geodesic(ubicacion_actual, pedido_info[2]).km
-            if distancia < distancia_minima:
-                distancia_minima = distancia
-                pedido_mas_cercano = pedido_info
-        
-        if pedido_mas_cercano:
-            # Agregar a la ruta optimizada y actualizar ubicación actual
-            ruta_optimizada.append(pedido_mas_cercano)
-            ubicacion_actual = pedido_mas_cercano[2]
-            pedidos_restantes.remove(pedido_mas_cercano)
+    orden, _ = ordenar_paradas(punto_inicio, [p[2] for p in pedidos_con_coords])
+    ruta_optimizada = [pedidos_con_coords[i] for i in orden]
     
     # Agregar pedidos sin coordenadas al final
     ruta_optimizada.extend(pedidos_sin_coords)
     
     return ruta_optimizada
 
-def _reoptimizar_entregas_pendientes(db: Session, distribuidor_id: UUID, ultima_ubicacion: tuple):
+def _reoptimizar_entregas_pendientes(db: Session, asignacion_id: UUID, ultima_ubicacion: tuple, mejorar: bool = True):
     """
-    Reoptimiza las entregas pendientes del distribuidor basándose en su ubicación actual.
+    Reoptimiza las entregas pendientes de una asignación (una ruta) desde la
+    ubicación actual del distribuidor.
     
     Args:
         db: Sesión de base de datos
-        distribuidor_id: ID del distribuidor
+        asignacion_id: ID de la asignación cuya ruta se reordena
         ultima_ubicacion: Tupla (lat, lon) de la última ubicación conocida
+        mejorar: Aplicar 2-opt / Or-opt después del vecino más cercano
+    
+    Returns:
+        Distancia en km que le queda a la ruta desde la ubicación actual:
+        0.0 si no quedan entregas pendientes con coordenadas, la distancia
+        directa si queda una
     """
-    # Obtener entregas pendientes del distribuidor ordenadas por orden_entrega
-    entregas_pendientes = db.query(Entrega).join(AsignacionEntrega).filter(
-        AsignacionEntrega.id_distribuidor == distribuidor_id,
-        AsignacionEntrega.estado == "aceptada",
+    entregas_pendientes = db.query(Entrega).filter(
+        Entrega.asignacion_id == asignacion_id,
         Entrega.estado == "pendiente"
     ).order_by(Entrega.orden_entrega).all()
     
-    if len(entregas_pendientes) <= 1:
-        # Si hay 1 o menos entregas pendientes, no hay nada que optimizar
-        return
-    
-    # Convertir entregas a formato para optimización
-    entregas_info = []
-    for entrega in entregas_pendientes:
-        if entrega.coordenadas_fin:
-            try:
-                lat, lon = map(float, entrega.coordenadas_fin.split(","))
-                entregas_info.append({
-                    'entrega': entrega,
-                    'coordenadas': (lat, lon)
-                })
-            except (ValueError, TypeError):
-                # Si hay error en coordenadas, mantener al final
-                entregas_info.append({
-                    'entrega': entrega,
-                    'coordenadas': None
-                })
-    
-    if len(entregas_info) <= 1:
-        return
-    
-    # Aplicar algoritmo del vecino más cercano desde la ubicación actual
-    entregas_con_coords = [e for e in entregas_info if e['coordenadas'] is not None]
-    entregas_sin_coords = [e for e in entregas_info if e['coordenadas'] is None]
+    # Si las coordenadas no son válidas `posicion_fin` es None y se mantiene al final
+    entregas_con_coords = [e for e in entregas_pendientes if e.posicion_fin is not None]
+    entregas_sin_coords = [e for e in entregas_pendientes if e.posicion_fin is None]
     
     if not entregas_con_coords:
-        return
+        return 0.0
     
-    # Algoritmo del vecino más cercano
-    ruta_optimizada = []
-    entregas_restantes = entregas_con_coords.copy()
-    ubicacion_actual = ultima_ubicacion
-    
-    while entregas_restantes:
-        # Encontrar la entrega más cercana a la ubicación actual
-        entrega_mas_cercana = None
-        distancia_minima = float('inf')
-        
-        for entrega_info in entregas_restantes:
-            distancia = geodesic(ubicacion_actual, entrega_info['coordenadas']).km
-            if distancia < distancia_minima:
-                distancia_minima = distancia
-                entrega_mas_cercana = entrega_info
-        
-        if entrega_mas_cercana:
-            # Agregar a la ruta optimizada y actualizar ubicación actual
-            ruta_optimizada.append(entrega_mas_cercana)
-            ubicacion_actual = entrega_mas_cercana['coordenadas']
-            entregas_restantes.remove(entrega_mas_cercana)
+    # Algoritmo del vecino más cercano (+ mejora 2-opt / Or-opt); con una sola
+    # parada el orden no cambia y sólo se mide el tramo que falta
+    orden, distancia_km = ordenar_paradas(
+        ultima_ubicacion, [e.posicion_fin for e in entregas_con_coords], mejorar=mejorar
+    )
+    if len(entregas_pendientes) <= 1:
+        return distancia_km
     
-    # Agregar entregas sin coordenadas al final
-    ruta_optimizada.extend(entregas_sin_coords)
+    ruta_optimizada = [entregas_con_coords[i] for i in orden] + entregas_sin_coords
     
     # Actualizar el orden_entrega en la base de datos
-    for nuevo_orden, entrega_info in enumerate(ruta_optimizada, 1):
-        entrega_info['entrega'].orden_entrega = nuevo_orden
+    for nuevo_orden, entrega in enumerate(ruta_optimizada, 1):
+        entrega.orden_entrega = nuevo_orden
     
     db.commit()
     
-    print(f"✅ Reoptimizadas {len(ruta_optimizada)} entregas pendientes para distribuidor {distribuidor_id}")
+    print(f"✅ Reoptimizadas {len(ruta_optimizada)} entregas pendientes de la asignación {asignacion_id}")
+    
+    return distancia_km
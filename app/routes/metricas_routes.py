@@ -0,0 +1,65 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from app.database import engine, async_engine, enrutador_replicas
+from app.auth.cache_principales import cache_principales
+from app.auth.credenciales import cache_negativa
+from app.services.ubicacion_service import buffer_ubicaciones
+
+security = HTTPBearer()
+
+# Token de operación (monitoreo, scraper de métricas); sin configurar, las métricas quedan cerradas
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+
+def verificar_token_metricas(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if not METRICAS_TOKEN:
+        raise HTTPException(status_code=403, detail="Métricas deshabilitadas: falta METRICAS_TOKEN")
+    if not hmac.compare_digest(credentials.credentials.encode(), METRICAS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+
+
+router = APIRouter(
+    prefix="/metricas",
+    tags=["Métricas"],
+    dependencies=[Depends(verificar_token_metricas)],
+)
+
+
+def _metricas_pool(reiniciar: bool = False) -> dict:
+    return {
+        "sync": engine.pool.metricas(reiniciar=reiniciar),
+        "async": async_engine.pool.metricas(reiniciar=reiniciar) if async_engine is not None else None,
+    }
+
+@router.get("/pool")
+def metricas_pool():
+    """
+    Uso del pool de conexiones de este worker: conexiones en uso y libres,
+    saturación (en uso / (tamaño + overflow)), espera por checkout y timeouts.
+    `async` es el pool del engine async (asyncpg), que tiene sus propias
+    conexiones.
+    """
+    return _metricas_pool()
+
+@router.post("/pool/reiniciar")
+def reiniciar_metricas_pool():
+    """Devuelve los contadores del pool de este worker y los vuelve a cero."""
+    return _metricas_pool(reiniciar=True)
+
+@router.get("")
+def metricas():
+    """Métricas en memoria de este worker: pool, cachés de autenticación y buffer GPS."""
+    return {
+        "pool": _metricas_pool(),
+        "replicas": enrutador_replicas.estado(),
+        "cache_principales": dict(cache_principales.estadisticas),
+        "cache_login_negativa": dict(cache_negativa.estadisticas),
+        "buffer_ubicaciones": {
+            **buffer_ubicaciones.estadisticas,
+            "pendientes": buffer_ubicaciones.pendientes(),
+        },
+    }
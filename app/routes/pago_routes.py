@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
 import os
@@ -7,9 +8,10 @@ try:
 except ImportError:
     stripe = None
 
-from app.database import SessionLocal
+from app.database import SessionLocal, get_async_db_lectura
 from app.schemas.pago_schema import PagoCreate, PagoOut, PagoEstadoUpdate
 from app.services import pago_service
+from app.services.paginacion_service import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
 
 router = APIRouter(
     prefix="/pagos",
@@ -28,8 +30,19 @@ def registrar_pago(pago: PagoCreate, db: Session = Depends(get_db)):
     return pago_service.crear_pago(db, pago)
 
 @router.get("", response_model=list[PagoOut])
-def listar(db: Session = Depends(get_db)):
-    return pago_service.listar_pagos(db)
+def listar(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        filas, siguiente = pago_service.listar_pagos(db, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return filas
 
 @router.get("/{id}", response_model=PagoOut)
 def obtener(id: UUID, db: Session = Depends(get_db)):
@@ -201,23 +214,11 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db
     return {"ok": True}
 
 @router.get("/estado_pago/{pedido_id}")
-def verificar_estado_pago(pedido_id: UUID, db: Session = Depends(get_db)):
+async def verificar_estado_pago(pedido_id: UUID, db: AsyncSession = Depends(get_async_db_lectura)):
     """
     Verifica el estado actual del pago para un pedido específico
     """
-    from app.models.pago_model import Pago
-    
-    pago = db.query(Pago).filter(Pago.pedido_id == pedido_id).first()
-    
-    if not pago:
+    estado = await pago_service.estado_pago_pedido_async(db, pedido_id)
+    if not estado:
         raise HTTPException(status_code=404, detail="No se encontró un pago para este pedido")
-    
-    return {
-        "pedido_id": str(pedido_id),
-        "pago_id": str(pago.id_pago),
-        "estado": pago.estado,
-        "monto": float(pago.monto),
-        "metodo_pago": pago.metodo_pago,
-        "fecha_pago": pago.fecha_pago,
-        "transaccion_id": pago.transaccion_id
-    }
+    return estado
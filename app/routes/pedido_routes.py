@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from app.database import SessionLocal
 from app.schemas.pedido_schema import PedidoCreate, PedidoOut, PedidoEstadoUpdate
 from app.services import pedido_service
+from app.services.paginacion_service import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
 
 router = APIRouter(
     prefix="/pedidos",
@@ -23,8 +24,19 @@ def crear_pedido(pedido: PedidoCreate, db: Session = Depends(get_db)):
     return pedido_service.crear_pedido(db, pedido)
 
 @router.get("", response_model=list[PedidoOut])
-def listar_pedidos(db: Session = Depends(get_db)):
-    return pedido_service.listar_pedidos(db)
+def listar_pedidos(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        filas, siguiente = pedido_service.listar_pedidos(db, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return filas
 
 @router.get("/{id}", response_model=PedidoOut)
 def obtener_pedido(id: UUID, db: Session = Depends(get_db)):
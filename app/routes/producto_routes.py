@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
 
-from app.database import SessionLocal
+from app.database import SessionLocal, SessionLectura
 from app.schemas.producto_schema import ProductoCreate, ProductoUpdate, ProductoOut
 from app.services import producto_service
 
@@ -18,16 +18,24 @@ def get_db():
     finally:
         db.close()
 
+def get_db_lectura():
+    # Rutas de sólo lectura: leen de una réplica si hay (ver SesionEnrutada)
+    db = SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("", response_model=ProductoOut)
 def crear_producto(producto: ProductoCreate, db: Session = Depends(get_db)):
     return producto_service.crear_producto(db, producto)
 
 @router.get("", response_model=list[ProductoOut])
-def listar_productos(db: Session = Depends(get_db)):
+def listar_productos(db: Session = Depends(get_db_lectura)):
     return producto_service.listar_productos(db)
 
 @router.get("/{id}", response_model=ProductoOut)
-def obtener_producto(id: UUID, db: Session = Depends(get_db)):
+def obtener_producto(id: UUID, db: Session = Depends(get_db_lectura)):
     producto = producto_service.obtener_producto(db, id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
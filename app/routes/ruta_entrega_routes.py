@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from uuid import UUID
 
@@ -8,6 +8,7 @@ from app.schemas.ruta_entrega_schema import (
     EntregaOut
 )
 from app.services import ruta_entrega_service
+from app.services.paginacion_service import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
 
 router = APIRouter(
     prefix="/rutas-entrega",
@@ -29,8 +30,19 @@ def listar_rutas(db: Session = Depends(get_db)):
 
 
 @router.get("/entregas", response_model=list[EntregaOut])
-def listar_entregas(db: Session = Depends(get_db)):
-    return ruta_entrega_service.listar_entregas(db)
+def listar_entregas(
+    response: Response,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        filas, siguiente = ruta_entrega_service.listar_entregas(db, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return filas
 
 @router.get("/{ruta_id}", response_model=RutaEntregaOut)
 def obtener_ruta(ruta_id: UUID, db: Session = Depends(get_db)):
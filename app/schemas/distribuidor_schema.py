@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field
 from uuid import UUID
 from typing import Optional
+from datetime import datetime
 from enum import Enum
 
 class EstadoDistribuidor(str, Enum):
@@ -34,3 +35,13 @@ class DistribuidorOut(DistribuidorBase):
 
 class CambiarEstadoRequest(BaseModel):
     estado: EstadoDistribuidor
+
+class UbicacionGPS(BaseModel):
+    # El distribuidor sale del token; si se envía tiene que coincidir con él
+    distribuidor_id: Optional[UUID] = None
+    latitud: float = Field(ge=-90, le=90)
+    longitud: float = Field(ge=-180, le=180)
+    registrado_en: Optional[datetime] = None  # hora del GPS; si falta se usa la de recepción
+
+class LoteUbicaciones(BaseModel):
+    ubicaciones: list[UbicacionGPS] = Field(max_length=5000)
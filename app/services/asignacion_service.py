@@ -1,8 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
 from uuid import UUID
 from app.models.asignacion_model import AsignacionEntrega, PedidoAsignado
 from app.schemas.asignacion_schema import AsignacionEntregaCreate, PedidoAsignadoCreate
-from geopy.distance import geodesic
+from app.geo.distancias import distancias_desde
+from app.geo.coordenadas import distancia_km_sql, dentro_de_radio_sql
+from app.geo.cvrp import resolver_cvrp
+from app.services.maps_service import obtener_tramos
+from app.services.paginacion_service import paginar, LIMITE_POR_DEFECTO
+from app.services.indice_espacial_service import indice_distribuidores, tiendas_mas_cercanas
 from app.models.cliente_model import Cliente
 from app.models.pedido_model import Pedido, DetallePedido
 from app.models.vehiculo_model import Vehiculo
@@ -19,8 +25,16 @@ def crear_asignacion_entrega(db: Session, datos: AsignacionEntregaCreate):
     db.refresh(nueva)
     return nueva
 
-def listar_asignaciones(db: Session):
-    return db.query(AsignacionEntrega).all()
+def listar_asignaciones(db: Session, limite: int = LIMITE_POR_DEFECTO, cursor: str | None = None):
+    consulta = db.query(AsignacionEntrega).options(
+        joinedload(AsignacionEntrega.ruta)
+        .selectinload(RutaEntrega.entregas)
+        .selectinload(Entrega.pedido)
+        .selectinload(Pedido.detalles)
+    )
+    return paginar(
+        db, consulta, AsignacionEntrega.id, AsignacionEntrega.fecha_asignacion, cursor, limite
+    )
 
 def obtener_asignacion(db: Session, asignacion_id: UUID):
     return db.query(AsignacionEntrega).filter(AsignacionEntrega.id == asignacion_id).first()
@@ -52,10 +66,16 @@ def eliminar_pedido_asignado(db: Session, pedido_asignado_id: UUID):
 
 def asignacion_automatica_propuesta(db: Session, pedidos_ids: list[UUID] = None, radio_maximo_km: float = 5.0):
     """
-    Genera una propuesta de asignación automática buscando el distribuidor más cercano.
+    Genera una propuesta de asignación automática repartiendo los pedidos pendientes
+    entre todos los distribuidores disponibles (con vehículo) en una sola pasada.
     Si no se especifican pedidos, toma todos los pedidos pendientes.
-    El distribuidor asignado puede aceptar o rechazar.
-    Si hay más pedidos que la capacidad del vehículo, se crean múltiples asignaciones.
+    Resuelve un ruteo con capacidad (CVRP): cada vehículo recibe a lo sumo su
+    `capacidad_carga` en cajas y se minimizan los kilómetros totales. La
+    distancia y el tiempo que se guardan en cada ruta son de manejo, tramo por
+    tramo en el orden del CVRP (Google, caché, red vial local o línea recta).
+    Se crea una asignación (con su ruta) por cada distribuidor que recibe pedidos;
+    cada distribuidor puede aceptar o rechazar. Los pedidos que no caben en ningún
+    vehículo quedan pendientes.
     Incluye verificación de asignaciones duplicadas.
     """
     # Verificar si hay asignaciones duplicadas recientes
@@ -64,76 +84,99 @@ def asignacion_automatica_propuesta(db: Session, pedidos_ids: list[UUID] = None,
         if es_duplicada:
             raise ValueError(f"Asignación duplicada detectada: {mensaje}")
     
+    consulta = db.query(Pedido, Cliente).join(Cliente, Cliente.id == Pedido.cliente_id).filter(
+        Pedido.estado == "pendiente",
+        Cliente.latitud.isnot(None),
+        Cliente.longitud.isnot(None)
+    )
     if pedidos_ids:
-        pedidos_pendientes = db.query(Pedido).filter(
-            Pedido.id.in_(pedidos_ids),
-            Pedido.estado == "pendiente"
-        ).all()
-    else:
-        pedidos_pendientes = db.query(Pedido).filter_by(estado="pendiente").all()
+        consulta = consulta.filter(Pedido.id.in_(pedidos_ids))
+    pedidos_pendientes = consulta.all()
     
     if not pedidos_pendientes:
         raise ValueError("No hay pedidos pendientes para asignar")
 
-    # 2. Filtrar pedidos con coordenadas válidas
-    pedidos_validos = []
-    for pedido in pedidos_pendientes:
-        cliente = db.query(Cliente).filter_by(id=pedido.cliente_id).first()
-        if cliente and cliente.coordenadas:
-            try:
-                lat, lon = map(float, cliente.coordenadas.split(","))
-                pedidos_validos.append((pedido, cliente, (lat, lon)))
-            except (ValueError, TypeError):
-                continue
+    # 2. Pedidos con coordenadas válidas (ya filtrados en SQL)
+    pedidos_validos = [(pedido, cliente, cliente.posicion) for pedido, cliente in pedidos_pendientes]
     
     if not pedidos_validos:
         raise ValueError("No hay pedidos con coordenadas válidas")
     
+    # Cajas por pedido (suma de DetallePedido.cantidad) en una sola consulta
+    cajas_por_pedido = dict(
+        db.query(DetallePedido.pedido_id, func.coalesce(func.sum(DetallePedido.cantidad), 0))
+          .filter(DetallePedido.pedido_id.in_([p.id for p, _, _ in pedidos_validos]))
+          .group_by(DetallePedido.pedido_id)
+          .all()
+    )
+    
     # 3. Calcular punto central
     centro_lat = sum(coord[2][0] for coord in pedidos_validos) / len(pedidos_validos)
     centro_lon = sum(coord[2][1] for coord in pedidos_validos) / len(pedidos_validos)
     punto_central = (centro_lat, centro_lon)
     
-    # 4. Seleccionar distribuidor y inicializar ruta desde tienda
+    # 4. Distribuidores disponibles; cada vehículo parte de la tienda más cercana a su distribuidor
     distribuidores_disponibles = _obtener_distribuidores_cercanos(db, punto_central, radio_maximo_km * 2)
     if not distribuidores_disponibles:
         raise ValueError("No hay distribuidores disponibles en el área")
-    distribuidores_disponibles.sort(key=lambda x: x["distancia_km"])
-    distribuidor_asignado = distribuidores_disponibles[0]["distribuidor"]
-    vehiculo_asignado = distribuidores_disponibles[0]["vehiculo"]
-    # Ubicación inicial: tienda más cercana al distribuidor
-    tiendas = db.query(Tienda).filter(
-        Tienda.latitud.isnot(None), Tienda.longitud.isnot(None)
-    ).all()
-    if not tiendas:
-        raise ValueError("No hay tiendas con coordenadas registradas")
-    tienda_inicial = min(tiendas, key=lambda t: geodesic(
-        (distribuidor_asignado.latitud, distribuidor_asignado.longitud),
-        (t.latitud, t.longitud)
-    ).km)
-    current_start = (tienda_inicial.latitud, tienda_inicial.longitud)
-    
-    # 5. Crear una sola asignación con todos los pedidos
-    cluster_seleccionado = pedidos_validos  # todos los pedidos válidos
-    coords_cluster = [item[2] for item in cluster_seleccionado]
-    clientes_cluster = [item[1] for item in cluster_seleccionado]
-    ruta = _calcular_ruta_optimizada(
-        current_start,
-        coords_cluster,
-        tienda_inicial,
-        clientes_cluster
+    tiendas_iniciales = tiendas_mas_cercanas(
+        db, [(d["distribuidor"].latitud, d["distribuidor"].longitud) for d in distribuidores_disponibles]
     )
-    db.add(ruta); db.commit(); db.refresh(ruta)
-    nueva_asignacion = AsignacionEntrega(
-        id_distribuidor=distribuidor_asignado.id,
-        ruta_id=ruta.ruta_id,
-        estado="pendiente"
+    if not all(tiendas_iniciales):
+        raise ValueError("No hay tiendas con coordenadas registradas")
+    vehiculos = [
+        {"inicio": (tienda.latitud, tienda.longitud), "capacidad": info["vehiculo"].capacidad_carga}
+        for info, tienda in zip(distribuidores_disponibles, tiendas_iniciales)
+    ]
+    
+    # 5. Resolver el ruteo con capacidad para todos los vehículos a la vez
+    solucion = resolver_cvrp(
+        vehiculos,
+        [item[2] for item in pedidos_validos],
+        [cajas_por_pedido.get(p.id, 0) for p, _, _ in pedidos_validos],
     )
-    db.add(nueva_asignacion); db.commit(); db.refresh(nueva_asignacion)
-    for pedido, _, _ in cluster_seleccionado:
-        db.add(PedidoAsignado(pedido_id=pedido.id, asignacion_id=nueva_asignacion.id))
+    if not solucion["rutas"]:
+        raise ValueError("Ningún pedido cabe en los vehículos disponibles")
+
+    # 6. Costo de manejo de cada ruta en el orden del CVRP, antes de abrir la
+    # transacción de escritura (puede consultar a Google)
+    costos = [
+        obtener_tramos(
+            [vehiculos[ruta_cvrp["vehiculo"]]["inicio"]]
+            + [pedidos_validos[i][2] for i in ruta_cvrp["paradas"]]
+        )
+        for ruta_cvrp in solucion["rutas"]
+    ]
+    
+    # 7. Persistir una ruta + asignación por vehículo usado
+    asignaciones_creadas = []
+    for ruta_cvrp, (distancias, segundos) in zip(solucion["rutas"], costos):
+        distribuidor = distribuidores_disponibles[ruta_cvrp["vehiculo"]]["distribuidor"]
+        tienda_inicial = tiendas_iniciales[ruta_cvrp["vehiculo"]]
+        ultimo = pedidos_validos[ruta_cvrp["paradas"][-1]][2]
+        ruta = RutaEntrega(
+            coordenadas_inicio=f"{tienda_inicial.latitud},{tienda_inicial.longitud}",
+            coordenadas_fin=f"{ultimo[0]},{ultimo[1]}",
+            distancia=round(float(distancias.sum()), 2),
+            tiempo_estimado=f"{int(segundos.sum() // 60)} mins"
+        )
+        db.add(ruta)
+        db.flush()
+        nueva_asignacion = AsignacionEntrega(
+            id_distribuidor=distribuidor.id,
+            ruta_id=ruta.ruta_id,
+            estado="pendiente"
+        )
+        db.add(nueva_asignacion)
+        db.flush()
+        db.add_all([
+            PedidoAsignado(pedido_id=pedidos_validos[i][0].id, asignacion_id=nueva_asignacion.id)
+            for i in ruta_cvrp["paradas"]
+        ])
+        asignaciones_creadas.append(nueva_asignacion)
     db.commit()
-    asignaciones_creadas = [nueva_asignacion]
+    for asignacion in asignaciones_creadas:
+        db.refresh(asignacion)
     
     if not asignaciones_creadas:
         raise ValueError("No se pudo crear ninguna asignación con los criterios establecidos")
@@ -146,43 +189,46 @@ def _obtener_distribuidores_cercanos(db: Session, punto_central: tuple, radio_ma
     Solo incluye distribuidores que estén activos, tengan coordenadas, vehículo asignado 
     y que NO estén ocupados.
     """
-    # Obtener distribuidores activos con coordenadas y que no estén ocupados
-    distribuidores = db.query(Distribuidor).filter(
+    # Candidatos dentro del radio según el índice espacial
+    candidatos = [d_id for d_id, _ in indice_distribuidores(db).radio(punto_central, radio_maximo_km)]
+    if not candidatos:
+        return []
+    
+    # Activos, con coordenadas, que no estén ocupados, con vehículo asignado y,
+    # con sus coordenadas actuales en la BD, dentro del radio: una sola consulta
+    # con el vehículo unido en lugar de dos consultas por distribuidor
+    distribuidores = db.query(
+        Distribuidor,
+        Vehiculo,
+        distancia_km_sql(Distribuidor.latitud, Distribuidor.longitud, punto_central)
+    ).join(
+        AsignacionVehiculo, AsignacionVehiculo.id_distribuidor == Distribuidor.id
+    ).join(
+        Vehiculo, Vehiculo.id == AsignacionVehiculo.id_vehiculo
+    ).filter(
+        Distribuidor.id.in_(candidatos),
         Distribuidor.activo == True,
         Distribuidor.latitud.isnot(None),
         Distribuidor.longitud.isnot(None),
-        Distribuidor.estado != "ocupado"  # Excluir distribuidores ocupados
+        Distribuidor.estado != "ocupado",  # Excluir distribuidores ocupados
+        dentro_de_radio_sql(Distribuidor.latitud, Distribuidor.longitud, punto_central, radio_maximo_km)
     ).all()
     
     distribuidores_disponibles = []
+    vistos = set()
     
-    for distribuidor in distribuidores:
-        # Verificar que tenga vehículo asignado
-        asignacion_vehiculo = db.query(AsignacionVehiculo).filter_by(
-            id_distribuidor=distribuidor.id
-        ).first()
-        
-        if not asignacion_vehiculo:
-            continue
-        
-        vehiculo = db.query(Vehiculo).filter_by(id=asignacion_vehiculo.id_vehiculo).first()
-        if not vehiculo:
+    for distribuidor, vehiculo, distancia in distribuidores:
+        # Con más de un vehículo asignado se usa uno solo
+        if distribuidor.id in vistos:
             continue
+        vistos.add(distribuidor.id)
         
-        # Calcular distancia al punto central
-        distancia = geodesic(
-            (distribuidor.latitud, distribuidor.longitud),
-            punto_central
-        ).km
-        
-        # Filtrar por radio máximo
-        if distancia <= radio_maximo_km:
-            distribuidores_disponibles.append({
-                "distribuidor": distribuidor,
-                "vehiculo": vehiculo,
-                "distancia_km": round(distancia, 2),
-                "capacidad_pedidos": vehiculo.capacidad_carga
-            })
+        distribuidores_disponibles.append({
+            "distribuidor": distribuidor,
+            "vehiculo": vehiculo,
+            "distancia_km": round(distancia, 2),
+            "capacidad_pedidos": vehiculo.capacidad_carga
+        })
     
     # Ordenar por distancia (más cercano primero)
     distribuidores_disponibles.sort(key=lambda x: x["distancia_km"])
@@ -195,18 +241,17 @@ def _encontrar_cluster_cercano(pedidos_coords, centro_distribuidor, radio_max, c
         return []
     
     # Ordenar pedidos por distancia al distribuidor
-    pedidos_ordenados = sorted(pedidos_coords, key=lambda x: geodesic(
-        centro_distribuidor, x[2]
-    ).km)
+    distancias = distancias_desde(centro_distribuidor, [x[2] for x in pedidos_coords])
+    orden = distancias.argsort()
     
     cluster = []
-    for pedido, cliente, coords in pedidos_ordenados:
+    for idx in orden.tolist():
+        pedido, cliente, coords = pedidos_coords[idx]
         if len(cluster) >= capacidad_max:
             break
         
         # Verificar si el pedido está dentro del radio máximo respecto al distribuidor
-        distancia_a_distribuidor = geodesic(centro_distribuidor, coords).km
-        if distancia_a_distribuidor > radio_max:
+        if distancias[idx] > radio_max:
             continue
         
         # Verificar si el pedido está cerca de los otros pedidos del cluster
@@ -214,88 +259,13 @@ def _encontrar_cluster_cercano(pedidos_coords, centro_distribuidor, radio_max, c
             cluster.append((pedido, cliente, coords))
         else:
             # Verificar distancia promedio a otros pedidos del cluster
-            distancias = [geodesic(coords, c[2]).km for c in cluster]
-            distancia_promedio = sum(distancias) / len(distancias)
+            distancia_promedio = float(distancias_desde(coords, [c[2] for c in cluster]).mean())
             
             if distancia_promedio <= radio_max:
                 cluster.append((pedido, cliente, coords))
     
     return cluster
 
-def _calcular_ruta_optimizada(coords_tienda, coords_clientes, tienda, clientes):
-    """Calcula una ruta optimizada usando Google Maps API o algoritmo del vecino más cercano"""
-    from app.services.maps_service import calcular_ruta_multiple, obtener_distancia_tiempo
-    
-    if not coords_clientes:
-        raise ValueError("No hay coordenadas de clientes")
-    
-    # Intentar usar Google Maps API para ruta optimizada
-    ruta_google = calcular_ruta_multiple(coords_tienda, coords_clientes)
-    
-    if ruta_google:
-        # Si tenemos resultado de Google Maps, usarlo
-        coord_inicio = f"{coords_tienda[0]},{coords_tienda[1]}"
-        coord_fin = f"{coords_clientes[-1][0]},{coords_clientes[-1][1]}" if coords_clientes else coord_inicio
-        
-        return RutaEntrega(
-            coordenadas_inicio=coord_inicio,
-            coordenadas_fin=coord_fin,
-            distancia=ruta_google["distancia_km"],
-            tiempo_estimado=ruta_google["tiempo_estimado"]
-        )
-    
-    # Algoritmo de respaldo: vecino más cercano
-    ruta_ordenada = []
-    coords_disponibles = coords_clientes.copy()
-    clientes_disponibles = clientes.copy()
-    punto_actual = coords_tienda
-    
-    while coords_disponibles:
-        # Encontrar el cliente más cercano
-        idx_cercano = min(range(len(coords_disponibles)), 
-                         key=lambda i: geodesic(punto_actual, coords_disponibles[i]).km)
-        
-        coords_cercanas = coords_disponibles.pop(idx_cercano)
-        cliente_cercano = clientes_disponibles.pop(idx_cercano)
-        
-        ruta_ordenada.append((coords_cercanas, cliente_cercano))
-        punto_actual = coords_cercanas
-    
-    # Calcular distancia y tiempo usando la API de Google Maps
-    distancia_total = 0
-    tiempo_total = 0
-    
-    # De tienda al primer cliente
-    if ruta_ordenada:
-        distancia, tiempo = obtener_distancia_tiempo(
-            coords_tienda, ruta_ordenada[0][0]
-        )
-        distancia_total += distancia
-        # Convertir tiempo a minutos si viene como string
-        if isinstance(tiempo, str) and "mins" in tiempo:
-            tiempo_total += int(tiempo.split()[0])
-    
-    # Entre clientes consecutivos
-    for i in range(len(ruta_ordenada) - 1):
-        distancia, tiempo = obtener_distancia_tiempo(
-            ruta_ordenada[i][0], ruta_ordenada[i+1][0]
-        )
-        distancia_total += distancia
-        # Convertir tiempo a minutos si viene como string
-        if isinstance(tiempo, str) and "mins" in tiempo:
-            tiempo_total += int(tiempo.split()[0])
-    
-    # Crear objeto RutaEntrega
-    coord_inicio = f"{coords_tienda[0]},{coords_tienda[1]}"
-    coord_fin = f"{ruta_ordenada[-1][0][0]},{ruta_ordenada[-1][0][1]}" if ruta_ordenada else coord_inicio
-    
-    return RutaEntrega(
-        coordenadas_inicio=coord_inicio,
-        coordenadas_fin=coord_fin,
-        distancia=distancia_total,
-        tiempo_estimado=f"{tiempo_total} mins" if tiempo_total > 0 else f"{int(distancia_total * 2.5)} mins"
-    )
-
 def aceptar_asignacion(db: Session, asignacion_id: UUID, distribuidor_id: UUID):
     """El distribuidor acepta una asignación pendiente"""
     asignacion = db.query(AsignacionEntrega).filter(
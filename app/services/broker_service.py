@@ -0,0 +1,175 @@
+"""
+Pub/sub para el seguimiento en vivo de entregas.
+
+Los cambios de ubicación de un distribuidor se publican en el canal
+`distribuidor:{id}` y los cambios de estado de una entrega en `entrega:{id}`;
+las conexiones WebSocket de seguimiento se suscriben a ambos y reciben los
+mensajes sin volver a consultar la BD.
+
+BROKER_URL elige la implementación:
+  • vacío o "memoria": en proceso; sólo llega a los clientes conectados al
+    mismo worker.
+  • "redis://...": publica en Redis y cada worker reenvía a sus suscriptores
+    locales lo que recibe, de modo que funciona con varios workers.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+BROKER_URL = os.getenv("BROKER_URL", "")
+# Mensajes pendientes por suscriptor; si un cliente lento la llena se descartan los más viejos
+COLA_MAXIMA = int(os.getenv("BROKER_COLA_MAXIMA", "100"))
+PREFIJO_REDIS = "seguimiento:"
+
+
+class Suscripcion:
+    """Cola de mensajes de una conexión; se lee desde su event loop."""
+
+    def __init__(self, broker, canales: tuple, loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.canales = canales
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=COLA_MAXIMA)
+
+    def _entregar(self, canal: str, mensaje: dict):
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait((canal, mensaje))
+
+    async def recibir(self) -> tuple[str, dict]:
+        return await self.cola.get()
+
+    def agregar(self, canal: str):
+        """Suscribe también a `canal` (p. ej. cuando se conoce el distribuidor)."""
+        self.broker.agregar_canal(self, canal)
+
+    def cerrar(self):
+        self.broker.desuscribir(self)
+
+
+class BrokerMemoria:
+    def __init__(self):
+        self._suscripciones: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, *canales: str) -> Suscripcion:
+        """Se llama desde una corrutina; los mensajes se entregan en su event loop."""
+        suscripcion = Suscripcion(self, canales, asyncio.get_running_loop())
+        with self._lock:
+            for canal in canales:
+                self._suscripciones.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def agregar_canal(self, suscripcion: Suscripcion, canal: str):
+        with self._lock:
+            if canal in suscripcion.canales:
+                return
+            suscripcion.canales = suscripcion.canales + (canal,)
+            self._suscripciones.setdefault(canal, set()).add(suscripcion)
+
+    def desuscribir(self, suscripcion: Suscripcion):
+        with self._lock:
+            for canal in suscripcion.canales:
+                miembros = self._suscripciones.get(canal)
+                if miembros is not None:
+                    miembros.discard(suscripcion)
+                    if not miembros:
+                        del self._suscripciones[canal]
+
+    def publicar(self, canal: str, mensaje: dict):
+        """Seguro de llamar desde cualquier hilo (p. ej. rutas síncronas)."""
+        self._repartir(canal, mensaje)
+
+    def _repartir(self, canal: str, mensaje: dict):
+        with self._lock:
+            destinatarios = list(self._suscripciones.get(canal, ()))
+        for suscripcion in destinatarios:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._entregar, canal, mensaje)
+            except RuntimeError:
+                # El event loop ya se cerró
+                self.desuscribir(suscripcion)
+
+
+class BrokerRedis(BrokerMemoria):
+    def __init__(self, url: str):
+        super().__init__()
+        self._redis = redis.Redis.from_url(url)
+        self._escucha = None
+
+    def suscribir(self, *canales: str) -> Suscripcion:
+        if self._escucha is None:
+            with self._lock:
+                if self._escucha is None:
+                    self._escucha = threading.Thread(target=self._escuchar, daemon=True)
+                    self._escucha.start()
+        return super().suscribir(*canales)
+
+    def publicar(self, canal: str, mensaje: dict):
+        try:
+            self._redis.publish(PREFIJO_REDIS + canal, json.dumps(mensaje, default=str))
+        except redis.RedisError as e:
+            print(f"Broker Redis no disponible, entrega sólo local: {e}")
+            self._repartir(canal, mensaje)
+
+    def _escuchar(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(PREFIJO_REDIS + "*")
+                for evento in pubsub.listen():
+                    canal = evento["channel"].decode()[len(PREFIJO_REDIS):]
+                    self._repartir(canal, json.loads(evento["data"]))
+            except redis.RedisError as e:
+                print(f"Conexión con el broker Redis perdida, reintentando: {e}")
+                time.sleep(1)
+
+
+_broker = None
+_lock = threading.Lock()
+
+
+def obtener_broker() -> BrokerMemoria:
+    global _broker
+    if _broker is None:
+        with _lock:
+            if _broker is None:
+                if BROKER_URL.startswith(("redis://", "rediss://")):
+                    if redis is None:
+                        raise RuntimeError("BROKER_URL apunta a Redis pero el paquete redis no está instalado")
+                    _broker = BrokerRedis(BROKER_URL)
+                else:
+                    _broker = BrokerMemoria()
+    return _broker
+
+
+# ─── Eventos de seguimiento ──────────────────────────────────────────
+def canal_distribuidor(distribuidor_id) -> str:
+    return f"distribuidor:{distribuidor_id}"
+
+
+def canal_entrega(entrega_id) -> str:
+    return f"entrega:{entrega_id}"
+
+
+def publicar_ubicacion_distribuidor(distribuidor):
+    obtener_broker().publicar(canal_distribuidor(distribuidor.id), {
+        "tipo": "ubicacion",
+        "latitud": distribuidor.latitud,
+        "longitud": distribuidor.longitud,
+    })
+
+
+def publicar_estado_entrega(entrega):
+    obtener_broker().publicar(canal_entrega(entrega.id_entrega), {
+        "tipo": "estado",
+        "estado": entrega.estado,
+        "observaciones": entrega.observaciones,
+    })
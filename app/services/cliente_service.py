@@ -1,32 +1,43 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
-import bcrypt
+from app.auth import contrasenas
 from app.models.cliente_model import Cliente
 from app.schemas.cliente_schema import ClienteCreate, ClienteUpdate
+from app.services.paginacion_service import paginar, LIMITE_POR_DEFECTO
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return contrasenas.hashear_sync(password)
 
-def crear_cliente(db: Session, datos: ClienteCreate):
-    hashed_pw = hash_password(datos.password)
+def _verificar_email_libre(db: Session, email: str, cliente_id: UUID | None = None):
+    consulta = db.query(Cliente.id).filter(Cliente.email == email)
+    if cliente_id is not None:
+        consulta = consulta.filter(Cliente.id != cliente_id)
+    if consulta.first():
+        raise ValueError("Ya existe un cliente con ese email")
+
+def crear_cliente(db: Session, datos: ClienteCreate, password_hash: str | None = None):
+    """`password_hash`: hash ya calculado por la ruta (fuera del hilo de la BD)."""
+    _verificar_email_libre(db, datos.email)
+    hashed_pw = password_hash or hash_password(datos.password)
     nuevo = Cliente(**datos.dict(exclude={"password"}), password=hashed_pw)
     db.add(nuevo)
     db.commit()
     db.refresh(nuevo)
     return nuevo
 
-def listar_clientes(db: Session):
-    return db.query(Cliente).all()
+def listar_clientes(db: Session, limite: int = LIMITE_POR_DEFECTO, cursor: str | None = None):
+    return paginar(db, db.query(Cliente), Cliente.id, cursor=cursor, limite=limite)
 
 def obtener_cliente(db: Session, cliente_id: UUID):
     return db.query(Cliente).filter(Cliente.id == cliente_id).first()
 
-def actualizar_cliente(db: Session, cliente_id: UUID, datos: ClienteUpdate):
+def actualizar_cliente(db: Session, cliente_id: UUID, datos: ClienteUpdate, password_hash: str | None = None):
     cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
     if cliente:
+        _verificar_email_libre(db, datos.email, cliente_id)
         for key, value in datos.dict().items():
             if key == "password":
-                value = hash_password(value)
+                value = password_hash or hash_password(value)
             setattr(cliente, key, value)
         db.commit()
         db.refresh(cliente)
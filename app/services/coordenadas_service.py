@@ -0,0 +1,67 @@
+"""
+Relleno de las columnas numéricas de coordenadas a partir del texto "lat,lon".
+
+Las filas nuevas se sincronizan desde los modelos; este job completa las
+filas existentes por lotes y es idempotente: sólo toca filas con la columna
+numérica en NULL. El texto se interpreta en Python con parsear_coordenadas
+(las mismas reglas y rangos ±90/±180 que usa la app), así que funciona
+igual en PostgreSQL y en SQLite; los textos inválidos se dejan en NULL.
+
+Uso:
+    python -m app.services.coordenadas_service
+"""
+from sqlalchemy import text
+
+from app.database import engine
+from app.geo.coordenadas import parsear_coordenadas
+
+# (tabla, clave primaria, columna de texto, columna latitud, columna longitud)
+COLUMNAS = [
+    ("cliente", "id", "coordenadas", "latitud", "longitud"),
+    ("entrega", "id_entrega", "coordenadas_fin", "latitud_fin", "longitud_fin"),
+    ("ruta_entrega", "ruta_id", "coordenadas_inicio", "latitud_inicio", "longitud_inicio"),
+    ("ruta_entrega", "ruta_id", "coordenadas_fin", "latitud_fin", "longitud_fin"),
+]
+
+
+def rellenar_coordenadas(conn, lote: int = 5000) -> dict:
+    """
+    Rellena todas las columnas de COLUMNAS usando `conn` (la de la migración
+    o una en autocommit, para que cada lote se confirme por separado).
+    Retorna filas actualizadas por columna.
+    """
+    actualizadas = {}
+    for tabla, pk, texto, lat, lon in COLUMNAS:
+        # Paginación por clave: las filas con texto inválido quedan en NULL y
+        # no se vuelven a leer
+        seleccion = f"SELECT {pk}, {texto} FROM {tabla} WHERE {lat} IS NULL AND {texto} IS NOT NULL"
+        leer_primero = text(f"{seleccion} ORDER BY {pk} LIMIT :lote")
+        leer = text(f"{seleccion} AND {pk} > :ultimo ORDER BY {pk} LIMIT :lote")
+        escribir = text(f"UPDATE {tabla} SET {lat} = :lat, {lon} = :lon WHERE {pk} = :pk AND {lat} IS NULL")
+        total = 0
+        ultimo = None
+        while True:
+            if ultimo is None:
+                filas = conn.execute(leer_primero, {"lote": lote}).all()
+            else:
+                filas = conn.execute(leer, {"ultimo": ultimo, "lote": lote}).all()
+            if not filas:
+                break
+            ultimo = filas[-1][0]
+            valores = []
+            for clave, coordenadas in filas:
+                punto = parsear_coordenadas(coordenadas)
+                if punto is not None:
+                    valores.append({"pk": clave, "lat": punto[0], "lon": punto[1]})
+            if valores:
+                conn.execute(escribir, valores)
+            total += len(valores)
+            if len(filas) < lote:
+                break
+        actualizadas[f"{tabla}.{texto}"] = total
+    return actualizadas
+
+
+if __name__ == "__main__":
+    with engine.connect() as conn:
+        print(rellenar_coordenadas(conn.execution_options(isolation_level="AUTOCOMMIT")))
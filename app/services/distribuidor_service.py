@@ -1,18 +1,21 @@
-import bcrypt
 from sqlalchemy.orm import Session
 from uuid import UUID
+from app.auth import contrasenas
 from app.models.distribuidor_model import Distribuidor
 from app.schemas.distribuidor_schema import DistribuidorCreate, DistribuidorUpdate
+from app.services import indice_espacial_service
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return contrasenas.hashear_sync(password)
 
-def crear_distribuidor(db: Session, distribuidor: DistribuidorCreate):
-    hashed_pw = hash_password(distribuidor.password)
+def crear_distribuidor(db: Session, distribuidor: DistribuidorCreate, password_hash: str | None = None):
+    """`password_hash`: hash ya calculado por la ruta (fuera del hilo de la BD)."""
+    hashed_pw = password_hash or hash_password(distribuidor.password)
     nuevo = Distribuidor(**distribuidor.dict(exclude={"password"}), password=hashed_pw)
     db.add(nuevo)
     db.commit()
     db.refresh(nuevo)
+    indice_espacial_service.actualizar_distribuidor(nuevo)
     return nuevo
 
 def obtener_distribuidores(db: Session):
@@ -21,15 +24,16 @@ def obtener_distribuidores(db: Session):
 def obtener_distribuidor(db: Session, distribuidor_id: UUID):
     return db.query(Distribuidor).filter(Distribuidor.id == distribuidor_id).first()
 
-def actualizar_distribuidor(db: Session, distribuidor_id: UUID, datos: DistribuidorUpdate):
+def actualizar_distribuidor(db: Session, distribuidor_id: UUID, datos: DistribuidorUpdate, password_hash: str | None = None):
     dist = db.query(Distribuidor).filter(Distribuidor.id == distribuidor_id).first()
     if dist:
         for key, value in datos.dict().items():
             if key == "password":
-                value = hash_password(value)
+                value = password_hash or hash_password(value)
             setattr(dist, key, value)
         db.commit()
         db.refresh(dist)
+        indice_espacial_service.actualizar_distribuidor(dist)
     return dist
 
 def cambiar_estado_distribuidor(db: Session, distribuidor_id: UUID, activo: bool):
@@ -45,4 +49,5 @@ def eliminar_distribuidor(db: Session, distribuidor_id: UUID):
     if dist:
         db.delete(dist)
         db.commit()
+        indice_espacial_service.quitar_distribuidor(distribuidor_id)
     return dist
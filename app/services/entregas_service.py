@@ -1,15 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from uuid import UUID
+from app.models.asignacion_model import AsignacionEntrega
 from app.models.ruta_entrega_model import Entrega
 from app.models.pedido_model import Pedido, DetallePedido
 from app.services.producto_service import descontar_stock_por_pedido
 from app.schemas.entrega_schema import EntregaUpdate
+from app.services.broker_service import publicar_estado_entrega
 
 def completar_entrega(db: Session, entrega_id: UUID, datos: EntregaUpdate):
     ent: Entrega = db.query(Entrega).filter(Entrega.id_entrega==entrega_id).first()
     if not ent:
         return None
 
+    estado_anterior = ent.estado
     primera_vez = ent.estado != "entregado"
 
     ent.coordenadas_fin = datos.coordenadas_fin
@@ -26,4 +30,64 @@ def completar_entrega(db: Session, entrega_id: UUID, datos: EntregaUpdate):
 
     db.commit()
     db.refresh(ent)          
+    if ent.estado != estado_anterior:
+        publicar_estado_entrega(ent)
     return ent
+
+
+# ─── Asignaciones del distribuidor con ruta y entregas ───────────────
+def consulta_asignaciones_distribuidor(distribuidor_id: UUID, *filtros):
+    """
+    SELECT de las asignaciones de un distribuidor con todo lo que necesitan
+    las respuestas de /entregas precargado en tres consultas fijas:
+      1. asignaciones + ruta (JOIN)
+      2. entregas + cliente + pedido (IN sobre las asignaciones, con JOINs)
+      3. detalles de los pedidos (IN)
+    """
+    return (
+        select(AsignacionEntrega)
+        .where(AsignacionEntrega.id_distribuidor == distribuidor_id, *filtros)
+        .options(
+            joinedload(AsignacionEntrega.ruta),
+            selectinload(AsignacionEntrega.entregas).options(
+                joinedload(Entrega.cliente),
+                joinedload(Entrega.pedido).selectinload(Pedido.detalles),
+            ),
+        )
+    )
+
+def cargar_asignaciones_distribuidor(db: Session, distribuidor_id: UUID, *filtros) -> list[AsignacionEntrega]:
+    return db.execute(consulta_asignaciones_distribuidor(distribuidor_id, *filtros)).unique().scalars().all()
+
+def serializar_asignacion(asignacion: AsignacionEntrega, **extra) -> dict | None:
+    """Respuesta de AsignacionEntregaOut; None si la asignación no tiene ruta."""
+    ruta = asignacion.ruta
+    if not ruta:
+        return None
+    entregas_ordenadas = sorted(asignacion.entregas, key=lambda e: e.orden_entrega)
+    return {
+        "id": asignacion.id,
+        "fecha_asignacion": asignacion.fecha_asignacion,
+        "estado": asignacion.estado,
+        **extra,
+        "ruta": {
+            "ruta_id": ruta.ruta_id,
+            "coordenadas_inicio": ruta.coordenadas_inicio,
+            "coordenadas_fin": ruta.coordenadas_fin,
+            "distancia": float(ruta.distancia) if ruta.distancia else None,
+            "tiempo_estimado": ruta.tiempo_estimado,
+            "entregas": [
+                {
+                    "id_entrega": entrega.id_entrega,
+                    "fecha_hora_reg": entrega.fecha_hora_reg,
+                    "coordenadas_fin": entrega.coordenadas_fin,
+                    "estado": entrega.estado,
+                    "observaciones": entrega.observaciones,
+                    "orden_entrega": entrega.orden_entrega,
+                    "cliente": entrega.cliente,
+                    "pedido": entrega.pedido
+                }
+                for entrega in entregas_ordenadas
+            ]
+        }
+    }
@@ -0,0 +1,371 @@
+"""
+Historial de ubicaciones de los distribuidores.
+
+  • Almacenamiento: historial_ubicacion está particionada por día en
+    PostgreSQL. Las particiones se crean bajo demanda, en su propia
+    transacción, antes de insertar posiciones de un día nuevo.
+  • Escritura: insertar_historial() usa COPY ... FROM STDIN con psycopg2 (un
+    solo viaje por lote); con otros drivers cae a un INSERT masivo.
+  • Compactación: los días anteriores a HISTORIAL_DIAS_DETALLE se reducen
+    con Douglas–Peucker (tolerancia HISTORIAL_TOLERANCIA_M), se guardan como
+    polyline en recorrido_compactado y se elimina la partición completa.
+    Nunca se compactan los últimos HISTORIAL_GRACIA_DIAS días, que todavía
+    pueden recibir posiciones atrasadas (la ingesta acepta hasta un día de
+    atraso). En PostgreSQL la partición primero se desvincula (DETACH, que
+    espera a los COPY en curso) y se renombra; recién entonces se lee y se
+    elimina, así que una inserción tardía no se pierde: crea una partición
+    nueva para ese día que se combina en la próxima pasada.
+  • Consulta: recorrido() combina posiciones crudas y días compactados de
+    una ventana de tiempo.
+
+Uso (compactación, p. ej. una vez al día desde cron):
+    python -m app.services.historial_service compactar
+"""
+import csv
+import io
+import os
+import sys
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import polyline
+from sqlalchemy import column, func, insert, select, table, text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.geo.simplificacion import douglas_peucker, longitud_recorrido
+from app.models.historial_ubicacion_model import HistorialUbicacion, RecorridoCompactado
+
+DIAS_DETALLE = int(os.getenv("HISTORIAL_DIAS_DETALLE", "7"))
+TOLERANCIA_M = float(os.getenv("HISTORIAL_TOLERANCIA_M", "15"))
+VENTANA_MAXIMA_DIAS = int(os.getenv("HISTORIAL_VENTANA_MAXIMA_DIAS", "31"))
+GRACIA_DIAS = int(os.getenv("HISTORIAL_GRACIA_DIAS", "2"))
+
+COLUMNAS = ("id", "registrado_en", "distribuidor_id", "latitud", "longitud", "recibido_en")
+
+_particiones: set = set()
+_lock = threading.Lock()
+
+
+# ─── Particiones ─────────────────────────────────────────────────────
+def nombre_particion(dia: date) -> str:
+    return f"historial_ubicacion_p{dia:%Y%m%d}"
+
+
+def nombre_separada(dia: date) -> str:
+    """Nombre de la partición del día mientras se compacta, ya desvinculada."""
+    return f"historial_ubicacion_c{dia:%Y%m%d}"
+
+
+def _crear_particion(conn, dia: date):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {nombre_particion(dia)} PARTITION OF historial_ubicacion "
+        f"FOR VALUES FROM ('{dia.isoformat()}') TO ('{(dia + timedelta(days=1)).isoformat()}')"
+    ))
+
+
+def asegurar_particiones(dias):
+    """Crea las particiones de `dias` que falten (no hace nada fuera de PostgreSQL)."""
+    if engine.dialect.name != "postgresql":
+        return
+    with _lock:
+        faltan = sorted(set(dias) - _particiones)
+        if not faltan:
+            return
+        # Transacción propia: si el lote que sigue falla, las particiones quedan creadas
+        with engine.begin() as conn:
+            for dia in faltan:
+                _crear_particion(conn, dia)
+        _particiones.update(faltan)
+
+
+def convertir_historial_sin_particion(conn):
+    """
+    Pasa a tabla particionada una historial_ubicacion creada antes de que
+    lo fuera, copiando sus filas. Se llama desde la migración
+    v008_historial_particionado, dentro de su transacción.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    particionada = conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('historial_ubicacion'))"
+    )).scalar()
+    if particionada:
+        return
+    print("Convirtiendo historial_ubicacion en tabla particionada por día")
+    conn.execute(text("ALTER TABLE historial_ubicacion RENAME TO historial_ubicacion_previo"))
+    conn.execute(text(
+        "ALTER TABLE historial_ubicacion_previo RENAME CONSTRAINT historial_ubicacion_pkey TO historial_ubicacion_previo_pkey"
+    ))
+    conn.execute(text(
+        "ALTER INDEX IF EXISTS ix_historial_ubicacion_distribuidor_fecha RENAME TO ix_historial_ubicacion_previo_fecha"
+    ))
+    HistorialUbicacion.__table__.create(conn)
+    dias = conn.execute(text("SELECT DISTINCT registrado_en::date FROM historial_ubicacion_previo")).scalars().all()
+    for dia in dias:
+        _crear_particion(conn, dia)
+    columnas = ", ".join(COLUMNAS)
+    conn.execute(text(
+        f"INSERT INTO historial_ubicacion ({columnas}) SELECT {columnas} FROM historial_ubicacion_previo"
+    ))
+    conn.execute(text("DROP TABLE historial_ubicacion_previo"))
+
+
+# ─── Escritura ───────────────────────────────────────────────────────
+def insertar_historial(db: Session, filas: list[dict]):
+    """Inserta posiciones (dicts con las columnas del modelo) en la transacción de `db`."""
+    if not filas:
+        return
+    asegurar_particiones({f["registrado_en"].date() for f in filas})
+    conn = db.connection()
+    if conn.dialect.driver != "psycopg2":
+        conn.execute(insert(HistorialUbicacion), filas)
+        return
+
+    datos = io.StringIO()
+    escritor = csv.writer(datos)
+    for f in filas:
+        escritor.writerow([
+            f.get("id") or uuid.uuid4(),
+            f["registrado_en"].isoformat(),
+            f["distribuidor_id"],
+            repr(float(f["latitud"])),
+            repr(float(f["longitud"])),
+            (f.get("recibido_en") or datetime.utcnow()).isoformat(),
+        ])
+    datos.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY historial_ubicacion ({', '.join(COLUMNAS)}) FROM STDIN WITH (FORMAT csv)", datos
+        )
+    except Exception:
+        # Puede faltar una partición que otro proceso eliminó al compactar:
+        # el próximo intento vuelve a comprobarlas
+        with _lock:
+            _particiones.clear()
+        raise
+    finally:
+        cursor.close()
+
+
+# ─── Compactación ────────────────────────────────────────────────────
+def _codificar(puntos: list, tiempos: list, inicio: datetime) -> tuple[str, str]:
+    return (
+        polyline.encode(puntos),
+        ",".join(str(int((t - inicio).total_seconds())) for t in tiempos),
+    )
+
+
+def _decodificar(compactado: RecorridoCompactado) -> list[tuple]:
+    puntos = polyline.decode(compactado.polyline)
+    segundos = [int(s) for s in compactado.tiempos.split(",")] if compactado.tiempos else []
+    return [
+        (compactado.inicio + timedelta(seconds=s), lat, lon)
+        for s, (lat, lon) in zip(segundos, puntos)
+    ]
+
+
+def _tabla(nombre: str):
+    """Tabla con las columnas de historial_ubicacion (para leer una partición separada)."""
+    return table(nombre, *(column(c.name, c.type) for c in HistorialUbicacion.__table__.c))
+
+
+def _separar_particion(db: Session, dia: date):
+    """
+    Desvincula y renombra la partición del día en una transacción corta.
+    DETACH espera a las inserciones en curso; después ningún COPY llega a
+    esas filas y uno atrasado crea otra partición para el día.
+    """
+    db.execute(text(f"ALTER TABLE historial_ubicacion DETACH PARTITION {nombre_particion(dia)}"))
+    db.execute(text(f"ALTER TABLE {nombre_particion(dia)} RENAME TO {nombre_separada(dia)}"))
+    db.commit()
+    with _lock:
+        _particiones.discard(dia)
+    return _tabla(nombre_separada(dia))
+
+
+def _separadas(db: Session) -> list[date]:
+    """Días con la partición separada por una compactación que no terminó."""
+    nombres = db.execute(text(
+        "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() "
+        "AND tablename LIKE 'historial\\_ubicacion\\_c%'"
+    )).scalars().all()
+    return sorted(datetime.strptime(n[-8:], "%Y%m%d").date() for n in nombres)
+
+
+def _compactar_dia(db: Session, origen, dia: date, tolerancia_m: float, resumen: dict):
+    inicio_dia = datetime.combine(dia, datetime.min.time())
+    distribuidores = db.execute(
+        select(origen.c.distribuidor_id).distinct().where(
+            origen.c.registrado_en >= inicio_dia,
+            origen.c.registrado_en < inicio_dia + timedelta(days=1),
+        )
+    ).scalars().all()
+    for distribuidor_id in distribuidores:
+        originales, puntos = _compactar_distribuidor(db, origen, distribuidor_id, dia, tolerancia_m)
+        resumen["recorridos"] += 1
+        resumen["puntos_originales"] += originales
+        resumen["puntos"] += puntos
+    resumen["dias"] += 1
+
+
+def _compactar_distribuidor(db: Session, origen, distribuidor_id, dia: date, tolerancia_m: float) -> tuple[int, int]:
+    inicio_dia = datetime.combine(dia, datetime.min.time())
+    filas = db.execute(
+        select(origen.c.registrado_en, origen.c.latitud, origen.c.longitud)
+        .where(
+            origen.c.distribuidor_id == distribuidor_id,
+            origen.c.registrado_en >= inicio_dia,
+            origen.c.registrado_en < inicio_dia + timedelta(days=1),
+        )
+        .order_by(origen.c.registrado_en)
+    ).all()
+    originales = len(filas)
+
+    # Posiciones que llegaron tarde a un día ya compactado: se combinan con lo guardado
+    previo = db.get(RecorridoCompactado, (distribuidor_id, dia))
+    if previo is not None:
+        filas = sorted([*filas, *_decodificar(previo)], key=lambda f: f[0])
+        originales += previo.puntos_originales
+
+    conservar = douglas_peucker([(f[1], f[2]) for f in filas], tolerancia_m)
+    filas = [filas[i] for i in conservar]
+    codificado, tiempos = _codificar([(f[1], f[2]) for f in filas], [f[0] for f in filas], filas[0][0])
+    db.merge(RecorridoCompactado(
+        distribuidor_id=distribuidor_id,
+        dia=dia,
+        polyline=codificado,
+        tiempos=tiempos,
+        inicio=filas[0][0],
+        fin=filas[-1][0],
+        puntos_originales=originales,
+        puntos=len(filas),
+        tolerancia_m=tolerancia_m,
+    ))
+    return originales, len(filas)
+
+
+def compactar(antes_de: date | None = None, tolerancia_m: float = TOLERANCIA_M) -> dict:
+    """
+    Compacta todos los días anteriores a `antes_de` (por defecto hoy -
+    HISTORIAL_DIAS_DETALLE), pero nunca los últimos HISTORIAL_GRACIA_DIAS.
+    """
+    antes_de = min(
+        antes_de or datetime.utcnow().date() - timedelta(days=DIAS_DETALLE),
+        datetime.utcnow().date() - timedelta(days=GRACIA_DIAS),
+    )
+    limite = datetime.combine(antes_de, datetime.min.time())
+    resumen = {"dias": 0, "recorridos": 0, "puntos_originales": 0, "puntos": 0}
+
+    db = SessionLocal()
+    try:
+        postgresql = db.bind.dialect.name == "postgresql"
+        if postgresql:
+            # Primero lo que dejó a medias una pasada anterior
+            for dia in _separadas(db):
+                _compactar_dia(db, _tabla(nombre_separada(dia)), dia, tolerancia_m, resumen)
+                db.execute(text(f"DROP TABLE {nombre_separada(dia)}"))
+                db.commit()
+
+        while True:
+            primero = db.query(func.min(HistorialUbicacion.registrado_en)).filter(
+                HistorialUbicacion.registrado_en < limite
+            ).scalar()
+            if primero is None:
+                break
+            dia = primero.date()
+
+            # Borrar el día: la partición entera en PostgreSQL, las filas en otros motores
+            if postgresql:
+                db.commit()  # sin locks de lectura sobre la tabla antes del DETACH
+                separada = _separar_particion(db, dia)
+                _compactar_dia(db, separada, dia, tolerancia_m, resumen)
+                db.execute(text(f"DROP TABLE {separada.name}"))
+            else:
+                _compactar_dia(db, HistorialUbicacion.__table__, dia, tolerancia_m, resumen)
+                inicio_dia = datetime.combine(dia, datetime.min.time())
+                db.query(HistorialUbicacion).filter(
+                    HistorialUbicacion.registrado_en >= inicio_dia,
+                    HistorialUbicacion.registrado_en < inicio_dia + timedelta(days=1),
+                ).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+    return resumen
+
+
+# ─── Consulta ────────────────────────────────────────────────────────
+def _utc(fecha: datetime) -> datetime:
+    """Las horas se guardan en UTC sin zona: convierte las que traen zona."""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def recorrido(
+    db: Session,
+    distribuidor_id,
+    desde: datetime,
+    hasta: datetime,
+    tolerancia_m: float | None = None,
+) -> dict:
+    """
+    Recorrido de un distribuidor entre `desde` y `hasta`: puntos en orden
+    cronológico, kilómetros recorridos y polyline. Con `tolerancia_m` el
+    resultado se simplifica con Douglas–Peucker.
+    """
+    desde, hasta = _utc(desde), _utc(hasta)
+    if hasta <= desde:
+        raise ValueError("'hasta' debe ser posterior a 'desde'")
+    if hasta - desde > timedelta(days=VENTANA_MAXIMA_DIAS):
+        raise ValueError(f"La ventana no puede superar {VENTANA_MAXIMA_DIAS} días")
+
+    # Las condiciones sobre registrado_en permiten descartar particiones
+    crudos = db.execute(
+        select(HistorialUbicacion.registrado_en, HistorialUbicacion.latitud, HistorialUbicacion.longitud)
+        .where(
+            HistorialUbicacion.distribuidor_id == distribuidor_id,
+            HistorialUbicacion.registrado_en >= desde,
+            HistorialUbicacion.registrado_en <= hasta,
+        )
+        .order_by(HistorialUbicacion.registrado_en)
+    ).all()
+    compactados = db.query(RecorridoCompactado).filter(
+        RecorridoCompactado.distribuidor_id == distribuidor_id,
+        RecorridoCompactado.dia >= desde.date(),
+        RecorridoCompactado.dia <= hasta.date(),
+    ).all()
+
+    puntos = [tuple(f) for f in crudos]
+    if compactados:
+        puntos.extend(
+            p for c in compactados for p in _decodificar(c) if desde <= p[0] <= hasta
+        )
+        puntos.sort(key=lambda p: p[0])
+
+    if tolerancia_m and len(puntos) > 2:
+        puntos = [puntos[i] for i in douglas_peucker([(p[1], p[2]) for p in puntos], tolerancia_m)]
+
+    coordenadas = [(p[1], p[2]) for p in puntos]
+    return {
+        "distribuidor_id": str(distribuidor_id),
+        "desde": desde,
+        "hasta": hasta,
+        "distancia_km": round(longitud_recorrido(coordenadas), 3),
+        "cantidad_puntos": len(puntos),
+        "polyline": polyline.encode(coordenadas) if coordenadas else "",
+        "puntos": [
+            {"registrado_en": t, "latitud": lat, "longitud": lon}
+            for t, lat, lon in puntos
+        ],
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "compactar":
+        print("Uso: python -m app.services.historial_service compactar")
+        sys.exit(1)
+    print(compactar())
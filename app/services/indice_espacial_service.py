@@ -0,0 +1,95 @@
+"""
+Índices espaciales de tiendas y de posiciones de distribuidores.
+
+Se construyen la primera vez que se consultan (una consulta de id + lat/lon)
+y se mantienen al día desde el CRUD de tiendas, el CRUD de distribuidores y
+PATCH /distribuidores/{id}/ubicacion. Cada worker tiene sus propios índices;
+para recoger cambios hechos en otros procesos se reconstruyen cada
+INDICE_ESPACIAL_TTL_S segundos.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.geo.indice_espacial import IndiceEspacial
+from app.models.tienda_model import Tienda
+from app.models.distribuidor_model import Distribuidor
+
+TTL_S = float(os.getenv("INDICE_ESPACIAL_TTL_S", "300"))
+
+_indices = {
+    Tienda: IndiceEspacial(),
+    Distribuidor: IndiceEspacial(),
+}
+_construido_en: dict = {}
+_lock = threading.Lock()
+
+
+def _indice(db: Session, modelo) -> IndiceEspacial:
+    indice = _indices[modelo]
+    with _lock:
+        if time.monotonic() - _construido_en.get(modelo, float("-inf")) > TTL_S:
+            filas = db.query(modelo.id, modelo.latitud, modelo.longitud).filter(
+                modelo.latitud.isnot(None), modelo.longitud.isnot(None)
+            ).all()
+            indice.reconstruir(filas)
+            _construido_en[modelo] = time.monotonic()
+    return indice
+
+
+def indice_tiendas(db: Session) -> IndiceEspacial:
+    return _indice(db, Tienda)
+
+
+def indice_distribuidores(db: Session) -> IndiceEspacial:
+    return _indice(db, Distribuidor)
+
+
+def tienda_mas_cercana(db: Session, punto: tuple):
+    """Tienda más cercana a un punto (lat, lon) o None si no hay tiendas con coordenadas."""
+    for tienda_id, _ in indice_tiendas(db).cercanos(punto, 3):
+        tienda = db.query(Tienda).filter(Tienda.id == tienda_id).first()
+        if tienda:
+            return tienda
+        # Borrada en otro proceso: sacarla del índice y seguir
+        _indices[Tienda].quitar(tienda_id)
+    return None
+
+
+def tiendas_mas_cercanas(db: Session, puntos: list) -> list:
+    """La tienda más cercana a cada punto, con una sola consulta a la BD."""
+    indice = indice_tiendas(db)
+    ids = [indice.mas_cercano(p) for p in puntos]
+    conocidos = {i for i in ids if i is not None}
+    por_id = {
+        t.id: t for t in db.query(Tienda).filter(Tienda.id.in_(conocidos)).all()
+    } if conocidos else {}
+    return [por_id.get(i) or tienda_mas_cercana(db, p) for i, p in zip(ids, puntos)]
+
+
+# ─── Mantenimiento incremental ───────────────────────────────────────
+def _actualizar(modelo, entidad):
+    if entidad is None:
+        return
+    if entidad.latitud is None or entidad.longitud is None:
+        _indices[modelo].quitar(entidad.id)
+    else:
+        _indices[modelo].upsert(entidad.id, entidad.latitud, entidad.longitud)
+
+
+def actualizar_tienda(tienda: Tienda):
+    _actualizar(Tienda, tienda)
+
+
+def quitar_tienda(tienda_id):
+    _indices[Tienda].quitar(tienda_id)
+
+
+def actualizar_distribuidor(distribuidor: Distribuidor):
+    _actualizar(Distribuidor, distribuidor)
+
+
+def quitar_distribuidor(distribuidor_id):
+    _indices[Distribuidor].quitar(distribuidor_id)
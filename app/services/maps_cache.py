@@ -0,0 +1,207 @@
+"""
+Caché de distancias / tiempos de Google Maps en dos niveles:
+
+    1. LRU en memoria del proceso.
+    2. Archivo SQLite persistente compartido entre reinicios y workers.
+
+La clave es (origen, destino) redondeados a MAPS_CACHE_DECIMALES decimales
+(~11 m con 4) más la franja horaria de la consulta, porque el tiempo con
+tráfico depende de la hora del día. Las entradas vencen a los
+MAPS_CACHE_TTL_S segundos; una entrada vencida sólo se devuelve cuando se
+pide explícitamente (ruta de respaldo sin Google).
+
+El lock protege sólo el LRU en memoria: las lecturas y escrituras del
+archivo se hacen fuera de él, con una conexión SQLite por hilo (WAL permite
+leer mientras otro escribe). Un error de SQLite (archivo bloqueado, disco
+lleno, archivo corrupto) cuenta como miss y no hace fallar la consulta.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Por defecto en la raíz del proyecto, no en el directorio de trabajo del proceso
+RUTA_POR_DEFECTO = str(Path(__file__).resolve().parents[2] / "maps_cache.sqlite3")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS distancia_cache (
+    clave        TEXT PRIMARY KEY,
+    distancia_km REAL NOT NULL,
+    tiempo       TEXT NOT NULL,
+    guardado_en  REAL NOT NULL
+)
+"""
+
+
+class CacheDistancias:
+    def __init__(
+        self,
+        ruta_sqlite: str | None,
+        capacidad: int = 10_000,
+        ttl_s: float = 7 * 24 * 3600,
+        decimales: int = 4,
+        franja_min: int = 60,
+    ):
+        # Absoluta: todos los workers tienen que abrir el mismo archivo
+        self.ruta_sqlite = os.path.abspath(ruta_sqlite) if ruta_sqlite else None
+        self.capacidad = capacidad
+        self.ttl_s = ttl_s
+        self.decimales = decimales
+        self.franja_min = franja_min
+        self._memoria: OrderedDict[str, tuple[float, str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._contadores = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "hits_expirados": 0,
+            "misses": 0,
+            "escrituras": 0,
+            "desalojos": 0,
+        }
+
+    # ─── Claves ────────────────────────────────────────────────────
+    def clave(self, origen: tuple, destino: tuple, momento: datetime | None = None) -> str:
+        momento = momento or datetime.now()
+        franja = (momento.hour * 60 + momento.minute) // self.franja_min
+        d = self.decimales
+        return (
+            f"{float(origen[0]):.{d}f},{float(origen[1]):.{d}f}|"
+            f"{float(destino[0]):.{d}f},{float(destino[1]):.{d}f}|{franja}"
+        )
+
+    # ─── Lectura / escritura ──────────────────────────────────────
+    def obtener(self, origen: tuple, destino: tuple, permitir_expirado: bool = False):
+        """
+        Retorna (distancia_km, tiempo_estimado) o None si no hay entrada válida.
+        Con `permitir_expirado=True` devuelve también entradas vencidas.
+        """
+        clave = self.clave(origen, destino)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                self._memoria.move_to_end(clave)
+        nivel = "hits_memoria"
+        if entrada is None:
+            entrada = self._leer_disco(clave)
+            nivel = "hits_disco"
+
+        with self._lock:
+            if nivel == "hits_disco" and entrada is not None:
+                self._guardar_memoria(clave, entrada)
+            if entrada is None:
+                self._contadores["misses"] += 1
+                return None
+
+            distancia_km, tiempo, guardado_en = entrada
+            if ahora - guardado_en > self.ttl_s:
+                if not permitir_expirado:
+                    self._contadores["misses"] += 1
+                    return None
+                nivel = "hits_expirados"
+            self._contadores[nivel] += 1
+            return distancia_km, tiempo
+
+    def guardar(self, origen: tuple, destino: tuple, distancia_km: float, tiempo: str):
+        clave = self.clave(origen, destino)
+        entrada = (float(distancia_km), str(tiempo), time.time())
+        with self._lock:
+            self._guardar_memoria(clave, entrada)
+            self._contadores["escrituras"] += 1
+        conexion = self._abrir()
+        if conexion is None:
+            return
+        try:
+            conexion.execute(
+                "INSERT OR REPLACE INTO distancia_cache VALUES (?, ?, ?, ?)",
+                (clave, *entrada),
+            )
+            conexion.commit()
+        except sqlite3.Error as e:
+            # La entrada sigue en memoria; se pierde sólo la copia persistente
+            print(f"Error al escribir en la caché de distancias: {e}")
+
+    def purgar_expirados(self) -> int:
+        """Elimina del disco y de memoria las entradas con TTL vencido."""
+        limite = time.time() - self.ttl_s
+        with self._lock:
+            vencidas = [c for c, e in self._memoria.items() if e[2] < limite]
+            for clave in vencidas:
+                del self._memoria[clave]
+        conexion = self._abrir()
+        if conexion is None:
+            return len(vencidas)
+        try:
+            cursor = conexion.execute(
+                "DELETE FROM distancia_cache WHERE guardado_en < ?", (limite,)
+            )
+            conexion.commit()
+        except sqlite3.Error as e:
+            print(f"Error al purgar la caché de distancias: {e}")
+            return len(vencidas)
+        return max(cursor.rowcount, len(vencidas))
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            contadores = dict(self._contadores)
+            contadores["entradas_memoria"] = len(self._memoria)
+        consultas = sum(contadores[k] for k in ("hits_memoria", "hits_disco", "hits_expirados", "misses"))
+        aciertos = consultas - contadores["misses"]
+        contadores["tasa_aciertos"] = round(aciertos / consultas, 4) if consultas else 0.0
+        return contadores
+
+    # ─── Internos ──────────────────────────────────────────────────
+    def _guardar_memoria(self, clave: str, entrada: tuple):
+        # Con el lock tomado
+        self._memoria[clave] = entrada
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+            self._contadores["desalojos"] += 1
+
+    def _leer_disco(self, clave: str):
+        # Sin el lock: otros hilos siguen usando la memoria mientras se lee el archivo
+        conexion = self._abrir()
+        if conexion is None:
+            return None
+        try:
+            fila = conexion.execute(
+                "SELECT distancia_km, tiempo, guardado_en FROM distancia_cache WHERE clave = ?",
+                (clave,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error al leer la caché de distancias: {e}")
+            return None
+        return tuple(fila) if fila else None
+
+    def _abrir(self):
+        """Conexión SQLite del hilo actual (se crea la primera vez)."""
+        if not self.ruta_sqlite:
+            return None
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            try:
+                conexion = sqlite3.connect(self.ruta_sqlite, timeout=5)
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.execute(_ESQUEMA)
+                conexion.commit()
+            except sqlite3.Error as e:
+                print(f"Error al abrir caché de distancias: {e}")
+                # Sin archivo utilizable la caché queda sólo en memoria
+                self.ruta_sqlite = None
+                return None
+            self._local.conexion = conexion
+        return conexion
+
+
+cache_distancias = CacheDistancias(
+    ruta_sqlite=os.getenv("MAPS_CACHE_PATH", RUTA_POR_DEFECTO),
+    capacidad=int(os.getenv("MAPS_CACHE_CAPACIDAD", "10000")),
+    ttl_s=float(os.getenv("MAPS_CACHE_TTL_S", str(7 * 24 * 3600))),
+    decimales=int(os.getenv("MAPS_CACHE_DECIMALES", "4")),
+    franja_min=int(os.getenv("MAPS_CACHE_FRANJA_MIN", "60")),
+)
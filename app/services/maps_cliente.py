@@ -0,0 +1,128 @@
+"""
+Cliente HTTP compartido para las APIs de Google Maps.
+
+Una sola `requests.Session` con pool de conexiones keep-alive, timeouts por
+solicitud, concurrencia acotada por semáforo, reintentos con backoff
+exponencial con jitter y un circuit breaker: tras MAPS_CIRCUITO_FALLOS
+fallos consecutivos el circuito se abre durante MAPS_CIRCUITO_ESPERA_S
+segundos y las llamadas devuelven None de inmediato, para que el llamador
+use la estimación de respaldo en lugar de bloquear un worker.
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Estados de Google que vale la pena reintentar
+_ESTADOS_TRANSITORIOS = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class CircuitBreaker:
+    def __init__(self, max_fallos: int, espera_s: float):
+        self.max_fallos = max_fallos
+        self.espera_s = espera_s
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """Cerrado, o semiabierto cuando ya pasó la espera (deja pasar una sola prueba)."""
+        with self._lock:
+            if self._fallos < self.max_fallos:
+                return True
+            ahora = time.monotonic()
+            if ahora >= self._abierto_hasta:
+                self._abierto_hasta = ahora + self.espera_s
+                return True
+            return False
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_hasta = 0.0
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._fallos >= self.max_fallos:
+                self._abierto_hasta = time.monotonic() + self.espera_s
+                print(f"Circuito de Google Maps abierto por {self.espera_s}s tras {self._fallos} fallos")
+
+    @property
+    def abierto(self) -> bool:
+        with self._lock:
+            return self._fallos >= self.max_fallos and time.monotonic() < self._abierto_hasta
+
+
+class ClienteMaps:
+    def __init__(
+        self,
+        timeout: tuple[float, float] = (3.05, 10.0),
+        reintentos: int = 2,
+        backoff_s: float = 0.25,
+        concurrencia: int = 8,
+        circuito_fallos: int = 5,
+        circuito_espera_s: float = 30.0,
+    ):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff_s = backoff_s
+        self.circuito = CircuitBreaker(circuito_fallos, circuito_espera_s)
+        self._semaforo = threading.BoundedSemaphore(concurrencia)
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=concurrencia, max_retries=0)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+    def get_json(self, url: str, params: dict) -> dict | None:
+        """
+        GET que devuelve el JSON de la respuesta o None si la solicitud falló
+        después de los reintentos o si el circuito está abierto.
+        """
+        if not self.circuito.permitir():
+            return None
+
+        for intento in range(self.reintentos + 1):
+            try:
+                with self._semaforo:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code >= 500 or response.status_code == 429:
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                if data.get("status") in _ESTADOS_TRANSITORIOS:
+                    raise requests.HTTPError(f"Google Maps respondió {data['status']}")
+                self.circuito.exito()
+                return data
+            except requests.HTTPError as e:
+                # 4xx distintos de 429 no se reintentan
+                if e.response is not None and 400 <= e.response.status_code < 500:
+                    print(f"Error al consultar Google Maps API: {e}")
+                    return None
+                error = e
+            except (requests.RequestException, ValueError) as e:
+                error = e
+
+            if intento < self.reintentos:
+                # Backoff exponencial con jitter completo
+                time.sleep(random.uniform(0, self.backoff_s * 2 ** intento))
+
+        print(f"Error al consultar Google Maps API: {error}")
+        self.circuito.fallo()
+        return None
+
+
+cliente_maps = ClienteMaps(
+    timeout=(
+        float(os.getenv("MAPS_TIMEOUT_CONEXION_S", "3.05")),
+        float(os.getenv("MAPS_TIMEOUT_LECTURA_S", "10")),
+    ),
+    reintentos=int(os.getenv("MAPS_REINTENTOS", "2")),
+    backoff_s=float(os.getenv("MAPS_BACKOFF_S", "0.25")),
+    concurrencia=int(os.getenv("MAPS_CONCURRENCIA", "8")),
+    circuito_fallos=int(os.getenv("MAPS_CIRCUITO_FALLOS", "5")),
+    circuito_espera_s=float(os.getenv("MAPS_CIRCUITO_ESPERA_S", "30")),
+)
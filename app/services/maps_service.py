@@ -1,134 +1,138 @@
-import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
-def obtener_distancia_tiempo(origen: tuple, destino: tuple):
+import numpy as np
+
+from app.geo.red_vial import obtener_red
+from app.services.maps_cache import cache_distancias
+from app.services.maps_cliente import cliente_maps
+
+URL_DIRECTIONS = "https://maps.googleapis.com/maps/api/directions/json"
+# Solicitudes de tramos en paralelo
+HILOS_TRAMOS = int(os.getenv("MAPS_TRAMOS_HILOS", "4"))
+# Waypoints por solicitud de tramos (Directions admite 25; más de 10 se cobra como avanzada)
+TRAMOS_WAYPOINTS = max(1, min(25, int(os.getenv("MAPS_TRAMOS_WAYPOINTS", "10"))))
+# Velocidad promedio usada cuando no hay datos de Google
+MINUTOS_POR_KM = 2.5
+
+def obtener_tramos(puntos: list):
     """
-    Utiliza la API de Google Maps para obtener la distancia y tiempo estimado
-    entre dos puntos usando sus coordenadas.
-    
-    Args:
-        origen: Tuple (latitud, longitud) del punto de origen
-        destino: Tuple (latitud, longitud) del punto de destino
-        
+    Distancia y tiempo de cada tramo consecutivo puntos[i] -> puntos[i+1].
+
+    Con API key cada solicitud es una Directions API con hasta
+    TRAMOS_WAYPOINTS paradas intermedias en el orden dado (sin optimizar):
+    Google devuelve un `leg` por tramo y cobra por solicitud, no por cada
+    par origen×destino como la Distance Matrix. Un trozo de la ruta que ya
+    está entero en la caché no se consulta; los tramos que Google no
+    resuelve salen de la caché vencida, la red vial local o la línea recta.
+
     Returns:
-        Tuple (distancia_km, tiempo_estimado)
+        Tuple (distancias_km, segundos) de np.ndarray con len(puntos) - 1 elementos
     """
+    puntos = [tuple(p) for p in puntos]
+    tramos = max(len(puntos) - 1, 0)
+    k = TRAMOS_WAYPOINTS + 1
+    trozos = [puntos[i:min(i + k, tramos) + 1] for i in range(0, tramos, k)]
+
     api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
-    if not api_key:
-        return _calcular_distancia_tiempo_estimado(origen, destino)
-    
+    if cliente_maps.circuito.abierto:
+        api_key = None
+    if not api_key or len(trozos) <= 1:
+        resultados = [_tramos_trozo(t, api_key) for t in trozos]
+    else:
+        with ThreadPoolExecutor(max_workers=min(HILOS_TRAMOS, len(trozos))) as executor:
+            resultados = list(executor.map(lambda t: _tramos_trozo(t, api_key), trozos))
+    distancias = np.concatenate([d for d, _ in resultados]) if resultados else np.zeros(0)
+    segundos = np.concatenate([s for _, s in resultados]) if resultados else np.zeros(0)
+    return distancias, segundos
+
+def _tramos_trozo(puntos: list, api_key: str = None):
+    """Tramos consecutivos de `puntos` (a lo sumo TRAMOS_WAYPOINTS + 2 puntos)."""
+    pares = list(zip(puntos, puntos[1:]))
+    distancias = np.full(len(pares), np.nan)
+    segundos = np.full_like(distancias, np.nan)
+
+    if api_key:
+        for i, (origen, destino) in enumerate(pares):
+            en_cache = cache_distancias.obtener(origen, destino)
+            if en_cache is not None:
+                distancias[i] = en_cache[0]
+                segundos[i] = _a_segundos(en_cache[1])
+        if np.isnan(distancias).any():
+            _consultar_tramos(puntos, api_key, distancias, segundos)
+
+    faltantes = np.flatnonzero(np.isnan(distancias))
+    if len(faltantes):
+        estimado_km, estimado_s = _matriz_estimada(
+            [pares[i][0] for i in faltantes], [pares[i][1] for i in faltantes]
+        )
+        for k, i in enumerate(faltantes):
+            en_cache = cache_distancias.obtener(*pares[i], permitir_expirado=True)
+            if en_cache is not None:
+                distancias[i] = en_cache[0]
+                segundos[i] = _a_segundos(en_cache[1])
+            else:
+                distancias[i] = estimado_km[k, k]
+                segundos[i] = estimado_s[k, k]
+    return distancias, segundos
+
+def _consultar_tramos(puntos: list, api_key: str, distancias, segundos):
+    """Una solicitud a la Directions API con los puntos intermedios como waypoints."""
     try:
-        url = "https://maps.googleapis.com/maps/api/distancematrix/json"
         params = {
-            "origins": f"{origen[0]},{origen[1]}",
-            "destinations": f"{destino[0]},{destino[1]}",
+            "origin": f"{puntos[0][0]},{puntos[0][1]}",
+            "destination": f"{puntos[-1][0]},{puntos[-1][1]}",
             "mode": "driving",
             "key": api_key,
-            # Incluir hora de salida para considerar tráfico en tiempo real
             "departure_time": "now",
             "traffic_model": "best_guess",
         }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data["status"] == "OK":
-            element = data["rows"][0]["elements"][0]
-            if element["status"] == "OK":
-                # Convertir metros a kilómetros
-                distancia_km = element["distance"]["value"] / 1000
-                # Convertir segundos a formato de tiempo
-                segundos = element["duration"]["value"]
-                tiempo_estimado = str(timedelta(seconds=segundos))
-                
-                return distancia_km, tiempo_estimado
-    
+        if len(puntos) > 2:
+            params["waypoints"] = "|".join(f"{p[0]},{p[1]}" for p in puntos[1:-1])
+        data = cliente_maps.get_json(URL_DIRECTIONS, params)
+        if not data:
+            return
+        if data["status"] != "OK":
+            print(f"Directions API respondió {data['status']}")
+            return
+
+        legs = data["routes"][0]["legs"]
+        if len(legs) != len(puntos) - 1:
+            return
+        for i, leg in enumerate(legs):
+            distancias[i] = leg["distance"]["value"] / 1000
+            segundos[i] = leg["duration"]["value"]
+            cache_distancias.guardar(
+                puntos[i], puntos[i + 1], distancias[i],
+                str(timedelta(seconds=int(segundos[i]))),
+            )
     except Exception as e:
         print(f"Error al consultar Google Maps API: {e}")
-    
-    # Si hay error o no hay API key, usar el cálculo estimado
-    return _calcular_distancia_tiempo_estimado(origen, destino)
 
-def _calcular_distancia_tiempo_estimado(origen, destino):
-    """
-    Función de respaldo que usa la distancia geodésica para estimar
-    cuando no se puede usar Google Maps API.
-    """
-    from geopy.distance import geodesic
-    
-    distancia_km = geodesic(origen, destino).km
-    # Estimamos 2.5 minutos por kilómetro (velocidad promedio)
-    minutos = int(distancia_km * 2.5)
-    tiempo_estimado = f"{minutos} mins"
-    
-    return distancia_km, tiempo_estimado
+def _matriz_estimada(origenes: list, destinos: list):
+    """Red vial local si está configurada; si no, línea recta a 2.5 min/km."""
+    from app.geo.distancias import matriz_distancias
 
-def calcular_ruta_multiple(origen: tuple, destinos: list):
-    """
-    Calcula una ruta optimizada con múltiples destinos.
-    
-    Args:
-        origen: Tuple (latitud, longitud) del punto de origen
-        destinos: Lista de tuples (latitud, longitud) de los destinos
-        
-    Returns:
-        dict con información de la ruta
-    """
-    api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
-    if not api_key or not destinos:
-        return None
-    
-    try:
-        # Usar Directions API con waypoints
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        
-        # Convertir destinos a waypoints (todos excepto el último)
-        waypoints = []
-        for destino in destinos[:-1]:
-            waypoints.append(f"{destino[0]},{destino[1]}")
-        
-        params = {
-            "origin": f"{origen[0]},{origen[1]}",
-            "destination": f"{destinos[-1][0]},{destinos[-1][1]}",
-            "waypoints": "optimize:true|" + "|".join(waypoints),
-            "mode": "driving",
-            "key": api_key,
-            # Parámetros de tráfico
-            "departure_time": "now",
-            "traffic_model": "best_guess",
-        }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data["status"] == "OK":
-            # La respuesta incluye una ruta optimizada
-            ruta = data["routes"][0]
-            
-            # Extraer distancia total
-            distancia_total = 0
-            duracion_total = 0
-            for leg in ruta["legs"]:
-                distancia_total += leg["distance"]["value"]
-                duracion_total += leg["duration"]["value"]
-            
-            # Convertir valores
-            distancia_km = distancia_total / 1000
-            tiempo_estimado = str(timedelta(seconds=duracion_total))
-            
-            # Obtener el orden optimizado de los waypoints
-            orden_optimizado = None
-            if "waypoint_order" in ruta:
-                orden_optimizado = ruta["waypoint_order"]
-            
-            return {
-                "distancia_km": distancia_km,
-                "tiempo_estimado": tiempo_estimado,
-                "orden_waypoints": orden_optimizado
-            }
-    
-    except Exception as e:
-        print(f"Error al calcular ruta con Google Maps API: {e}")
-    
-    return None
+    recta_km = matriz_distancias(origenes, destinos)
+    recta_s = recta_km * MINUTOS_POR_KM * 60
+    red = obtener_red()
+    if red is None:
+        return recta_km, recta_s
+    km, seg = red.matriz(origenes, destinos)
+    sin_camino = ~np.isfinite(km)
+    km[sin_camino] = recta_km[sin_camino]
+    seg[sin_camino] = recta_s[sin_camino]
+    return km, seg
+
+def _a_segundos(tiempo: str) -> float:
+    """Convierte '1:02:03', '1 day, 0:00:05' o '12 mins' a segundos."""
+    tiempo = str(tiempo).strip()
+    if tiempo.endswith("mins"):
+        return float(tiempo.split()[0]) * 60
+    dias = 0
+    if "day" in tiempo:
+        parte_dias, tiempo = tiempo.split(",", 1)
+        dias = int(parte_dias.split()[0])
+    horas, minutos, segs = (float(x) for x in tiempo.strip().split(":"))
+    return dias * 86400 + horas * 3600 + minutos * 60 + segs
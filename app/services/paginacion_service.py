@@ -0,0 +1,113 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+El cursor codifica (valor de orden, id) de la última fila de la página en
+base64 URL-safe. La página siguiente se pide con
+`WHERE (orden, id) < (valor, id)` sobre el mismo ORDER BY, por lo que el
+costo de cada página no depende de cuántas filas la preceden (a diferencia
+de OFFSET) y las filas insertadas mientras se pagina no desplazan las
+páginas. La columna de orden tiene que ser NOT NULL: con un NULL en el
+cursor la comparación no encuentra ninguna fila siguiente.
+"""
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+def codificar_cursor(valor, id_fila) -> str:
+    if isinstance(valor, datetime):
+        valor = {"dt": valor.isoformat()}
+    crudo = json.dumps([valor, str(id_fila)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valor, id_fila = json.loads(crudo)
+        if isinstance(valor, dict):
+            valor = datetime.fromisoformat(valor["dt"])
+        return valor, UUID(id_fila)
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def _aplicar_cursor(consulta, columna_id, columna_orden, cursor, limite):
+    claves = [c for c in (columna_orden, columna_id) if c is not None]
+    if cursor:
+        valor, ultimo_id = decodificar_cursor(cursor)
+        if columna_orden is None:
+            condicion = columna_id < ultimo_id
+        else:
+            condicion = or_(
+                columna_orden < valor,
+                and_(columna_orden == valor, columna_id < ultimo_id),
+            )
+        consulta = consulta.where(condicion)
+    return consulta.order_by(*[c.desc() for c in claves]).limit(limite + 1)
+
+
+def _es_entidad(consulta: Select) -> bool:
+    """True si el select() trae objetos del ORM (select(Modelo)) y no filas sueltas."""
+    descripciones = consulta.column_descriptions
+    return len(descripciones) == 1 and descripciones[0]["expr"] is descripciones[0]["entity"]
+
+
+def _filas(resultado, consulta: Select) -> list:
+    return resultado.unique().scalars().all() if _es_entidad(consulta) else resultado.all()
+
+
+def _cortar(filas, columna_id, columna_orden, limite) -> tuple[list, str | None]:
+    if len(filas) <= limite:
+        return filas, None
+    filas = filas[:limite]
+    ultima = filas[-1]
+    valor = getattr(ultima, columna_orden.key) if columna_orden is not None else None
+    return filas, codificar_cursor(valor, getattr(ultima, columna_id.key))
+
+
+def paginar(
+    db: Session,
+    consulta,
+    columna_id,
+    columna_orden=None,
+    cursor: str | None = None,
+    limite: int = LIMITE_POR_DEFECTO,
+) -> tuple[list, str | None]:
+    """
+    Aplica el keyset a `consulta` (Query o select()) en orden descendente por
+    (columna_orden, columna_id) y la ejecuta.
+
+    Returns:
+        Tupla (filas, siguiente_cursor); siguiente_cursor es None en la última página
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    consulta = _aplicar_cursor(consulta, columna_id, columna_orden, cursor, limite)
+    if isinstance(consulta, Select):
+        filas = _filas(db.execute(consulta), consulta)
+    else:
+        filas = consulta.all()
+    return _cortar(filas, columna_id, columna_orden, limite)
+
+
+async def paginar_async(
+    db: AsyncSession,
+    consulta: Select,
+    columna_id,
+    columna_orden=None,
+    cursor: str | None = None,
+    limite: int = LIMITE_POR_DEFECTO,
+) -> tuple[list, str | None]:
+    """Como `paginar`, para un select() ejecutado con una AsyncSession."""
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    consulta = _aplicar_cursor(consulta, columna_id, columna_orden, cursor, limite)
+    return _cortar(_filas(await db.execute(consulta), consulta), columna_id, columna_orden, limite)
@@ -1,9 +1,12 @@
 import os
 import stripe
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.pago_model import Pago
 from app.schemas.pago_schema import PagoCreate
+from app.services.paginacion_service import paginar, LIMITE_POR_DEFECTO
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
@@ -14,12 +17,36 @@ def crear_pago(db: Session, datos: PagoCreate):
     db.refresh(nuevo)
     return nuevo
 
-def listar_pagos(db: Session):
-    return db.query(Pago).all()
+def listar_pagos(db: Session, limite: int = LIMITE_POR_DEFECTO, cursor: str | None = None):
+    return paginar(db, db.query(Pago), Pago.id_pago, Pago.fecha_pago, cursor, limite)
 
 def obtener_pago(db: Session, pago_id: UUID):
     return db.query(Pago).filter(Pago.id_pago == pago_id).first()
 
+def consulta_pago_pedido(pedido_id: UUID):
+    return select(Pago).where(Pago.pedido_id == pedido_id).limit(1)
+
+def _estado_pago(pedido_id: UUID, pago: Pago | None) -> dict | None:
+    if pago is None:
+        return None
+    return {
+        "pedido_id": str(pedido_id),
+        "pago_id": str(pago.id_pago),
+        "estado": pago.estado,
+        "monto": float(pago.monto),
+        "metodo_pago": pago.metodo_pago,
+        "fecha_pago": pago.fecha_pago,
+        "transaccion_id": pago.transaccion_id
+    }
+
+def estado_pago_pedido(db: Session, pedido_id: UUID) -> dict | None:
+    """Estado del pago de un pedido o None si el pedido no tiene pago."""
+    return _estado_pago(pedido_id, db.execute(consulta_pago_pedido(pedido_id)).scalars().first())
+
+async def estado_pago_pedido_async(db: AsyncSession, pedido_id: UUID) -> dict | None:
+    pago = (await db.execute(consulta_pago_pedido(pedido_id))).scalars().first()
+    return _estado_pago(pedido_id, pago)
+
 def actualizar_estado_pago(db: Session, pago_id: UUID, estado: str):
     pago = db.query(Pago).filter(Pago.id_pago == pago_id).first()
     if pago:
@@ -1,8 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from uuid import UUID
 from app.models.pedido_model import Pedido, DetallePedido
 from app.models.producto_model import Producto
+from app.models.pago_model import Pago
 from app.schemas.pedido_schema import PedidoCreate, PedidoEstadoUpdate
+from app.services.paginacion_service import paginar, paginar_async, LIMITE_POR_DEFECTO
 
 def crear_pedido(db: Session, datos: PedidoCreate):
     pedido = Pedido(
@@ -34,8 +38,9 @@ def crear_pedido(db: Session, datos: PedidoCreate):
     db.refresh(pedido)
     return pedido
 
-def listar_pedidos(db: Session):
-    return db.query(Pedido).all()
+def listar_pedidos(db: Session, limite: int = LIMITE_POR_DEFECTO, cursor: str | None = None):
+    consulta = db.query(Pedido).options(selectinload(Pedido.detalles))
+    return paginar(db, consulta, Pedido.id, Pedido.fecha_pedido, cursor, limite)
 
 def obtener_pedido(db: Session, pedido_id: UUID):
     return db.query(Pedido).filter(Pedido.id == pedido_id).first()
@@ -89,3 +94,134 @@ def obtener_detalles_pedido_con_precios(db: Session, pedido_id: UUID):
     }
     
     return resultado
+
+def _consulta_pagina_historial(cliente_id: UUID):
+    return (
+        select(
+            Pedido.id,
+            Pedido.fecha_pedido,
+            Pedido.estado,
+            Pago.id_pago,
+            Pago.estado.label("estado_pago"),
+            Pago.metodo_pago,
+            Pago.fecha_pago,
+        )
+        .outerjoin(Pago, Pago.pedido_id == Pedido.id)
+        .where(Pedido.cliente_id == cliente_id)
+    )
+
+def _consulta_total_historial(cliente_id: UUID):
+    return select(func.count(Pedido.id)).where(Pedido.cliente_id == cliente_id)
+
+_SUBTOTAL = Producto.precio * DetallePedido.cantidad
+
+def _consulta_totales_pedidos(ids: list):
+    return (
+        select(
+            DetallePedido.pedido_id,
+            func.sum(_SUBTOTAL).label("total"),
+            func.count(DetallePedido.id).label("cantidad_productos"),
+        )
+        .join(Producto, Producto.id == DetallePedido.producto_id)
+        .where(DetallePedido.pedido_id.in_(ids))
+        .group_by(DetallePedido.pedido_id)
+    )
+
+def _consulta_lineas_pedidos(ids: list):
+    return (
+        select(
+            DetallePedido.pedido_id,
+            Producto.id,
+            Producto.nombre,
+            Producto.precio,
+            DetallePedido.cantidad,
+            _SUBTOTAL.label("subtotal"),
+        )
+        .join(Producto, Producto.id == DetallePedido.producto_id)
+        .where(DetallePedido.pedido_id.in_(ids))
+    )
+
+def _armar_historial(filas, totales, lineas, compacto: bool) -> list[dict]:
+    totales = {t.pedido_id: t for t in totales}
+    lineas_por_pedido: dict = {}
+    for linea in lineas:
+        lineas_por_pedido.setdefault(linea.pedido_id, []).append({
+            "producto_id": str(linea.id),
+            "nombre": linea.nombre,
+            "precio": float(linea.precio),
+            "cantidad": linea.cantidad,
+            "subtotal": float(linea.subtotal),
+        })
+
+    pedidos = []
+    for fila in filas:
+        agregado = totales.get(fila.id)
+        pedido = {
+            "pedido_id": str(fila.id),
+            "fecha_pedido": fila.fecha_pedido,
+            "estado": fila.estado,
+            "total": float(agregado.total) if agregado else 0.0,
+        }
+        if compacto:
+            pedido["cantidad_productos"] = agregado.cantidad_productos if agregado else 0
+            pedido["estado_pago"] = fila.estado_pago
+        else:
+            pedido["productos"] = lineas_por_pedido.get(fila.id, [])
+            pedido["pago"] = {
+                "pago_id": str(fila.id_pago),
+                "estado": fila.estado_pago,
+                "metodo_pago": fila.metodo_pago,
+                "fecha_pago": fila.fecha_pago,
+            } if fila.id_pago else None
+        pedidos.append(pedido)
+    return pedidos
+
+def historial_pedidos_cliente(
+    db: Session,
+    cliente_id: UUID,
+    limite: int = LIMITE_POR_DEFECTO,
+    cursor: str | None = None,
+    compacto: bool = False,
+):
+    """
+    Historial de pedidos de un cliente, del más reciente al más antiguo.
+
+    Una consulta trae la página de pedidos con su pago; otra agrega en SQL el
+    total y el número de productos de los pedidos de la página (GROUP BY) y,
+    en modo completo, una tercera trae sus líneas (producto, precio, cantidad,
+    subtotal). El número de consultas no depende del número de pedidos.
+
+    Returns:
+        Tupla (pedidos, total_pedidos, siguiente_cursor)
+    """
+    filas, siguiente = paginar(
+        db, _consulta_pagina_historial(cliente_id), Pedido.id, Pedido.fecha_pedido, cursor, limite
+    )
+    total_pedidos = db.execute(_consulta_total_historial(cliente_id)).scalar()
+    if not filas:
+        return [], total_pedidos, siguiente
+
+    ids = [f.id for f in filas]
+    totales = db.execute(_consulta_totales_pedidos(ids)).all()
+    lineas = [] if compacto else db.execute(_consulta_lineas_pedidos(ids)).all()
+    return _armar_historial(filas, totales, lineas, compacto), total_pedidos, siguiente
+
+async def historial_pedidos_cliente_async(
+    db: AsyncSession,
+    cliente_id: UUID,
+    limite: int = LIMITE_POR_DEFECTO,
+    cursor: str | None = None,
+    compacto: bool = False,
+):
+    """Como historial_pedidos_cliente, con las mismas consultas sobre una AsyncSession."""
+    filas, siguiente = await paginar_async(
+        db, _consulta_pagina_historial(cliente_id), Pedido.id, Pedido.fecha_pedido, cursor, limite
+    )
+    total_pedidos = (await db.execute(_consulta_total_historial(cliente_id))).scalar()
+    if not filas:
+        return [], total_pedidos, siguiente
+
+    ids = [f.id for f in filas]
+    totales = (await db.execute(_consulta_totales_pedidos(ids))).all()
+    lineas = [] if compacto else (await db.execute(_consulta_lineas_pedidos(ids))).all()
+    return _armar_historial(filas, totales, lineas, compacto), total_pedidos, siguiente
@@ -5,7 +5,8 @@ from uuid import UUID
 from typing import List, Tuple
 
 from sqlalchemy.orm import Session
-from geopy.distance import geodesic
+
+from app.geo.rutas import ordenar_paradas
 
 from app.models.ruta_entrega_model import RutaEntrega, Entrega
 from app.models.tienda_model          import Tienda
@@ -13,6 +14,9 @@ from app.models.distribuidor_model    import Distribuidor
 from app.models.cliente_model         import Cliente
 from app.models.pedido_model          import Pedido           # para cambiar estado
 from app.services.producto_service    import descontar_stock_por_pedido
+from app.services.maps_service        import obtener_tramos
+from app.services.paginacion_service  import paginar, LIMITE_POR_DEFECTO
+from app.services.broker_service      import publicar_estado_entrega
 
 
 # ─────────────────────────  CRUD BÁSICO  ────────────────────────── #
@@ -45,8 +49,8 @@ def registrar_entrega(db: Session, datos):
     return nueva
 
 
-def listar_entregas(db: Session):
-    return db.query(Entrega).all()
+def listar_entregas(db: Session, limite: int = LIMITE_POR_DEFECTO, cursor: str | None = None):
+    return paginar(db, db.query(Entrega), Entrega.id_entrega, Entrega.fecha_hora_reg, cursor, limite)
 
 
 def obtener_entrega(db: Session, entrega_id: UUID):
@@ -60,9 +64,12 @@ def obtener_entrega(db: Session, entrega_id: UUID):
 def actualizar_estado_entrega(db: Session, entrega_id: UUID, nuevo_estado: str):
     ent = obtener_entrega(db, entrega_id)
     if ent:
+        estado_anterior = ent.estado
         ent.estado = nuevo_estado
         db.commit()
         db.refresh(ent)
+        if ent.estado != estado_anterior:
+            publicar_estado_entrega(ent)
     return ent
 
 
@@ -103,48 +110,40 @@ def calcular_ruta_optimizada(
     if not all([dist.latitud, dist.longitud, tienda.latitud, tienda.longitud]):
         raise ValueError("El distribuidor o la tienda no tienen coordenadas registradas")
 
-    clientes: List[Tuple[Cliente, Tuple[float,float]]] = []
-    for cid in clientes_ids:
-        cli = db.query(Cliente).filter(Cliente.id == cid).first()
-        if not cli or not cli.coordenadas:   # vacío o NULL
-            continue
-        try:
-            lat, lon = map(float, cli.coordenadas.split(","))
-            clientes.append((cli, (lat, lon)))
-        except (ValueError, TypeError):
-            continue
+    por_id = {
+        cli.id: cli
+        for cli in db.query(Cliente).filter(
+            Cliente.id.in_(clientes_ids),
+            Cliente.latitud.isnot(None),
+            Cliente.longitud.isnot(None),
+        ).all()
+    }
+    clientes: List[Tuple[Cliente, Tuple[float,float]]] = [
+        (por_id[cid], por_id[cid].posicion) for cid in clientes_ids if cid in por_id
+    ]
     if not clientes:
         raise ValueError("No hay clientes válidos con coordenadas")
 
-    ruta_clientes: List[Cliente]  = []
-    disponibles = clientes.copy()
-    punto_actual = (tienda.latitud, tienda.longitud)
-    while disponibles:
-        cli_cercano = min(disponibles, key=lambda c: geodesic(punto_actual, c[1]).km)
-        ruta_clientes.append(cli_cercano[0])
-        punto_actual     = cli_cercano[1]
-        disponibles.remove(cli_cercano)
-
-    distancia_km = geodesic(
-        (dist.latitud, dist.longitud),
-        (tienda.latitud, tienda.longitud)
-    ).km
-    if ruta_clientes:
-        # Tienda-> Primer cliente y ya avanza
-        lat, lon = map(float, ruta_clientes[0].coordenadas.split(","))
-        distancia_km += geodesic((tienda.latitud, tienda.longitud), (lat, lon)).km
-        # Entre clientes consecutivos
-        for a, b in zip(ruta_clientes[:-1], ruta_clientes[1:]):
-            la1, lo1 = map(float, a.coordenadas.split(","))
-            la2, lo2 = map(float, b.coordenadas.split(","))
-            distancia_km += geodesic((la1, lo1), (la2, lo2)).km
+    # Tienda -> Primer cliente -> … -> Último cliente (vecino más cercano + 2-opt / Or-opt)
+    orden, _ = ordenar_paradas(
+        (tienda.latitud, tienda.longitud), [c[1] for c in clientes], mejorar=True
+    )
+    ruta_clientes: List[Cliente] = [clientes[i][0] for i in orden]
+
+    # Distancia / tiempo de manejo por tramo: Google, caché, red vial local
+    # o línea recta, en ese orden de preferencia
+    distancias, segundos = obtener_tramos(
+        [(dist.latitud, dist.longitud), (tienda.latitud, tienda.longitud)]
+        + [clientes[i][1] for i in orden]
+    )
+    distancia_km = float(distancias.sum())
 
     # 5) ─── Persistir RutaEntrega + Entregas ───────────────────────
     ruta = RutaEntrega(
         coordenadas_inicio = f"{tienda.latitud},{tienda.longitud}",
         coordenadas_fin    = ruta_clientes[-1].coordenadas if ruta_clientes else f"{tienda.latitud},{tienda.longitud}",
         distancia          = distancia_km,
-        tiempo_estimado    = f"{int(distancia_km * 2)} mins"   # 2 min/km: heurística simple
+        tiempo_estimado    = f"{int(segundos.sum() // 60)} mins"
     )
     db.add(ruta)
     db.flush()                     
@@ -181,6 +180,7 @@ def completar_entrega(
     if not ent:
         return None
 
+    estado_anterior = ent.estado
     primera_vez = ent.estado != "entregado"
     ent.coordenadas_fin = coordenadas_fin
     ent.estado          = estado
@@ -198,4 +198,6 @@ def completar_entrega(
 
     db.commit()
     db.refresh(ent)
+    if ent.estado != estado_anterior:
+        publicar_estado_entrega(ent)
     return ent
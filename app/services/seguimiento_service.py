@@ -0,0 +1,259 @@
+"""
+Seguimiento de entregas para clientes, servido desde vista_seguimiento_entrega.
+
+Cada petición es una sola consulta: el seguimiento de una entrega lee una
+fila de la vista y el listado de entregas la une con las líneas del pedido.
+Las consultas se arman aparte (consulta_*) para ejecutarlas igual con una
+Session o con una AsyncSession (funciones *_async).
+
+SeguimientoEnVivo produce los mensajes del seguimiento en vivo que las
+rutas envían por WebSocket o por SSE.
+"""
+import asyncio
+import os
+from collections import deque
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.models.pedido_model import DetallePedido
+from app.models.producto_model import Producto
+from app.models.seguimiento_model import vista_seguimiento_entrega as vista
+from app.services.broker_service import obtener_broker, canal_entrega, canal_distribuidor
+
+# Cada cuánto se vuelve a leer la entrega mientras no tiene distribuidor
+REVISION_DISTRIBUIDOR_S = float(os.getenv("SEGUIMIENTO_REVISION_DISTRIBUIDOR_S", "10"))
+
+MENSAJES_SEGUIMIENTO = {
+    "pendiente": "Tu pedido está en camino. El distribuidor se dirigirá a tu ubicación pronto.",
+    "entregado": "¡Tu pedido ha sido entregado exitosamente!",
+    "fallido": "Hubo un problema con la entrega. Contacta con soporte."
+}
+
+
+def mensaje_seguimiento(estado: str) -> str:
+    """Obtiene un mensaje descriptivo del estado de la entrega"""
+    return MENSAJES_SEGUIMIENTO.get(estado, f"Estado desconocido: {estado}")
+
+
+def _distribuidor(fila, con_estado: bool = False):
+    if fila.distribuidor_id is None:
+        return None
+    datos = {
+        "nombre": f"{fila.distribuidor_nombre} {fila.distribuidor_apellido}",
+        "telefono": fila.distribuidor_telefono,
+    }
+    if con_estado:
+        datos["estado"] = fila.distribuidor_estado
+    # Mientras la entrega está pendiente se muestra la ubicación actual del distribuidor
+    datos["ubicacion_actual"] = (
+        f"{fila.distribuidor_latitud},{fila.distribuidor_longitud}"
+        if fila.estado == "pendiente" else None
+    )
+    return datos
+
+
+def consulta_entregas_cliente(cliente_id: UUID):
+    return (
+        select(vista, Producto.nombre.label("producto_nombre"), DetallePedido.cantidad)
+        .select_from(
+            vista
+            .outerjoin(DetallePedido, DetallePedido.pedido_id == vista.c.pedido_id)
+            .outerjoin(Producto, Producto.id == DetallePedido.producto_id)
+        )
+        # Como antes del paso a la vista, el listado sólo incluye entregas
+        # con asignación (el seguimiento de una entrega no lo exige)
+        .where(vista.c.cliente_id == cliente_id, vista.c.asignacion_id.isnot(None))
+        .order_by(vista.c.fecha_hora_reg.desc(), vista.c.id_entrega)
+    )
+
+
+def agrupar_entregas(filas) -> list[dict]:
+    """Una fila por línea de pedido: agrupar por entrega conservando el orden."""
+    entregas: dict = {}
+    for fila in filas:
+        entrega = entregas.get(fila.id_entrega)
+        if entrega is None:
+            entrega = entregas[fila.id_entrega] = {
+                "entrega_id": str(fila.id_entrega),
+                "fecha_registro": fila.fecha_hora_reg,
+                "estado": fila.estado,
+                "orden_entrega": fila.orden_entrega,
+                "coordenadas_destino": fila.coordenadas_fin,
+                "observaciones": fila.observaciones,
+                "pedido": {
+                    "pedido_id": str(fila.pedido_id),
+                    "estado_pedido": fila.pedido_estado,
+                    "productos": []
+                } if fila.pedido_id is not None else None,
+                "distribuidor": _distribuidor(fila),
+            }
+        if entrega["pedido"] is not None and fila.producto_nombre is not None:
+            entrega["pedido"]["productos"].append({
+                "nombre": fila.producto_nombre,
+                "cantidad": fila.cantidad
+            })
+    return list(entregas.values())
+
+
+def entregas_cliente(db: Session, cliente_id: UUID) -> list[dict]:
+    """Entregas del cliente, de la más reciente a la más antigua, con productos y distribuidor."""
+    return agrupar_entregas(db.execute(consulta_entregas_cliente(cliente_id)).all())
+
+
+async def entregas_cliente_async(db: AsyncSession, cliente_id: UUID) -> list[dict]:
+    return agrupar_entregas((await db.execute(consulta_entregas_cliente(cliente_id))).all())
+
+
+def consulta_fila_seguimiento(cliente_id: UUID, entrega_id: UUID):
+    return select(vista).where(
+        vista.c.id_entrega == entrega_id,
+        vista.c.cliente_id == cliente_id,
+    )
+
+
+def fila_seguimiento(db: Session, cliente_id: UUID, entrega_id: UUID):
+    """Fila de la vista para una entrega del cliente o None si no le pertenece."""
+    return db.execute(consulta_fila_seguimiento(cliente_id, entrega_id)).first()
+
+
+async def fila_seguimiento_async(db: AsyncSession, cliente_id: UUID, entrega_id: UUID):
+    return (await db.execute(consulta_fila_seguimiento(cliente_id, entrega_id))).first()
+
+
+def seguimiento_entrega(db: Session, cliente_id: UUID, entrega_id: UUID) -> dict | None:
+    """Datos de seguimiento de una entrega del cliente o None si no le pertenece."""
+    fila = fila_seguimiento(db, cliente_id, entrega_id)
+    return payload_seguimiento(fila) if fila is not None else None
+
+
+async def seguimiento_entrega_async(db: AsyncSession, cliente_id: UUID, entrega_id: UUID) -> dict | None:
+    fila = await fila_seguimiento_async(db, cliente_id, entrega_id)
+    return payload_seguimiento(fila) if fila is not None else None
+
+
+def payload_seguimiento(fila) -> dict:
+    return {
+        "entrega": {
+            "entrega_id": str(fila.id_entrega),
+            "estado": fila.estado,
+            "orden_entrega": fila.orden_entrega,
+            "coordenadas_destino": fila.coordenadas_fin,
+            "fecha_registro": fila.fecha_hora_reg,
+            "observaciones": fila.observaciones
+        },
+        "distribuidor": _distribuidor(fila, con_estado=True),
+        "ruta": {
+            "coordenadas_inicio": fila.ruta_coordenadas_inicio,
+            "coordenadas_fin": fila.ruta_coordenadas_fin,
+            "distancia": float(fila.ruta_distancia) if fila.ruta_distancia else None,
+            "tiempo_estimado": fila.ruta_tiempo_estimado
+        } if fila.ruta_id is not None else None,
+        "seguimiento": {
+            "puede_rastrear": fila.estado == "pendiente",
+            "mensaje": mensaje_seguimiento(fila.estado)
+        }
+    }
+
+
+# ─── Seguimiento en vivo ─────────────────────────────────────────────
+def mensaje_estado(estado: str, observaciones: str | None) -> dict:
+    return {
+        "tipo": "estado",
+        "estado": estado,
+        "observaciones": observaciones,
+        "puede_rastrear": estado == "pendiente",
+        "mensaje": mensaje_seguimiento(estado),
+    }
+
+
+def mensaje_ubicacion(latitud: float, longitud: float) -> dict:
+    return {
+        "tipo": "ubicacion",
+        "latitud": latitud,
+        "longitud": longitud,
+        "ubicacion_actual": f"{latitud},{longitud}",
+    }
+
+
+class SeguimientoEnVivo:
+    """
+    Mensajes del seguimiento en vivo de una entrega: "inicial" con la fila de
+    la vista y después "ubicacion" del distribuidor y "estado" de la entrega
+    a medida que llegan por el broker.
+
+    Se suscribe al canal de la entrega antes de leer la fila, y la lee de la
+    BD principal: un cambio de estado confirmado mientras tanto llega por el
+    canal o ya está en la fila (una réplica atrasada podría no tenerlo y el
+    aviso ya habría pasado). Si la entrega todavía no tiene distribuidor se
+    vuelve a leer cada REVISION_DISTRIBUIDOR_S segundos hasta conocerlo y
+    entonces se suscribe también a sus ubicaciones.
+    """
+
+    def __init__(self, cliente_id: UUID, entrega_id: UUID):
+        self.cliente_id = cliente_id
+        self.entrega_id = entrega_id
+        self.estado = None
+        self.distribuidor_id = None
+        self.suscripcion = None
+        self._mensajes: deque = deque()
+
+    async def _leer(self):
+        async with AsyncSessionLocal() as db:
+            return await fila_seguimiento_async(db, self.cliente_id, self.entrega_id)
+
+    async def abrir(self) -> bool:
+        """False si la entrega no existe o no es del cliente."""
+        self.suscripcion = obtener_broker().suscribir(canal_entrega(self.entrega_id))
+        fila = await self._leer()
+        if fila is None:
+            self.cerrar()
+            return False
+        self.estado = fila.estado
+        self._mensajes.append({"tipo": "inicial", **payload_seguimiento(fila)})
+        self._conocer_distribuidor(fila.distribuidor_id)
+        return True
+
+    def _conocer_distribuidor(self, distribuidor_id) -> bool:
+        if distribuidor_id is None or self.distribuidor_id is not None:
+            return False
+        self.distribuidor_id = distribuidor_id
+        self.suscripcion.agregar(canal_distribuidor(distribuidor_id))
+        return True
+
+    async def _revisar(self):
+        """Relee la fila mientras falta el distribuidor."""
+        fila = await self._leer()
+        if fila is None:
+            return
+        if self._conocer_distribuidor(fila.distribuidor_id) and fila.distribuidor_latitud is not None:
+            self._mensajes.append(mensaje_ubicacion(fila.distribuidor_latitud, fila.distribuidor_longitud))
+        if fila.estado != self.estado:
+            self.estado = fila.estado
+            self._mensajes.append(mensaje_estado(fila.estado, fila.observaciones))
+
+    async def siguiente(self) -> dict | None:
+        """Próximo mensaje; None cuando la entrega dejó de estar pendiente."""
+        while not self._mensajes:
+            if self.estado != "pendiente":
+                return None
+            espera = REVISION_DISTRIBUIDOR_S if self.distribuidor_id is None else None
+            try:
+                _, mensaje = await asyncio.wait_for(self.suscripcion.recibir(), espera)
+            except asyncio.TimeoutError:
+                await self._revisar()
+                continue
+            if mensaje["tipo"] == "ubicacion":
+                self._mensajes.append(mensaje_ubicacion(mensaje["latitud"], mensaje["longitud"]))
+            elif mensaje["tipo"] == "estado":
+                self.estado = mensaje["estado"]
+                self._mensajes.append(mensaje_estado(mensaje["estado"], mensaje.get("observaciones")))
+        return self._mensajes.popleft()
+
+    def cerrar(self):
+        if self.suscripcion is not None:
+            self.suscripcion.cerrar()
+            self.suscripcion = None
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.tienda_model import Tienda
 from app.schemas.tienda_schema import TiendaCreate, TiendaUpdate
+from app.services.indice_espacial_service import actualizar_tienda, quitar_tienda
 from uuid import UUID
 from typing import List, Optional
 
@@ -15,6 +16,7 @@ def create_tienda(db: Session, tienda: TiendaCreate) -> Tienda:
     db.add(db_tienda)
     db.commit()
     db.refresh(db_tienda)
+    actualizar_tienda(db_tienda)
     return db_tienda
 
 def update_tienda(db: Session, tienda_id: UUID, tienda: TiendaUpdate) -> Optional[Tienda]:
@@ -27,6 +29,7 @@ def update_tienda(db: Session, tienda_id: UUID, tienda: TiendaUpdate) -> Optiona
     
     db.commit()
     db.refresh(db_tienda)
+    actualizar_tienda(db_tienda)
     return db_tienda
 
 def delete_tienda(db: Session, tienda_id: UUID) -> bool:
@@ -36,4 +39,5 @@ def delete_tienda(db: Session, tienda_id: UUID) -> bool:
         
     db.delete(db_tienda)
     db.commit()
+    quitar_tienda(tienda_id)
     return True
@@ -0,0 +1,272 @@
+"""
+Ingesta de posiciones GPS por lotes.
+
+POST /distribuidores/ubicaciones deja las posiciones en un buffer en memoria
+en lugar de escribir cada una. Un hilo vacía el buffer cada
+UBICACION_INTERVALO_S segundos (o antes si se acumulan
+UBICACION_MAX_PENDIENTES posiciones) con:
+
+  • un único UPDATE distribuidor ... FROM (VALUES ...) con la posición más
+    reciente de cada distribuidor (en SQLite, un UPDATE por id con
+    executemany); no pisa una posición más nueva ya guardada
+    (ubicacion_actualizada_en), por si llegan lotes desordenados;
+  • si UBICACION_HISTORIAL está activo (por defecto), todas las posiciones
+    van a historial_ubicacion con COPY (ver historial_service).
+
+El índice espacial y los suscriptores de seguimiento se actualizan al
+recibir el lote, sin esperar al vaciado.
+
+La hora de registro la pone el dispositivo, así que se acota: se rechazan
+las posiciones de hace más de UBICACION_ANTIGUEDAD_MAX_S (un día; el
+historial compacta los días cerrados) y las que adelantan más de
+UBICACION_DESFASE_MAX_S; las que adelantan menos se toman con la hora de
+recepción, para que un reloj adelantado no gane siempre como "la más
+reciente".
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Float, TIMESTAMP, bindparam, column, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import SessionLocal
+from app.auth.cache_principales import cache_principales
+from app.models.distribuidor_model import Distribuidor
+from app.services import indice_espacial_service
+from app.services.historial_service import insertar_historial
+from app.services.broker_service import publicar_ubicacion_distribuidor
+
+INTERVALO_S = float(os.getenv("UBICACION_INTERVALO_S", "2"))
+MAX_PENDIENTES = int(os.getenv("UBICACION_MAX_PENDIENTES", "20000"))
+GUARDAR_HISTORIAL = os.getenv("UBICACION_HISTORIAL", "true").lower() in ("1", "true", "si", "sí")
+ANTIGUEDAD_MAX_S = float(os.getenv("UBICACION_ANTIGUEDAD_MAX_S", str(24 * 3600)))
+DESFASE_MAX_S = float(os.getenv("UBICACION_DESFASE_MAX_S", "120"))
+
+
+class _Posicion:
+    """Vista mínima de un distribuidor para el índice espacial y el broker."""
+
+    def __init__(self, distribuidor_id, latitud, longitud):
+        self.id = distribuidor_id
+        self.latitud = latitud
+        self.longitud = longitud
+
+
+def _utc(fecha: datetime | None) -> datetime:
+    if fecha is None:
+        return datetime.utcnow()
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def hora_registro_valida(registrado_en: datetime | None, ahora: datetime | None = None) -> datetime | None:
+    """
+    Hora de registro en UTC acotada a [ahora - ANTIGUEDAD_MAX_S, ahora]; None
+    si queda fuera de [ahora - ANTIGUEDAD_MAX_S, ahora + DESFASE_MAX_S].
+    """
+    ahora = ahora or datetime.utcnow()
+    registrado_en = _utc(registrado_en) if registrado_en is not None else ahora
+    if registrado_en < ahora - timedelta(seconds=ANTIGUEDAD_MAX_S):
+        return None
+    if registrado_en > ahora + timedelta(seconds=DESFASE_MAX_S):
+        return None
+    return min(registrado_en, ahora)
+
+
+def _actualizar_ultimas(db, ultimas: dict) -> int:
+    """
+    Guarda la posición más reciente de cada distribuidor sin pisar una más
+    nueva: en PostgreSQL un UPDATE ... FROM (VALUES ...); en otros motores,
+    que no lo admiten, el mismo UPDATE por id con executemany.
+    """
+    if db.connection().dialect.name != "postgresql":
+        tabla = Distribuidor.__table__
+        return db.execute(
+            update(tabla)
+            .where(
+                tabla.c.id == bindparam("p_id"),
+                or_(
+                    tabla.c.ubicacion_actualizada_en.is_(None),
+                    tabla.c.ubicacion_actualizada_en <= bindparam("p_registrado_en"),
+                ),
+            )
+            .values(
+                latitud=bindparam("p_latitud"),
+                longitud=bindparam("p_longitud"),
+                ubicacion_actualizada_en=bindparam("p_registrado_en"),
+            ),
+            [
+                {"p_id": i, "p_latitud": lat, "p_longitud": lon, "p_registrado_en": fecha}
+                for i, (lat, lon, fecha) in ultimas.items()
+            ],
+        ).rowcount
+
+    v = values(
+        column("id", UUID(as_uuid=True)),
+        column("latitud", Float),
+        column("longitud", Float),
+        column("registrado_en", TIMESTAMP),
+        name="v",
+    ).data([(i, lat, lon, fecha) for i, (lat, lon, fecha) in ultimas.items()])
+    return db.execute(
+        update(Distribuidor)
+        .where(
+            Distribuidor.id == v.c.id,
+            or_(
+                Distribuidor.ubicacion_actualizada_en.is_(None),
+                Distribuidor.ubicacion_actualizada_en <= v.c.registrado_en,
+            ),
+        )
+        .values(
+            latitud=v.c.latitud,
+            longitud=v.c.longitud,
+            ubicacion_actualizada_en=v.c.registrado_en,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+class BufferUbicaciones:
+    def __init__(self, guardar_historial: bool = GUARDAR_HISTORIAL, max_pendientes: int = MAX_PENDIENTES):
+        self.guardar_historial = guardar_historial
+        self.max_pendientes = max_pendientes
+        self._ultimas: dict = {}     # distribuidor_id -> (lat, lon, registrado_en)
+        self._historial: list = []
+        self._lock = threading.Lock()
+        self._lleno = threading.Event()
+        self._hilo = None
+        self._detener = threading.Event()
+        self.estadisticas = {"recibidas": 0, "vaciados": 0, "filas_actualizadas": 0, "historial_insertadas": 0}
+
+    def agregar(self, posiciones, actualizar_ultima: bool = True) -> dict:
+        """
+        Agrega posiciones (distribuidor_id, lat, lon, registrado_en) al buffer.
+        Con actualizar_ultima=False sólo van al historial (la posición actual
+        ya se guardó por otra vía). Retorna {distribuidor_id: (lat, lon)} con
+        las que pasaron a ser la más reciente de su distribuidor.
+        """
+        recibido_en = datetime.utcnow()
+        nuevas = {}
+        with self._lock:
+            for distribuidor_id, lat, lon, registrado_en in posiciones:
+                registrado_en = _utc(registrado_en)
+                actual = self._ultimas.get(distribuidor_id)
+                if actualizar_ultima and (actual is None or registrado_en >= actual[2]):
+                    self._ultimas[distribuidor_id] = (lat, lon, registrado_en)
+                    nuevas[distribuidor_id] = (lat, lon)
+                if self.guardar_historial:
+                    self._historial.append({
+                        "distribuidor_id": distribuidor_id,
+                        "latitud": lat,
+                        "longitud": lon,
+                        "registrado_en": registrado_en,
+                        "recibido_en": recibido_en,
+                    })
+            self.estadisticas["recibidas"] += len(posiciones)
+            if len(self._ultimas) + len(self._historial) >= self.max_pendientes:
+                self._lleno.set()
+        return nuevas
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._ultimas) + len(self._historial)
+
+    def vaciar(self) -> int:
+        """Escribe el buffer en la BD; retorna cuántos distribuidores se actualizaron."""
+        with self._lock:
+            ultimas, self._ultimas = self._ultimas, {}
+            historial, self._historial = self._historial, []
+            self._lleno.clear()
+        if not ultimas and not historial:
+            return 0
+
+        db = SessionLocal()
+        try:
+            actualizadas = _actualizar_ultimas(db, ultimas) if ultimas else 0
+            if historial:
+                insertar_historial(db, historial)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error al guardar {len(ultimas)} ubicaciones, se reintentará: {e}")
+            self._devolver(ultimas, historial)
+            return 0
+        finally:
+            db.close()
+
+        # El UPDATE masivo no pasa por los eventos del ORM
+        for distribuidor_id in ultimas:
+            cache_principales.invalidar("distribuidor", distribuidor_id)
+
+        with self._lock:
+            self.estadisticas["vaciados"] += 1
+            self.estadisticas["filas_actualizadas"] += actualizadas
+            self.estadisticas["historial_insertadas"] += len(historial)
+        return actualizadas
+
+    def _devolver(self, ultimas: dict, historial: list):
+        """Reincorpora un lote que no se pudo escribir sin pisar posiciones más nuevas."""
+        with self._lock:
+            for distribuidor_id, posicion in ultimas.items():
+                actual = self._ultimas.get(distribuidor_id)
+                if actual is None or posicion[2] > actual[2]:
+                    self._ultimas[distribuidor_id] = posicion
+            # El historial se descarta si el buffer ya está lleno, para no crecer sin límite
+            if len(self._historial) + len(historial) <= self.max_pendientes:
+                self._historial[:0] = historial
+
+    # ─── Vaciado periódico ───────────────────────────────────────
+    def iniciar(self, intervalo_s: float = INTERVALO_S):
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, args=(intervalo_s,), daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y escribe lo que quede pendiente."""
+        if self._hilo is not None:
+            self._detener.set()
+            self._lleno.set()
+            self._hilo.join()
+            self._hilo = None
+        self.vaciar()
+
+    def _ciclo(self, intervalo_s: float):
+        while not self._detener.is_set():
+            self._lleno.wait(intervalo_s)
+            self.vaciar()
+
+
+buffer_ubicaciones = BufferUbicaciones()
+
+
+def registrar_ubicaciones(distribuidor_id, ubicaciones) -> dict:
+    """
+    Recibe un lote de UbicacionGPS del distribuidor autenticado. Descarta las
+    que traen otro distribuidor_id o una hora de registro fuera de rango,
+    encola el resto y actualiza el índice espacial y el seguimiento en vivo
+    con la última posición.
+    """
+    ahora = datetime.utcnow()
+    validas = []
+    for u in ubicaciones:
+        if u.distribuidor_id is not None and u.distribuidor_id != distribuidor_id:
+            continue
+        registrado_en = hora_registro_valida(u.registrado_en, ahora)
+        if registrado_en is not None:
+            validas.append((distribuidor_id, u.latitud, u.longitud, registrado_en))
+
+    nuevas = buffer_ubicaciones.agregar(validas)
+    if distribuidor_id in nuevas:
+        posicion = _Posicion(distribuidor_id, *nuevas[distribuidor_id])
+        indice_espacial_service.actualizar_distribuidor(posicion)
+        publicar_ubicacion_distribuidor(posicion)
+
+    return {
+        "aceptadas": len(validas),
+        "rechazadas": len(ubicaciones) - len(validas),
+        "distribuidores": len(nuevas),
+    }
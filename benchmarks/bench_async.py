@@ -0,0 +1,244 @@
+"""
+Benchmark: rutas de lectura síncronas (threadpool + Session) vs. async
+(AsyncSession con asyncpg) con el mismo número de workers.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_async [peticiones] [concurrencia]
+
+Siembra 20 clientes con 30 pedidos cada uno (pago y entrega incluidos) y
+lanza `peticiones` (2.000 por defecto) con `concurrencia` en vuelo (100 por
+defecto), repartidas entre mis-pedidos (compacto), mis-entregas,
+seguimiento-entrega y estado_pago. Las peticiones entran por ASGI en este
+mismo proceso (un worker), sin pasar por la red:
+
+  • "síncrona": las rutas como eran antes, `def` con get_current_cliente y
+    los servicios síncronos, que FastAPI ejecuta en su threadpool;
+  • "async": las rutas actuales de cliente_routes y pago_routes.
+
+Ambas ejecutan las mismas consultas (los servicios comparten los select()).
+La diferencia crece con la latencia de red hacia PostgreSQL, porque cada
+petición síncrona retiene un hilo mientras espera a la BD.
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from sqlalchemy.orm import Session
+
+from app.auth.dependencies import get_current_cliente, get_db
+from app.auth.jwt_utils import crear_token
+from app.database import Base, SessionLocal, async_engine, engine
+from app.models.asignacion_model import AsignacionEntrega
+from app.models.cliente_model import Cliente
+from app.models.distribuidor_model import Distribuidor
+from app.models.pago_model import Pago
+from app.models.pedido_model import DetallePedido, Pedido
+from app.models.producto_model import Producto
+from app.models.ruta_entrega_model import Entrega, RutaEntrega
+from app.models.seguimiento_model import crear_vista_seguimiento
+from app.routes import cliente_routes, pago_routes
+from app.services import pago_service, seguimiento_service
+from app.services.pedido_service import historial_pedidos_cliente
+
+CLIENTES = 20
+PEDIDOS_POR_CLIENTE = 30
+
+
+def _app_sincrona() -> FastAPI:
+    """Las cuatro rutas como `def`, con Session y dependencias síncronas."""
+    router = APIRouter()
+
+    @router.get("/clientes/mis-pedidos")
+    def mis_pedidos(compacto: bool = False, cliente=Depends(get_current_cliente), db: Session = Depends(get_db)):
+        pedidos, total, _ = historial_pedidos_cliente(db, cliente.id, compacto=compacto)
+        return {"pedidos": pedidos, "total_pedidos": total}
+
+    @router.get("/clientes/mis-entregas")
+    def mis_entregas(cliente=Depends(get_current_cliente), db: Session = Depends(get_db)):
+        return {"entregas": seguimiento_service.entregas_cliente(db, cliente.id)}
+
+    @router.get("/clientes/seguimiento-entrega/{entrega_id}")
+    def seguimiento(entrega_id: uuid.UUID, cliente=Depends(get_current_cliente), db: Session = Depends(get_db)):
+        datos = seguimiento_service.seguimiento_entrega(db, cliente.id, entrega_id)
+        if not datos:
+            raise HTTPException(status_code=404)
+        return datos
+
+    @router.get("/pagos/estado_pago/{pedido_id}")
+    def estado_pago(pedido_id: uuid.UUID, db: Session = Depends(get_db)):
+        datos = pago_service.estado_pago_pedido(db, pedido_id)
+        if not datos:
+            raise HTTPException(status_code=404)
+        return datos
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def _app_async() -> FastAPI:
+    app = FastAPI()
+    app.include_router(cliente_routes.router)
+    app.include_router(pago_routes.router)
+    return app
+
+
+async def _llamar(app, ruta: str, token: str) -> int:
+    """Ejecuta un GET contra la app ASGI y retorna el código de estado."""
+    path, _, query = ruta.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    estado = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estado["status"] = mensaje["status"]
+
+    await app(scope, receive, send)
+    return estado["status"]
+
+
+def _sembrar():
+    rng = random.Random(0)
+    prefijo = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        productos = [
+            {"id": uuid.uuid4(), "nombre": f"Bench {i}", "precio": rng.randint(10, 500), "stock": 1000}
+            for i in range(20)
+        ]
+        distribuidor = {
+            "id": uuid.uuid4(), "nombre": "Bench", "apellido": "Async", "carnet": f"b-{prefijo}",
+            "telefono": "0", "email": f"bench-async-{prefijo}@example.com", "licencia": "-", "password": "-",
+            "latitud": -17.78, "longitud": -63.18,
+        }
+        ruta = {"ruta_id": uuid.uuid4(), "coordenadas_inicio": "-17.78,-63.18", "coordenadas_fin": "-17.79,-63.19"}
+        asignacion = {"id": uuid.uuid4(), "id_distribuidor": distribuidor["id"], "ruta_id": ruta["ruta_id"]}
+        clientes, pedidos, detalles, pagos, entregas = [], [], [], [], []
+        for c in range(CLIENTES):
+            cliente = {
+                "id": uuid.uuid4(), "nombre": "Bench", "apellido": str(c), "telefono": "0", "direccion": "-",
+                "email": f"bench-async-{prefijo}-{c}@example.com", "password": "-",
+                "coordenadas": "-17.78,-63.18", "latitud": -17.78, "longitud": -63.18,
+            }
+            clientes.append(cliente)
+            for p in range(PEDIDOS_POR_CLIENTE):
+                pedido_id = uuid.uuid4()
+                pedidos.append({"id": pedido_id, "cliente_id": cliente["id"], "estado": "pendiente"})
+                for producto in rng.sample(productos, rng.randint(1, 3)):
+                    detalles.append({"id": uuid.uuid4(), "pedido_id": pedido_id,
+                                     "producto_id": producto["id"], "cantidad": rng.randint(1, 4)})
+                pagos.append({"id_pago": uuid.uuid4(), "pedido_id": pedido_id, "metodo_pago": "QR",
+                              "monto": 100, "estado": "completado"})
+                entregas.append({"id_entrega": uuid.uuid4(), "orden_entrega": p, "estado": "pendiente",
+                                 "coordenadas_fin": "-17.79,-63.19", "ruta_id": ruta["ruta_id"],
+                                 "cliente_id": cliente["id"], "pedido_id": pedido_id,
+                                 "asignacion_id": asignacion["id"]})
+        for modelo, filas in [
+            (Producto, productos), (Distribuidor, [distribuidor]), (RutaEntrega, [ruta]),
+            (AsignacionEntrega, [asignacion]), (Cliente, clientes), (Pedido, pedidos),
+            (DetallePedido, detalles), (Pago, pagos), (Entrega, entregas),
+        ]:
+            db.execute(modelo.__table__.insert(), filas)
+        db.commit()
+        return {
+            "clientes": clientes, "productos": productos, "distribuidor": distribuidor,
+            "ruta": ruta, "asignacion": asignacion, "entregas": entregas,
+        }
+    finally:
+        db.close()
+
+
+def _limpiar(datos):
+    ids_clientes = [c["id"] for c in datos["clientes"]]
+    db = SessionLocal()
+    try:
+        pedidos = db.query(Pedido.id).filter(Pedido.cliente_id.in_(ids_clientes))
+        db.query(Entrega).filter(Entrega.asignacion_id == datos["asignacion"]["id"]).delete(synchronize_session=False)
+        db.query(Pago).filter(Pago.pedido_id.in_(pedidos)).delete(synchronize_session=False)
+        db.query(DetallePedido).filter(DetallePedido.pedido_id.in_(pedidos)).delete(synchronize_session=False)
+        db.query(Pedido).filter(Pedido.cliente_id.in_(ids_clientes)).delete(synchronize_session=False)
+        db.query(AsignacionEntrega).filter(AsignacionEntrega.id == datos["asignacion"]["id"]).delete(synchronize_session=False)
+        db.query(RutaEntrega).filter(RutaEntrega.ruta_id == datos["ruta"]["ruta_id"]).delete(synchronize_session=False)
+        db.query(Distribuidor).filter(Distribuidor.id == datos["distribuidor"]["id"]).delete(synchronize_session=False)
+        db.query(Cliente).filter(Cliente.id.in_(ids_clientes)).delete(synchronize_session=False)
+        db.query(Producto).filter(Producto.id.in_([p["id"] for p in datos["productos"]])).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _peticiones(datos, total: int) -> list[tuple[str, str]]:
+    rng = random.Random(1)
+    tokens = {c["id"]: crear_token({"sub": c["email"], "role": "cliente"}) for c in datos["clientes"]}
+    peticiones = []
+    for i in range(total):
+        entrega = rng.choice(datos["entregas"])
+        token = tokens[entrega["cliente_id"]]
+        ruta = [
+            "/clientes/mis-pedidos?compacto=true",
+            "/clientes/mis-entregas",
+            f"/clientes/seguimiento-entrega/{entrega['id_entrega']}",
+            f"/pagos/estado_pago/{entrega['pedido_id']}",
+        ][i % 4]
+        peticiones.append((ruta, token))
+    return peticiones
+
+
+async def _medir(nombre: str, app, peticiones, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias, errores = [], 0
+
+    async def una(ruta, token):
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            if await _llamar(app, ruta, token) != 200:
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    # Calentamiento: conexiones del pool y caché de autenticación
+    await asyncio.gather(*(una(r, t) for r, t in peticiones[:concurrencia]))
+    latencias.clear()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(r, t) for r, t in peticiones))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    print(
+        f"{nombre:<10} {len(peticiones) / total:8.1f} pet/s   p50 {statistics.median(latencias) * 1000:7.1f} ms   "
+        f"p95 {latencias[int(len(latencias) * 0.95) - 1] * 1000:7.1f} ms   errores {errores}"
+    )
+
+
+async def _principal(total: int, concurrencia: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        crear_vista_seguimiento(conn)
+    datos = _sembrar()
+    try:
+        peticiones = _peticiones(datos, total)
+        print(f"{total} peticiones, concurrencia {concurrencia}, {engine.dialect.name}")
+        await _medir("síncrona", _app_sincrona(), peticiones, concurrencia)
+        await _medir("async", _app_async(), peticiones, concurrencia)
+    finally:
+        _limpiar(datos)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrencia = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(_principal(total, concurrencia))
@@ -0,0 +1,66 @@
+"""
+Benchmark: matriz de distancias NumPy vs. geopy.geodesic por par.
+
+Uso:
+    python -m benchmarks.bench_distancias
+
+Para 1.000 puntos (1.000.000 de pares) el tiempo de geopy se estima a partir
+de una muestra, ya que recorrer todos los pares tarda varios minutos.
+"""
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+from app.geo.distancias import matriz_distancias, MODO_HAVERSINE, MODO_ELIPSOIDE
+
+MUESTRA_GEOPY = 20_000
+
+
+def _puntos(n: int, semilla: int = 0) -> np.ndarray:
+    # Puntos aleatorios en un área urbana (~25 km x 25 km)
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.uniform(-17.90, -17.68, n),
+        rng.uniform(-63.30, -63.08, n),
+    ])
+
+
+def _medir(fn, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def _medir_geopy(puntos: np.ndarray) -> tuple[float, bool]:
+    n = len(puntos)
+    pares = [(tuple(a), tuple(b)) for a in puntos for b in puntos]
+    estimado = len(pares) > MUESTRA_GEOPY
+    muestra = pares[:MUESTRA_GEOPY]
+    inicio = time.perf_counter()
+    for a, b in muestra:
+        geodesic(a, b).km
+    transcurrido = time.perf_counter() - inicio
+    return transcurrido * (n * n) / len(muestra), estimado
+
+
+def main():
+    print(f"{'puntos':>7} {'geopy (s)':>12} {'haversine (s)':>14} {'elipsoide (s)':>14} {'x hav.':>9} {'x elip.':>9}")
+    for n in (10, 100, 1_000):
+        puntos = _puntos(n)
+        t_geopy, estimado = _medir_geopy(puntos)
+        t_hav = _medir(lambda: matriz_distancias(puntos, modo=MODO_HAVERSINE))
+        t_elip = _medir(lambda: matriz_distancias(puntos, modo=MODO_ELIPSOIDE))
+        marca = "*" if estimado else " "
+        print(
+            f"{n:>7} {t_geopy:>11.4f}{marca} {t_hav:>14.5f} {t_elip:>14.5f} "
+            f"{t_geopy / t_hav:>9.0f} {t_geopy / t_elip:>9.0f}"
+        )
+    print("* estimado a partir de una muestra de pares")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: throughput de /auth/login con logins concurrentes.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_login [logins] [concurrencia]
+
+Crea 50 clientes de prueba con hash del costo BCRYPT_ROUNDS y ejecuta
+`logins` inicios de sesión (200 por defecto) con `concurrencia` en vuelo
+(32 por defecto) contra:
+
+  • la versión anterior: ruta síncrona con bcrypt.checkpw, que FastAPI
+    ejecuta en su threadpool;
+  • la versión actual: ruta async que espera la verificación en el pool
+    de procesos de app.auth.contrasenas.
+
+Además del throughput mide la latencia por login y el retraso máximo del
+event loop (un tick cada 10 ms), que es lo que notan las demás peticiones.
+Borra los datos al terminar.
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import bcrypt
+from fastapi.concurrency import run_in_threadpool
+
+from app.auth import contrasenas
+from app.database import Base, SessionLocal, engine
+from app.models.cliente_model import Cliente
+from app.models.distribuidor_model import Distribuidor
+from app.routes.auth_routes import login
+from app.schemas.auth_schema import LoginRequest
+
+USUARIOS = 50
+PASSWORD = "clave-de-prueba"
+
+
+def _sembrar() -> list[str]:
+    prefijo = f"bench-login-{uuid.uuid4().hex[:8]}"
+    password_hash = contrasenas.hashear_sync(PASSWORD)
+    db = SessionLocal()
+    try:
+        emails = [f"{prefijo}-{i}@example.com" for i in range(USUARIOS)]
+        db.add_all([
+            Cliente(
+                nombre="Bench", apellido="Login", telefono="0", direccion="-",
+                email=email, password=password_hash, coordenadas="-17.78,-63.18",
+            )
+            for email in emails
+        ])
+        db.commit()
+        return emails
+    finally:
+        db.close()
+
+
+def _limpiar(emails: list[str]):
+    db = SessionLocal()
+    try:
+        db.query(Cliente).filter(Cliente.email.in_(emails)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _login_anterior(email: str, password: str):
+    """Implementación previa: consultas y bcrypt.checkpw en el mismo hilo."""
+    db = SessionLocal()
+    try:
+        user = db.query(Cliente).filter(Cliente.email == email).first()
+        if not user:
+            user = db.query(Distribuidor).filter(Distribuidor.email == email).first()
+        if not user or not bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+            raise ValueError("credenciales")
+        return user.email
+    finally:
+        db.close()
+
+
+async def _login_actual(email: str, password: str):
+    db = SessionLocal()
+    try:
+        return await login(LoginRequest(email=email, password=password), db)
+    finally:
+        db.close()
+
+
+async def _medir(nombre: str, funcion, emails: list[str], logins: int, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+    retraso_maximo = 0.0
+    terminado = asyncio.Event()
+
+    async def tick():
+        nonlocal retraso_maximo
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.01)
+            retraso_maximo = max(retraso_maximo, time.perf_counter() - inicio - 0.01)
+
+    async def uno(i: int):
+        async with semaforo:
+            inicio = time.perf_counter()
+            await funcion(emails[i % len(emails)], PASSWORD)
+            latencias.append(time.perf_counter() - inicio)
+
+    ticker = asyncio.create_task(tick())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uno(i) for i in range(logins)))
+    total = time.perf_counter() - inicio
+    terminado.set()
+    await ticker
+
+    latencias.sort()
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(
+        f"{nombre:<10} {logins / total:8.1f} logins/s   "
+        f"p50 {statistics.median(latencias) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+        f"retraso máx. del loop {retraso_maximo * 1000:6.1f} ms"
+    )
+
+
+async def _principal(logins: int, concurrencia: int):
+    Base.metadata.create_all(bind=engine)
+    emails = _sembrar()
+    try:
+        print(
+            f"{logins} logins, concurrencia {concurrencia}, costo {contrasenas.RONDAS}, "
+            f"{contrasenas.PROCESOS} procesos bcrypt"
+        )
+        await _medir("anterior", lambda e, p: run_in_threadpool(_login_anterior, e, p), emails, logins, concurrencia)
+        contrasenas.iniciar()
+        await _medir("actual", _login_actual, emails, logins, concurrencia)
+    finally:
+        contrasenas.cerrar()
+        _limpiar(emails)
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrencia = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(_principal(logins, concurrencia))
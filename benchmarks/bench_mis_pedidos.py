@@ -0,0 +1,147 @@
+"""
+Benchmark: historial de /clientes/mis-pedidos con consultas por pedido vs.
+consultas agregadas y paginadas.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_mis_pedidos [pedidos]
+
+Crea un cliente de prueba con `pedidos` pedidos (10.000 por defecto) de 1 a 5
+líneas cada uno, mide ambas versiones y borra los datos al terminar.
+"""
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy import event
+
+from app.database import Base, SessionLocal, engine
+from app.models.cliente_model import Cliente
+from app.models.pago_model import Pago
+from app.models.pedido_model import DetallePedido, Pedido
+from app.models.producto_model import Producto
+from app.services.pedido_service import historial_pedidos_cliente
+
+PEDIDOS_POR_DEFECTO = 10_000
+PRODUCTOS = 50
+
+
+def _sembrar(db, pedidos: int):
+    rng = random.Random(0)
+    cliente = Cliente(
+        nombre="Bench", apellido="Pedidos", telefono="0", direccion="-",
+        email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password="-",
+        coordenadas="-17.78,-63.18",
+    )
+    productos = [
+        Producto(id=uuid.uuid4(), nombre=f"Bench {i}", precio=rng.randint(10, 500), stock=1000)
+        for i in range(PRODUCTOS)
+    ]
+    db.add(cliente)
+    db.add_all(productos)
+    db.flush()
+
+    filas_pedido, filas_detalle, filas_pago = [], [], []
+    for _ in range(pedidos):
+        pedido_id = uuid.uuid4()
+        filas_pedido.append({"id": pedido_id, "cliente_id": cliente.id, "estado": "entregado"})
+        for producto in rng.sample(productos, rng.randint(1, 5)):
+            filas_detalle.append({
+                "id": uuid.uuid4(), "pedido_id": pedido_id,
+                "producto_id": producto.id, "cantidad": rng.randint(1, 4),
+            })
+        if rng.random() < 0.8:
+            filas_pago.append({
+                "id_pago": uuid.uuid4(), "pedido_id": pedido_id,
+                "metodo_pago": "QR", "monto": 0, "estado": "completado",
+            })
+    db.execute(Pedido.__table__.insert(), filas_pedido)
+    db.execute(DetallePedido.__table__.insert(), filas_detalle)
+    db.execute(Pago.__table__.insert(), filas_pago)
+    db.commit()
+    return cliente.id, [p.id for p in productos]
+
+
+def _limpiar(db, cliente_id, productos_ids):
+    ids = db.query(Pedido.id).filter(Pedido.cliente_id == cliente_id)
+    db.query(Pago).filter(Pago.pedido_id.in_(ids)).delete(synchronize_session=False)
+    db.query(DetallePedido).filter(DetallePedido.pedido_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Pedido).filter(Pedido.cliente_id == cliente_id).delete(synchronize_session=False)
+    db.query(Producto).filter(Producto.id.in_(productos_ids)).delete(synchronize_session=False)
+    db.query(Cliente).filter(Cliente.id == cliente_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _version_anterior(db, cliente_id):
+    """Implementación previa: una consulta por pedido, por línea y por pago."""
+    resultado = []
+    pedidos = db.query(Pedido).filter(Pedido.cliente_id == cliente_id).order_by(Pedido.fecha_pedido.desc()).all()
+    for pedido in pedidos:
+        productos, total = [], 0
+        for detalle in db.query(DetallePedido).filter(DetallePedido.pedido_id == pedido.id).all():
+            producto = db.query(Producto).filter(Producto.id == detalle.producto_id).first()
+            if producto:
+                subtotal = float(producto.precio) * detalle.cantidad
+                total += subtotal
+                productos.append({"producto_id": str(producto.id), "subtotal": subtotal})
+        pago = db.query(Pago).filter(Pago.pedido_id == pedido.id).first()
+        resultado.append({"total": total, "productos": productos, "pago": pago and pago.estado})
+    return resultado
+
+
+def _todas_las_paginas(db, cliente_id, compacto=False):
+    pedidos, cursor = [], None
+    while True:
+        pagina, _, cursor = historial_pedidos_cliente(db, cliente_id, 200, cursor, compacto)
+        pedidos.extend(pagina)
+        if not cursor:
+            return pedidos
+
+
+def _medir(nombre, fn, consultas):
+    db = SessionLocal()
+    try:
+        consultas[0] = 0
+        inicio = time.perf_counter()
+        resultado = fn(db)
+        transcurrido = time.perf_counter() - inicio
+    finally:
+        db.close()
+    print(f"{nombre:<38} {transcurrido * 1000:>10.1f} ms {consultas[0]:>8} consultas  ({len(resultado)} pedidos)")
+    return resultado
+
+
+def main():
+    pedidos = int(sys.argv[1]) if len(sys.argv) > 1 else PEDIDOS_POR_DEFECTO
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    print(f"Sembrando {pedidos} pedidos...")
+    cliente_id, productos_ids = _sembrar(db, pedidos)
+    db.close()
+
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        anterior = _medir("Anterior (todo el historial)", lambda db: _version_anterior(db, cliente_id), consultas)
+        _medir("Agregada, primera página (50)", lambda db: historial_pedidos_cliente(db, cliente_id)[0], consultas)
+        _medir("Agregada, primera página compacta", lambda db: historial_pedidos_cliente(db, cliente_id, compacto=True)[0], consultas)
+        nuevo = _medir("Agregada, todo el historial (200/pág)", lambda db: _todas_las_paginas(db, cliente_id), consultas)
+        _medir("Agregada compacta, todo el historial", lambda db: _todas_las_paginas(db, cliente_id, True), consultas)
+
+        total_anterior = round(sum(p["total"] for p in anterior), 2)
+        total_nuevo = round(sum(p["total"] for p in nuevo), 2)
+        print(f"Suma de totales: anterior={total_anterior} agregada={total_nuevo}")
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+        db = SessionLocal()
+        _limpiar(db, cliente_id, productos_ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Prueba de carga del pool de conexiones.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.carga_pool [hilos] [segundos] [consulta_ms]
+
+Simula `hilos` peticiones concurrentes (64 por defecto) durante `segundos`
+(10 por defecto). Cada una toma una conexión, ejecuta una consulta de
+`consulta_ms` milisegundos (20 por defecto; pg_sleep en PostgreSQL, espera
+con la conexión tomada en otros motores) y la devuelve. Se compara:
+
+  • los valores por defecto de SQLAlchemy (pool 5 + overflow 10);
+  • la configuración del entorno (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...).
+
+Para cada una reporta peticiones/s, latencia p50/p95, espera por conexión,
+timeouts del pool y saturación máxima observada. Con pool_timeout de 2 s,
+los timeouts muestran qué pasa cuando el pool es chico para la carga.
+"""
+import statistics
+import sys
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.database import DATABASE_URL, POOL_CONFIG, crear_engine
+
+CONFIGURACIONES = {
+    "sqlalchemy": {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": False, "pool_recycle": -1},
+    "entorno": {},
+}
+
+
+def _ejecutar(nombre: str, config: dict, hilos: int, segundos: float, consulta_ms: int):
+    engine = crear_engine(DATABASE_URL, **{**config, "pool_timeout": 2})
+    postgres = engine.dialect.name == "postgresql"
+    latencias, errores = [], [0]
+    saturacion_maxima = [0.0]
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def trabajador():
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    if postgres:
+                        conn.execute(text("SELECT pg_sleep(:s)"), {"s": consulta_ms / 1000})
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        time.sleep(consulta_ms / 1000)
+                    saturacion = engine.pool.metricas()["saturacion"] or 0.0
+            except Exception:
+                with lock:
+                    errores[0] += 1
+                continue
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+                saturacion_maxima[0] = max(saturacion_maxima[0], saturacion)
+
+    threads = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    metricas = engine.pool.metricas()
+    engine.dispose()
+    latencias.sort()
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0.0
+    print(
+        f"{nombre:<11} pool {metricas['tamano']:>3}+{metricas['max_overflow']:<3} "
+        f"{len(latencias) / segundos:8.1f} pet/s   "
+        f"p50 {statistics.median(latencias) * 1000 if latencias else 0:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+        f"espera prom. {metricas['espera_promedio_ms']:7.1f} ms  máx. {metricas['espera_maxima_ms']:7.1f} ms   "
+        f"timeouts {metricas['timeouts']:>4}   errores {errores[0]:>4}   saturación máx. {saturacion_maxima[0]:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    consulta_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    print(f"{hilos} hilos, {segundos:g} s, consultas de {consulta_ms} ms; entorno: {POOL_CONFIG}")
+    for nombre, config in CONFIGURACIONES.items():
+        _ejecutar(nombre, config, hilos, segundos, consulta_ms)
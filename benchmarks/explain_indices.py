@@ -0,0 +1,174 @@
+"""
+Verificación con EXPLAIN de los índices de las consultas más usadas.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_indices
+
+Para cada forma de consulta de las rutas (construida con las mismas
+funciones de los servicios cuando existen) pide el plan al motor y
+comprueba que use alguno de los índices esperados. Termina con código 1 si
+alguna consulta dejó de usarlos (un índice borrado, renombrado o una
+consulta que cambió de forma), así que sirve como chequeo de regresión en
+CI o antes de desplegar.
+
+Antes aplica las migraciones pendientes (como el release); después sólo
+ejecuta EXPLAIN (sin ANALYZE): no modifica datos. En PostgreSQL el plan
+se pide con `enable_seqscan = off` dentro de la transacción, porque con
+tablas chicas el planificador prefiere leerlas enteras; lo que se comprueba
+es que exista un índice utilizable para cada consulta, no el costo. En
+SQLite se usa EXPLAIN QUERY PLAN.
+"""
+import sys
+import uuid
+
+from sqlalchemy import func, select, text
+
+from app.database import engine
+from app.migraciones.migrador import migrar
+from app.models.asignacion_model import AsignacionEntrega, PedidoAsignado
+from app.models.asignacion_vehiculo_model import AsignacionVehiculo
+from app.models.pedido_model import DetallePedido, Pedido
+from app.models.ruta_entrega_model import Entrega
+from app.services.entregas_service import consulta_asignaciones_distribuidor
+from app.services.paginacion_service import _aplicar_cursor
+from app.services.pago_service import consulta_pago_pedido
+from app.services.pedido_service import _consulta_lineas_pedidos, _consulta_pagina_historial
+from app.services.seguimiento_service import consulta_entregas_cliente
+
+# Índice implícito de la restricción UNIQUE de pago.pedido_id (en SQLite sólo
+# el prefijo: el número depende del orden de las restricciones)
+_PAGO_PEDIDO_UNICO = ("pago_pedido_id_key", "sqlite_autoindex_pago_")
+
+
+def _casos():
+    """(nombre, consulta, índices aceptados) por cada forma de consulta."""
+    distribuidor, cliente, ruta = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    asignacion, pedido = uuid.uuid4(), uuid.uuid4()
+    return [
+        (
+            "asignaciones pendientes del distribuidor",
+            consulta_asignaciones_distribuidor(distribuidor, AsignacionEntrega.estado == "pendiente"),
+            ("ix_asignacion_entrega_pendientes", "ix_asignacion_entrega_distribuidor_estado"),
+        ),
+        (
+            "listado paginado de asignaciones",
+            _aplicar_cursor(
+                consulta_asignaciones_distribuidor(distribuidor),
+                AsignacionEntrega.id, AsignacionEntrega.fecha_asignacion, None, 50,
+            ),
+            ("ix_asignacion_entrega_distribuidor_fecha",),
+        ),
+        (
+            "conteo de asignaciones por estado",
+            select(func.count(AsignacionEntrega.id)).where(
+                AsignacionEntrega.id_distribuidor == distribuidor,
+                AsignacionEntrega.estado == "aceptada",
+            ),
+            ("ix_asignacion_entrega_distribuidor_estado",),
+        ),
+        (
+            "asignaciones pendientes obsoletas",
+            select(AsignacionEntrega.id).where(
+                AsignacionEntrega.id_distribuidor == distribuidor,
+                AsignacionEntrega.estado == "pendiente",
+                AsignacionEntrega.fecha_asignacion < func.now(),
+            ),
+            ("ix_asignacion_entrega_pendientes", "ix_asignacion_entrega_distribuidor_estado"),
+        ),
+        (
+            "otras asignaciones pendientes de la ruta",
+            select(AsignacionEntrega.id).where(
+                AsignacionEntrega.ruta_id == ruta,
+                AsignacionEntrega.id != asignacion,
+                AsignacionEntrega.estado == "pendiente",
+            ),
+            ("ix_asignacion_entrega_ruta_estado",),
+        ),
+        (
+            "entregas de una asignación",
+            select(Entrega.id_entrega).where(Entrega.asignacion_id == asignacion),
+            ("ix_entrega_asignacion_estado",),
+        ),
+        (
+            "entregas del distribuidor por estado (JOIN)",
+            select(func.count(Entrega.id_entrega)).join(AsignacionEntrega).where(
+                AsignacionEntrega.id_distribuidor == distribuidor,
+                Entrega.estado == "entregado",
+            ),
+            ("ix_entrega_asignacion_estado",),
+        ),
+        (
+            "seguimiento de entregas del cliente",
+            consulta_entregas_cliente(cliente),
+            ("ix_entrega_cliente_fecha",),
+        ),
+        (
+            "historial de pedidos del cliente",
+            _aplicar_cursor(_consulta_pagina_historial(cliente), Pedido.id, Pedido.fecha_pedido, None, 50),
+            ("ix_pedido_cliente_fecha",),
+        ),
+        (
+            "pedidos pendientes por asignar",
+            select(Pedido.id).where(Pedido.estado == "pendiente"),
+            ("ix_pedido_pendientes",),
+        ),
+        (
+            "líneas de los pedidos de una página",
+            _consulta_lineas_pedidos([pedido, uuid.uuid4()]),
+            ("ix_detalle_pedido_pedido",),
+        ),
+        (
+            "pedidos de una asignación",
+            select(PedidoAsignado.pedido_id).where(PedidoAsignado.asignacion_id == asignacion),
+            ("ix_pedido_asignado_asignacion",),
+        ),
+        (
+            "asignaciones de un pedido",
+            select(PedidoAsignado.id).where(PedidoAsignado.pedido_id == pedido),
+            ("ix_pedido_asignado_pedido",),
+        ),
+        (
+            "vehículo del distribuidor",
+            select(AsignacionVehiculo.id_vehiculo).where(AsignacionVehiculo.id_distribuidor == distribuidor),
+            ("ix_asignacion_vehiculo_distribuidor",),
+        ),
+        (
+            "pago de un pedido",
+            consulta_pago_pedido(pedido),
+            _PAGO_PEDIDO_UNICO,
+        ),
+    ]
+
+
+def _plan(conn, consulta) -> str:
+    sql = str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "postgresql":
+        return "\n".join(conn.execute(text(f"EXPLAIN {sql}")).scalars())
+    return "\n".join(fila[-1] for fila in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def verificar() -> list[str]:
+    """Nombres de los casos cuyo plan no usa ninguno de los índices esperados."""
+    fallidos = []
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for nombre, consulta, indices in _casos():
+            plan = _plan(conn, consulta)
+            usado = next((i for i in indices if i in plan), None)
+            print(f"{'ok   ' if usado else 'FALLA'} {nombre:<45} {usado or ' / '.join(indices)}")
+            if not usado:
+                fallidos.append(nombre)
+                print("      " + plan.replace("\n", "\n      "))
+        conn.rollback()
+    return fallidos
+
+
+if __name__ == "__main__":
+    migrar()
+    print(f"Planes de {engine.dialect.name}")
+    fallidos = verificar()
+    if fallidos:
+        print(f"{len(fallidos)} consulta(s) sin el índice esperado")
+        sys.exit(1)
+    print("Todas las consultas usan sus índices")
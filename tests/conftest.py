@@ -0,0 +1,104 @@
+"""
+Configuración común de las pruebas.
+
+Las variables de entorno se fijan antes de importar `app`: las pruebas usan
+una BD SQLite temporal (migrada una vez por sesión), sin Google Maps, sin
+caché de distancias en disco y con bcrypt en el mismo proceso.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="sig-pruebas-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DIRECTORIO}/pruebas.db"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["BCRYPT_PROCESOS"] = "0"
+os.environ["MAPS_CACHE_PATH"] = ""
+os.environ.pop("GOOGLE_MAPS_API_KEY", None)
+os.environ.pop("REDIS_URL", None)
+
+import pytest
+
+from app.database import SessionLocal, async_engine
+from app.migraciones.migrador import migrar
+
+
+@pytest.fixture(scope="session", autouse=True)
+def esquema():
+    migrar()
+    yield
+    if async_engine is not None:
+        asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def db():
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+@pytest.fixture
+def distribuidor(db):
+    """Distribuidor recién creado (con email y carnet únicos) y su token."""
+    from app.auth.jwt_utils import crear_token
+    from app.models.distribuidor_model import Distribuidor
+
+    sufijo = uuid.uuid4().hex[:10]
+    nuevo = Distribuidor(
+        nombre="Dist", apellido="Prueba", carnet=sufijo, telefono="70000000",
+        email=f"dist-{sufijo}@pruebas.com", licencia="B", password="-",
+    )
+    db.add(nuevo)
+    db.commit()
+    nuevo.token = crear_token({"sub": nuevo.email, "role": "distribuidor"})
+    return nuevo
+
+
+@pytest.fixture
+def llamar_api():
+    """
+    Hace una petición HTTP a la app directamente por ASGI (sin servidor):
+    `llamar_api("GET", "/ruta", token=..., query="a=1")` -> (status, cabeceras, cuerpo JSON).
+    """
+    from app.main import app
+
+    def llamar(metodo: str, ruta: str, token: str = None, query: str = "", cuerpo=None):
+        cabeceras = [(b"host", b"pruebas")]
+        if token:
+            cabeceras.append((b"authorization", f"Bearer {token}".encode()))
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+        if cuerpo is not None:
+            cabeceras.append((b"content-type", b"application/json"))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": metodo, "scheme": "http", "path": ruta, "raw_path": ruta.encode(),
+            "query_string": query.encode(), "root_path": "", "headers": cabeceras,
+            "client": ("127.0.0.1", 50000), "server": ("pruebas", 80),
+        }
+        respuesta = {"status": None, "cabeceras": {}, "cuerpo": b""}
+        enviado = False
+
+        async def recibir():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": datos, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["status"] = mensaje["status"]
+                respuesta["cabeceras"] = {k.decode(): v.decode() for k, v in mensaje["headers"]}
+            elif mensaje["type"] == "http.response.body":
+                respuesta["cuerpo"] += mensaje.get("body", b"")
+
+        asyncio.run(app(scope, recibir, enviar))
+        cuerpo_json = json.loads(respuesta["cuerpo"]) if respuesta["cuerpo"] else None
+        return respuesta["status"], respuesta["cabeceras"], cuerpo_json
+
+    return llamar
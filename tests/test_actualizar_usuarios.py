@@ -0,0 +1,61 @@
+"""
+PUT /clientes/{id} y PUT /distribuidores/{id}: un id inexistente responde
+404 sin pasar por bcrypt.
+"""
+import uuid
+
+import pytest
+
+from app.auth import contrasenas
+from app.models.cliente_model import Cliente
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Registra las contraseñas que llegan a bcrypt (sin hashear de verdad)."""
+    registradas = []
+
+    async def hashear(password, rondas=contrasenas.RONDAS):
+        registradas.append(password)
+        return f"hash-{password}"
+
+    monkeypatch.setattr(contrasenas, "hashear", hashear)
+    return registradas
+
+
+def _datos_cliente() -> dict:
+    return {"nombre": "Cli", "apellido": "Prueba", "telefono": "1", "direccion": "Calle",
+            "email": f"cli-{uuid.uuid4().hex[:10]}@pruebas.com", "password": "secreta"}
+
+
+def _datos_distribuidor() -> dict:
+    return {"nombre": "Dist", "apellido": "Prueba", "carnet": uuid.uuid4().hex[:10], "telefono": "1",
+            "email": f"dist-{uuid.uuid4().hex[:10]}@pruebas.com", "licencia": "B", "password": "secreta"}
+
+
+@pytest.mark.parametrize("ruta,datos", [("/clientes", _datos_cliente), ("/distribuidores", _datos_distribuidor)])
+def test_id_inexistente_responde_404_sin_hashear(llamar_api, hashes, ruta, datos):
+    status, _, cuerpo = llamar_api("PUT", f"{ruta}/{uuid.uuid4()}", cuerpo=datos())
+    assert status == 404, cuerpo
+    assert hashes == []
+
+
+def test_actualizar_cliente_existente_hashea_la_contrasena(db, llamar_api, hashes):
+    cliente = Cliente(nombre="Cli", apellido="Prueba", email=f"cli-{uuid.uuid4().hex[:10]}@pruebas.com",
+                      password="-", telefono="1", direccion="Calle")
+    db.add(cliente)
+    db.commit()
+
+    status, _, cuerpo = llamar_api("PUT", f"/clientes/{cliente.id}", cuerpo=_datos_cliente())
+    assert status == 200, cuerpo
+    assert hashes == ["secreta"]
+    db.refresh(cliente)
+    assert cliente.password == "hash-secreta"
+
+
+def test_actualizar_distribuidor_existente_hashea_la_contrasena(db, distribuidor, llamar_api, hashes):
+    status, _, cuerpo = llamar_api("PUT", f"/distribuidores/{distribuidor.id}", cuerpo=_datos_distribuidor())
+    assert status == 200, cuerpo
+    assert hashes == ["secreta"]
+    db.refresh(distribuidor)
+    assert distribuidor.password == "hash-secreta"
@@ -0,0 +1,61 @@
+"""
+Caché negativa del login: un email registrado sale de la caché recién al
+confirmar la transacción, no en el flush.
+"""
+import uuid
+
+from app.auth.credenciales import buscar_credenciales, cache_negativa
+from app.database import SessionLocal
+from app.models.cliente_model import Cliente
+
+
+def _cliente(email: str) -> Cliente:
+    return Cliente(nombre="Cli", apellido="Prueba", email=email, password="-",
+                   telefono="1", direccion="Calle", coordenadas="-17.40,-66.17")
+
+
+def test_el_email_registrado_sale_de_la_cache_al_confirmar(db):
+    email = f"nuevo-{uuid.uuid4().hex[:10]}@pruebas.com"
+    assert buscar_credenciales(db, email) is None
+    assert cache_negativa.contiene(email)
+
+    db.add(_cliente(email))
+    db.flush()
+    # Un login concurrente entre el flush y el COMMIT no ve la fila y vuelve a cachear el email
+    otra = SessionLocal()
+    try:
+        assert buscar_credenciales(otra, email) is None
+    finally:
+        otra.close()
+    assert cache_negativa.contiene(email)
+
+    db.commit()
+    assert not cache_negativa.contiene(email)
+    assert buscar_credenciales(db, email).rol == "cliente"
+
+
+def test_un_savepoint_no_quita_el_email_y_el_rollback_descarta(db):
+    email = f"nuevo-{uuid.uuid4().hex[:10]}@pruebas.com"
+    cache_negativa.agregar(email)
+
+    with db.begin_nested():
+        db.add(_cliente(email))
+    assert cache_negativa.contiene(email)
+
+    db.rollback()
+    db.commit()
+    assert cache_negativa.contiene(email)
+
+
+def test_cambiar_el_email_lo_quita_al_confirmar(db):
+    cliente = _cliente(f"viejo-{uuid.uuid4().hex[:10]}@pruebas.com")
+    db.add(cliente)
+    db.commit()
+    nuevo = f"nuevo-{uuid.uuid4().hex[:10]}@pruebas.com"
+    cache_negativa.agregar(nuevo)
+
+    cliente.email = nuevo
+    db.flush()
+    assert cache_negativa.contiene(nuevo)
+    db.commit()
+    assert not cache_negativa.contiene(nuevo)
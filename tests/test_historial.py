@@ -0,0 +1,114 @@
+"""
+Historial de ubicaciones: simplificación con Douglas–Peucker, compactación
+de días cerrados y consulta del recorrido.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.geo.simplificacion import douglas_peucker, longitud_recorrido
+from app.models.historial_ubicacion_model import HistorialUbicacion, RecorridoCompactado
+from app.services import historial_service
+
+
+def test_douglas_peucker_quita_los_puntos_alineados():
+    recta = [(-17.39, -66.15 + i * 0.001) for i in range(11)]
+    assert douglas_peucker(recta, 5).tolist() == [0, 10]
+
+
+def test_douglas_peucker_conserva_los_desvios_mayores_a_la_tolerancia():
+    # El punto medio se aparta ~111 m de la recta
+    puntos = [(0.0, 0.0), (0.001, 0.005), (0.0, 0.01)]
+    assert douglas_peucker(puntos, 50).tolist() == [0, 1, 2]
+    assert douglas_peucker(puntos, 200).tolist() == [0, 2]
+
+
+def test_douglas_peucker_conserva_la_vuelta_de_un_trayecto_de_ida_y_vuelta():
+    # El punto más lejano está sobre la recta AB, pero fuera del segmento
+    ida_y_vuelta = [(0.0, 0.0), (0.0, 0.009), (0.0, 0.001)]
+    conservados = douglas_peucker(ida_y_vuelta, 15)
+    assert conservados.tolist() == [0, 1, 2]
+    assert longitud_recorrido([ida_y_vuelta[i] for i in conservados]) == pytest.approx(1.89, abs=0.01)
+
+
+def test_douglas_peucker_casos_borde():
+    assert douglas_peucker([], 10).tolist() == []
+    assert douglas_peucker([(0.0, 0.0), (0.0, 0.001)], 10).tolist() == [0, 1]
+    # Recorrido cerrado (A == B): distancia al punto
+    assert douglas_peucker([(0.0, 0.0), (0.0, 0.005), (0.0, 0.0)], 10).tolist() == [0, 1, 2]
+
+
+def _trayecto(inicio: datetime) -> list[tuple]:
+    """Ida por una recta (puntos alineados) y vuelta por el mismo camino, un punto por minuto."""
+    ida = [(-17.39, round(-66.15 + i * 0.001, 5)) for i in range(10)]
+    vuelta = list(reversed(ida))[1:]
+    return [(inicio + timedelta(minutes=m), lat, lon) for m, (lat, lon) in enumerate(ida + vuelta)]
+
+
+def test_compactar_y_consultar_el_recorrido(db, distribuidor, llamar_api):
+    dia = datetime.utcnow().date() - timedelta(days=historial_service.DIAS_DETALLE + 3)
+    inicio = datetime.combine(dia, datetime.min.time()) + timedelta(hours=9)
+    trayecto = _trayecto(inicio)
+    db.add_all([
+        HistorialUbicacion(distribuidor_id=distribuidor.id, registrado_en=t, latitud=lat, longitud=lon)
+        for t, lat, lon in trayecto
+    ])
+    db.commit()
+    km_originales = longitud_recorrido([(lat, lon) for _, lat, lon in trayecto])
+
+    resumen = historial_service.compactar(tolerancia_m=5)
+
+    assert resumen["puntos_originales"] >= len(trayecto)
+    assert db.query(HistorialUbicacion).filter_by(distribuidor_id=distribuidor.id).count() == 0
+    compactado = db.get(RecorridoCompactado, (distribuidor.id, dia))
+    assert compactado.puntos_originales == len(trayecto)
+    # Inicio, el extremo de la ida y el final
+    assert compactado.puntos == 3
+
+    # Ventana con zona horaria (como llega en la query string)
+    status, _, cuerpo = llamar_api(
+        "GET", f"/distribuidores/{distribuidor.id}/recorrido",
+        query=f"desde={dia.isoformat()}T00:00:00Z&hasta={dia.isoformat()}T23:59:59%2B00:00",
+    )
+    assert status == 200, cuerpo
+    assert cuerpo["cantidad_puntos"] == 3
+    assert cuerpo["distancia_km"] == pytest.approx(km_originales, abs=0.01)
+
+    # Una ventana que corta el día deja fuera los puntos compactados posteriores
+    recorte = historial_service.recorrido(
+        db, distribuidor.id,
+        datetime.fromisoformat(f"{dia.isoformat()}T05:00:00-04:00"),
+        datetime.fromisoformat(f"{dia.isoformat()}T05:05:00-04:00"),
+    )
+    assert recorte["cantidad_puntos"] == 1
+    assert recorte["desde"] == inicio
+
+
+def test_recorrido_combina_crudos_y_compactados_en_orden(db, distribuidor):
+    dia = datetime.utcnow().date() - timedelta(days=historial_service.DIAS_DETALLE + 5)
+    inicio = datetime.combine(dia, datetime.min.time()) + timedelta(hours=23)
+    db.add_all([
+        HistorialUbicacion(distribuidor_id=distribuidor.id, registrado_en=t, latitud=lat, longitud=lon)
+        for t, lat, lon in _trayecto(inicio)[:3]
+    ])
+    db.commit()
+    historial_service.compactar(tolerancia_m=5)
+
+    reciente = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    db.add(HistorialUbicacion(distribuidor_id=distribuidor.id, registrado_en=reciente, latitud=-17.4, longitud=-66.2))
+    db.commit()
+
+    resultado = historial_service.recorrido(db, distribuidor.id, inicio - timedelta(hours=1), datetime.utcnow())
+    tiempos = [p["registrado_en"] for p in resultado["puntos"]]
+    assert tiempos == sorted(tiempos)
+    assert tiempos[0] == inicio and tiempos[-1] == reciente
+
+
+def test_recorrido_valida_la_ventana(db, distribuidor):
+    ahora = datetime.utcnow()
+    with pytest.raises(ValueError):
+        historial_service.recorrido(db, distribuidor.id, ahora, ahora - timedelta(hours=1))
+    with pytest.raises(ValueError):
+        historial_service.recorrido(
+            db, distribuidor.id, ahora - timedelta(days=historial_service.VENTANA_MAXIMA_DIAS + 1), ahora
+        )
@@ -0,0 +1,48 @@
+"""
+Las consultas más usadas tienen que seguir usando sus índices: corre el
+chequeo de `benchmarks.explain_indices` sobre la BD de pruebas migrada, y
+comprueba que detecte un índice borrado.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from benchmarks.explain_indices import _casos, verificar
+
+# Casos cuyos índices se pueden borrar (el UNIQUE de pago.pedido_id no)
+CASOS_CON_INDICES = [
+    (nombre, indices) for nombre, _, indices in _casos() if all(i.startswith("ix_") for i in indices)
+]
+
+
+def _definicion_indice(conn, nombre: str) -> str:
+    if engine.dialect.name == "postgresql":
+        sql = "SELECT indexdef FROM pg_indexes WHERE indexname = :nombre"
+    else:
+        sql = "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :nombre"
+    definicion = conn.execute(text(sql), {"nombre": nombre}).scalar()
+    assert definicion, f"No existe el índice {nombre}"
+    return definicion
+
+
+def test_las_consultas_frecuentes_usan_sus_indices():
+    assert verificar() == []
+
+
+@pytest.mark.parametrize("nombre,indices", CASOS_CON_INDICES, ids=[nombre for nombre, _ in CASOS_CON_INDICES])
+def test_detecta_la_consulta_que_deja_de_usar_su_indice(nombre, indices):
+    with engine.connect() as conn:
+        definiciones = [_definicion_indice(conn, indice) for indice in indices]
+    with engine.begin() as conn:
+        for indice in indices:
+            conn.execute(text(f"DROP INDEX {indice}"))
+    # Conexiones nuevas: SQLite reusa los EXPLAIN ya preparados sin ver el cambio de esquema
+    engine.dispose()
+    try:
+        assert nombre in verificar()
+    finally:
+        with engine.begin() as conn:
+            for definicion in definiciones:
+                conn.execute(text(definicion))
+        engine.dispose()
+    assert verificar() == []
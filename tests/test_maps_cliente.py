@@ -0,0 +1,163 @@
+"""
+ClienteMaps contra un servidor HTTP local que responde lo que cada prueba
+le encola: reintentos, backoff, apertura del circuito y recuperación
+semiabierta.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import maps_cliente
+from app.services.maps_cliente import ClienteMaps
+
+
+class ServidorFalso:
+    """Responde en orden las (status, cuerpo) encoladas; sin respuestas encoladas, 500."""
+
+    def __init__(self):
+        self.respuestas = []
+        self.solicitudes = 0
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.solicitudes += 1
+                status, cuerpo = servidor.respuestas.pop(0) if servidor.respuestas else (500, {})
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}/maps/api/json"
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+@pytest.fixture
+def servidor():
+    falso = ServidorFalso()
+    yield falso
+    falso.cerrar()
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Registra los sleeps del backoff sin dormir; el jitter devuelve su máximo."""
+    registradas = []
+    monkeypatch.setattr(maps_cliente.time, "sleep", registradas.append)
+    monkeypatch.setattr(maps_cliente.random, "uniform", lambda a, b: b)
+    return registradas
+
+
+OK = (200, {"status": "OK", "rows": []})
+
+
+def _cliente(**opciones) -> ClienteMaps:
+    valores = dict(timeout=(1.0, 2.0), reintentos=2, backoff_s=0.1, circuito_fallos=2, circuito_espera_s=30.0)
+    valores.update(opciones)
+    return ClienteMaps(**valores)
+
+
+def test_reintenta_5xx_y_estados_transitorios_con_backoff_exponencial(servidor, esperas):
+    servidor.respuestas = [(503, {}), (200, {"status": "OVER_QUERY_LIMIT"}), OK]
+    cliente = _cliente()
+
+    assert cliente.get_json(servidor.url, {}) == OK[1]
+    assert servidor.solicitudes == 3
+    assert esperas == [pytest.approx(0.1), pytest.approx(0.2)]
+    assert not cliente.circuito.abierto
+
+
+def test_reintenta_429_y_errores_de_conexion(servidor, esperas):
+    servidor.respuestas = [(429, {}), OK]
+    assert _cliente().get_json(servidor.url, {}) == OK[1]
+    assert servidor.solicitudes == 2
+
+    # Puerto sin servidor: ConnectionError en cada intento
+    url_caida = servidor.url
+    servidor.cerrar()
+    cliente = _cliente(reintentos=1)
+    assert cliente.get_json(url_caida, {}) is None
+    assert len(esperas) == 2
+
+
+def test_4xx_no_se_reintenta_ni_cuenta_para_el_circuito(servidor, esperas):
+    servidor.respuestas = [(404, {})]
+    cliente = _cliente(circuito_fallos=1)
+
+    assert cliente.get_json(servidor.url, {}) is None
+    assert servidor.solicitudes == 1
+    assert esperas == []
+    assert not cliente.circuito.abierto
+
+
+def test_el_circuito_se_abre_tras_los_fallos_consecutivos(servidor, esperas):
+    cliente = _cliente(reintentos=1, circuito_fallos=2)
+
+    assert cliente.get_json(servidor.url, {}) is None
+    assert not cliente.circuito.abierto
+    assert cliente.get_json(servidor.url, {}) is None
+    assert cliente.circuito.abierto
+    assert servidor.solicitudes == 4
+
+    # Abierto: responde None sin tocar la red
+    servidor.respuestas = [OK]
+    assert cliente.get_json(servidor.url, {}) is None
+    assert servidor.solicitudes == 4
+
+
+def test_un_exito_intermedio_reinicia_el_conteo_de_fallos(servidor, esperas):
+    cliente = _cliente(reintentos=0, circuito_fallos=2)
+    servidor.respuestas = [(500, {}), OK, (500, {})]
+
+    cliente.get_json(servidor.url, {})
+    cliente.get_json(servidor.url, {})
+    cliente.get_json(servidor.url, {})
+    assert not cliente.circuito.abierto
+
+
+def test_semiabierto_deja_pasar_una_prueba_y_se_cierra_si_responde(servidor):
+    cliente = _cliente(reintentos=0, circuito_fallos=1, circuito_espera_s=0.2)
+    assert cliente.get_json(servidor.url, {}) is None
+    assert cliente.circuito.abierto
+
+    time.sleep(0.25)
+    # Pasada la espera sólo una llamada hace de prueba; las demás siguen rechazadas
+    assert cliente.circuito.permitir()
+    assert not cliente.circuito.permitir()
+
+    time.sleep(0.25)
+    servidor.respuestas = [OK]
+    assert cliente.get_json(servidor.url, {}) == OK[1]
+    assert not cliente.circuito.abierto
+
+    servidor.respuestas = [OK]
+    assert cliente.get_json(servidor.url, {}) == OK[1]
+    assert servidor.solicitudes == 3
+
+
+def test_semiabierto_vuelve_a_abrir_si_la_prueba_falla(servidor):
+    cliente = _cliente(reintentos=0, circuito_fallos=1, circuito_espera_s=0.2)
+    cliente.get_json(servidor.url, {})
+
+    time.sleep(0.25)
+    assert cliente.get_json(servidor.url, {}) is None
+    assert servidor.solicitudes == 2
+    assert cliente.circuito.abierto
+
+    servidor.respuestas = [OK]
+    assert cliente.get_json(servidor.url, {}) is None
+    assert servidor.solicitudes == 2
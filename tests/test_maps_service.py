@@ -0,0 +1,49 @@
+"""
+Costo de rutas por tramos: una solicitud Directions por cada
+TRAMOS_WAYPOINTS + 1 tramos, y estimación local sin API key.
+"""
+import numpy as np
+import pytest
+
+from app.services import maps_service
+
+
+def _puntos(n: int, desplazamiento: float = 0.0) -> list:
+    return [(-17.39 + i * 0.001 + desplazamiento, -66.15 + i * 0.001) for i in range(n)]
+
+
+@pytest.fixture
+def directions(monkeypatch):
+    """Reemplaza la llamada a Google: cada leg mide 1 km y 60 s; registra las solicitudes."""
+    solicitudes = []
+
+    def get_json(url, params):
+        solicitudes.append(params)
+        paradas = len(params["waypoints"].split("|")) if "waypoints" in params else 0
+        legs = [{"distance": {"value": 1000}, "duration": {"value": 60}}] * (paradas + 1)
+        return {"status": "OK", "routes": [{"legs": legs}]}
+
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "clave-de-prueba")
+    monkeypatch.setattr(maps_service.cliente_maps, "get_json", get_json)
+    monkeypatch.setattr(maps_service, "TRAMOS_WAYPOINTS", 3)
+    return solicitudes
+
+
+def test_obtener_tramos_agrupa_los_tramos_en_pocas_solicitudes(directions):
+    distancias, segundos = maps_service.obtener_tramos(_puntos(10))
+
+    # 9 tramos en trozos de 4: 3 solicitudes en lugar de 9
+    assert len(directions) == 3
+    assert [len(p.get("waypoints", "").split("|")) for p in directions] == [3, 3, 1]
+    assert distancias.tolist() == [1.0] * 9
+    assert segundos.tolist() == [60.0] * 9
+
+
+def test_obtener_tramos_sin_api_key_estima_en_segundos(monkeypatch):
+    monkeypatch.delenv("GOOGLE_MAPS_API_KEY", raising=False)
+    # Puntos que no están en la caché de la prueba anterior
+    distancias, segundos = maps_service.obtener_tramos(_puntos(4, desplazamiento=0.5))
+
+    assert distancias.shape == segundos.shape == (3,)
+    assert np.allclose(segundos, distancias * maps_service.MINUTOS_POR_KM * 60)
+    assert maps_service.obtener_tramos(_puntos(1))[0].shape == (0,)
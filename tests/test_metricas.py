@@ -0,0 +1,55 @@
+"""
+/metricas exige el token de operación (METRICAS_TOKEN) y el reinicio de
+los contadores del pool es un POST.
+"""
+import pytest
+
+from app.routes import metricas_routes
+
+TOKEN = "token-de-monitoreo"
+
+
+@pytest.fixture
+def token_metricas(monkeypatch):
+    monkeypatch.setattr(metricas_routes, "METRICAS_TOKEN", TOKEN)
+    return TOKEN
+
+
+@pytest.mark.parametrize("metodo,ruta", [
+    ("GET", "/metricas"), ("GET", "/metricas/pool"), ("POST", "/metricas/pool/reiniciar"),
+])
+def test_las_metricas_exigen_el_token(llamar_api, token_metricas, metodo, ruta):
+    status, _, _ = llamar_api(metodo, ruta)
+    assert status in (401, 403)
+    status, _, _ = llamar_api(metodo, ruta, token="otro-token")
+    assert status == 401
+    status, _, _ = llamar_api(metodo, ruta, token=token_metricas)
+    assert status == 200
+
+
+def test_sin_token_configurado_las_metricas_estan_cerradas(llamar_api, monkeypatch):
+    monkeypatch.setattr(metricas_routes, "METRICAS_TOKEN", "")
+    status, _, _ = llamar_api("GET", "/metricas", token="")
+    assert status in (401, 403)
+    status, _, _ = llamar_api("GET", "/metricas", token="cualquiera")
+    assert status == 403
+
+
+def test_get_no_reinicia_y_post_si(llamar_api, token_metricas, db):
+    # Al menos un checkout registrado en el pool síncrono
+    db.connection()
+    db.close()
+
+    _, _, antes = llamar_api("GET", "/metricas/pool", token=token_metricas, query="reiniciar=true")
+    assert antes["sync"]["checkouts"] > 0
+    _, _, despues = llamar_api("GET", "/metricas/pool", token=token_metricas)
+    assert despues["sync"]["checkouts"] >= antes["sync"]["checkouts"]
+
+    status, _, reiniciadas = llamar_api("POST", "/metricas/pool/reiniciar", token=token_metricas)
+    assert status == 200
+    assert reiniciadas["sync"]["checkouts"] >= antes["sync"]["checkouts"]
+    _, _, nuevas = llamar_api("GET", "/metricas/pool", token=token_metricas)
+    assert nuevas["sync"]["checkouts"] == 0
+
+    status, _, _ = llamar_api("GET", "/metricas/pool/reiniciar", token=token_metricas)
+    assert status == 405
@@ -0,0 +1,53 @@
+"""
+Migraciones que dependen de los datos existentes, sobre una BD SQLite
+propia con tablas como las de una instalación anterior.
+"""
+import importlib
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+
+@pytest.fixture
+def engine_legado(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legado.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE cliente (id INTEGER PRIMARY KEY, email VARCHAR(100))"))
+    yield engine
+    engine.dispose()
+
+
+def _indices(engine) -> set:
+    return {i["name"] for i in inspect(engine).get_indexes("cliente")}
+
+
+def test_email_unico_falla_con_la_lista_de_duplicados(engine_legado):
+    v006 = importlib.import_module("app.migraciones.versiones.v006_email_cliente_unico")
+    with engine_legado.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO cliente (email) VALUES ('a@x.com'), ('a@x.com'), ('b@x.com'), "
+            "('c@x.com'), ('c@x.com'), ('c@x.com')"
+        ))
+
+    with pytest.raises(RuntimeError) as error:
+        with engine_legado.begin() as conn:
+            v006.aplicar(conn)
+
+    mensaje = str(error.value)
+    assert "2 email(s)" in mensaje
+    assert "a@x.com (2 clientes)" in mensaje and "c@x.com (3 clientes)" in mensaje
+    assert "b@x.com" not in mensaje
+    assert "ix_cliente_email" not in _indices(engine_legado)
+
+
+def test_email_unico_crea_el_indice_sin_duplicados(engine_legado):
+    v006 = importlib.import_module("app.migraciones.versiones.v006_email_cliente_unico")
+    with engine_legado.begin() as conn:
+        conn.execute(text("INSERT INTO cliente (email) VALUES ('a@x.com'), ('b@x.com')"))
+        v006.aplicar(conn)
+
+    assert "ix_cliente_email" in _indices(engine_legado)
+    with pytest.raises(IntegrityError):
+        with engine_legado.begin() as conn:
+            conn.execute(text("INSERT INTO cliente (email) VALUES ('a@x.com')"))
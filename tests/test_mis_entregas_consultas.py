@@ -0,0 +1,103 @@
+"""
+GET /entregas/mis-entregas tiene que hacer un número fijo de consultas,
+sin importar cuántas asignaciones, entregas o líneas de pedido devuelva
+(sin N+1 al serializar).
+"""
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.auth.jwt_utils import crear_token
+from app.database import engine
+from app.models.asignacion_model import AsignacionEntrega, PedidoAsignado
+from app.models.cliente_model import Cliente
+from app.models.distribuidor_model import Distribuidor
+from app.models.pedido_model import DetallePedido, Pedido
+from app.models.producto_model import Producto
+from app.models.ruta_entrega_model import Entrega, RutaEntrega
+from app.models.tienda_model import Tienda
+
+
+@contextmanager
+def contar_consultas():
+    sentencias = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+def _sufijo() -> str:
+    return uuid.uuid4().hex[:10]
+
+
+def _crear_distribuidor(db) -> Distribuidor:
+    distribuidor = Distribuidor(
+        nombre="Dist", apellido="Prueba", carnet=_sufijo(), telefono="70000000",
+        email=f"dist-{_sufijo()}@pruebas.com", licencia="B", password="-",
+        latitud=-17.39, longitud=-66.16,
+    )
+    db.add_all([
+        distribuidor,
+        Tienda(nombre="Tienda", direccion="Centro", latitud=-17.39, longitud=-66.15),
+    ])
+    db.commit()
+    return distribuidor
+
+
+def _agregar_asignaciones(db, distribuidor: Distribuidor, cantidad: int, entregas_por_ruta: int = 3):
+    """Asignaciones con ruta, entregas, clientes, pedidos y dos líneas por pedido."""
+    producto = Producto(nombre="Zapato", precio=100, stock=10)
+    db.add(producto)
+    for _ in range(cantidad):
+        ruta = RutaEntrega(coordenadas_inicio="-17.39,-66.15", coordenadas_fin="-17.40,-66.17",
+                           distancia=3.5, tiempo_estimado="9 mins")
+        asignacion = AsignacionEntrega(id_distribuidor=distribuidor.id, ruta=ruta, estado="aceptada")
+        db.add_all([ruta, asignacion])
+        db.flush()
+        for orden in range(1, entregas_por_ruta + 1):
+            cliente = Cliente(nombre="Cli", apellido="Prueba", email=f"cli-{_sufijo()}@pruebas.com",
+                              password="-", telefono="1", direccion="Calle", coordenadas="-17.40,-66.17")
+            db.add(cliente)
+            db.flush()
+            pedido = Pedido(cliente_id=cliente.id, estado="asignado", total=200)
+            db.add(pedido)
+            db.flush()
+            db.add_all([
+                DetallePedido(pedido_id=pedido.id, producto_id=producto.id, cantidad=1),
+                DetallePedido(pedido_id=pedido.id, producto_id=producto.id, cantidad=2),
+                PedidoAsignado(pedido_id=pedido.id, asignacion_id=asignacion.id),
+                Entrega(ruta_id=ruta.ruta_id, asignacion_id=asignacion.id, cliente_id=cliente.id,
+                        pedido_id=pedido.id, orden_entrega=orden, estado="pendiente",
+                        coordenadas_fin="-17.40,-66.17"),
+            ])
+    db.commit()
+
+
+def test_mis_entregas_hace_las_mismas_consultas_con_mas_asignaciones(db, llamar_api):
+    distribuidor = _crear_distribuidor(db)
+    token = crear_token({"sub": distribuidor.email, "role": "distribuidor"})
+
+    def consultas_de_mis_entregas():
+        with contar_consultas() as sentencias:
+            status, _, cuerpo = llamar_api("GET", "/entregas/mis-entregas", token=token, query="limite=100")
+        assert status == 200, cuerpo
+        return len(sentencias), cuerpo
+
+    _agregar_asignaciones(db, distribuidor, 2)
+    consultas_de_mis_entregas()  # el distribuidor queda en la caché de autenticados
+    pocas, cuerpo = consultas_de_mis_entregas()
+    assert len(cuerpo) == 2
+
+    _agregar_asignaciones(db, distribuidor, 10, entregas_por_ruta=5)
+    muchas, cuerpo = consultas_de_mis_entregas()
+    assert len(cuerpo) == 12
+    assert sum(len(a["ruta"]["entregas"]) for a in cuerpo) == 2 * 3 + 10 * 5
+
+    assert muchas == pocas
@@ -0,0 +1,69 @@
+"""
+Paginación por cursor: recorre todas las filas sin repetir ni saltear, con
+empates en la columna de orden; las columnas de orden no admiten NULL.
+"""
+import importlib
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from app.models.cliente_model import Cliente
+from app.models.pedido_model import Pedido
+from app.services.paginacion_service import paginar
+
+
+def _cliente(db) -> Cliente:
+    cliente = Cliente(nombre="Cli", apellido="Prueba", email=f"cli-{uuid.uuid4().hex[:10]}@pruebas.com",
+                      password="-", telefono="1", direccion="Calle", coordenadas="-17.40,-66.17")
+    db.add(cliente)
+    db.flush()
+    return cliente
+
+
+def test_recorre_todas_las_paginas_con_fechas_repetidas(db):
+    cliente = _cliente(db)
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    # Grupos de tres pedidos con la misma fecha: el id desempata
+    pedidos = [Pedido(cliente_id=cliente.id, fecha_pedido=base - timedelta(minutes=i // 3)) for i in range(11)]
+    db.add_all(pedidos)
+    db.commit()
+
+    vistos, cursor = [], None
+    while True:
+        consulta = db.query(Pedido).filter(Pedido.cliente_id == cliente.id)
+        pagina, cursor = paginar(db, consulta, Pedido.id, Pedido.fecha_pedido, cursor, limite=4)
+        vistos.extend(pagina)
+        if cursor is None:
+            break
+
+    assert len(vistos) == 11
+    assert {p.id for p in vistos} == {p.id for p in pedidos}
+    claves = [(p.fecha_pedido, p.id) for p in vistos]
+    assert claves == sorted(claves, reverse=True)
+
+
+def test_las_columnas_de_orden_no_admiten_null(db):
+    cliente = _cliente(db)
+    db.add(Pedido(cliente_id=cliente.id))
+    db.flush()
+    with pytest.raises(IntegrityError):
+        db.execute(text("UPDATE pedido SET fecha_pedido = NULL WHERE cliente_id = :c"), {"c": cliente.id.hex})
+    db.rollback()
+
+
+def test_migracion_rellena_las_fechas_nulas(tmp_path):
+    migracion = importlib.import_module("app.migraciones.versiones.v011_fechas_orden_no_nulas")
+    engine = create_engine(f"sqlite:///{tmp_path / 'legado.db'}")
+    with engine.begin() as conn:
+        for tabla, columna in migracion.COLUMNAS:
+            conn.execute(text(f"CREATE TABLE {tabla} (id INTEGER PRIMARY KEY, {columna} TIMESTAMP)"))
+            conn.execute(text(f"INSERT INTO {tabla} ({columna}) VALUES (NULL), ('2024-05-01 12:00:00')"))
+        migracion.aplicar(conn)
+    with engine.connect() as conn:
+        for tabla, columna in migracion.COLUMNAS:
+            fechas = conn.execute(text(f"SELECT {columna} FROM {tabla} ORDER BY id")).scalars().all()
+            assert fechas == ["1970-01-01 00:00:00", "2024-05-01 12:00:00"]
+    engine.dispose()
@@ -0,0 +1,143 @@
+"""
+Enrutamiento de SesionEnrutada con dos archivos SQLite: uno hace de
+primaria y el otro de réplica (con datos distintos, como una réplica
+atrasada), así se ve a qué servidor fue cada lectura.
+"""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from app.database import EnrutadorReplicas, SesionEnrutada
+from app.models.producto_model import Producto
+
+ID_COMUN = uuid.uuid4()
+
+
+def _preparar(url: str, nombre: str):
+    motor = create_engine(url)
+    Producto.__table__.create(motor)
+    with motor.begin() as conn:
+        conn.execute(Producto.__table__.insert().values(id=ID_COMUN, nombre=nombre, precio=1, stock=1))
+    return motor
+
+
+@pytest.fixture
+def servidores(tmp_path):
+    primaria = _preparar(f"sqlite:///{tmp_path / 'primaria.db'}", "en la primaria")
+    _preparar(f"sqlite:///{tmp_path / 'replica.db'}", "en la réplica").dispose()
+    enrutador = EnrutadorReplicas([f"sqlite:///{tmp_path / 'replica.db'}"])
+    yield primaria, enrutador
+    asyncio.run(enrutador.cerrar())
+    primaria.dispose()
+
+
+def _sesion(servidores) -> SesionEnrutada:
+    primaria, enrutador = servidores
+    return SesionEnrutada(bind=primaria, enrutador=enrutador)
+
+
+def _nombre(sesion, producto_id=ID_COMUN):
+    return sesion.scalar(select(Producto.nombre).where(Producto.id == producto_id))
+
+
+def test_las_lecturas_van_a_la_replica(servidores):
+    with _sesion(servidores) as sesion:
+        assert _nombre(sesion) == "en la réplica"
+        assert sesion.get(Producto, ID_COMUN).nombre == "en la réplica"
+        assert not sesion.escribio
+
+
+def test_el_flush_escribe_en_la_primaria_y_luego_todo_lee_de_ella(servidores):
+    primaria, enrutador = servidores
+    with _sesion(servidores) as sesion:
+        assert _nombre(sesion) == "en la réplica"
+        nuevo = Producto(nombre="nuevo", precio=2, stock=2)
+        sesion.add(nuevo)
+        sesion.flush()
+
+        assert sesion.escribio
+        # La lectura siguiente, dentro de la misma transacción, ve la fila sin confirmar
+        assert _nombre(sesion, nuevo.id) == "nuevo"
+        assert _nombre(sesion) == "en la primaria"
+        sesion.rollback()
+
+    with primaria.connect() as conn:
+        assert conn.scalar(select(Producto.id).where(Producto.id == nuevo.id)) is None
+    with enrutador.replicas[0].engine.connect() as conn:
+        assert conn.scalar(select(Producto.id).where(Producto.id == nuevo.id)) is None
+
+
+def test_lee_lo_que_escribio_despues_del_commit(servidores):
+    primaria, enrutador = servidores
+    with _sesion(servidores) as sesion:
+        nuevo = Producto(nombre="confirmado", precio=3, stock=3)
+        sesion.add(nuevo)
+        sesion.commit()
+
+        # La réplica todavía no lo tiene: la sesión tiene que seguir en la primaria
+        assert nuevo.nombre == "confirmado"
+        assert _nombre(sesion, nuevo.id) == "confirmado"
+        assert _nombre(sesion) == "en la primaria"
+
+    with enrutador.replicas[0].engine.connect() as conn:
+        assert conn.scalar(select(Producto.id).where(Producto.id == nuevo.id)) is None
+
+
+def test_sql_de_texto_y_for_update_van_a_la_primaria(servidores):
+    with _sesion(servidores) as sesion:
+        assert sesion.scalar(text("SELECT count(*) FROM producto")) == 1
+        assert sesion.escribio
+        assert _nombre(sesion) == "en la primaria"
+
+    with _sesion(servidores) as sesion:
+        consulta = select(Producto.nombre).where(Producto.id == ID_COMUN).with_for_update()
+        assert sesion.scalar(consulta) == "en la primaria"
+
+
+def test_sin_replicas_sanas_lee_de_la_primaria(servidores):
+    _, enrutador = servidores
+    replica = enrutador.replicas[0]
+
+    with _sesion(servidores) as sesion:
+        assert _nombre(sesion) == "en la réplica"
+        replica._marcar(False, "caída")
+        # La réplica elegida salió de rotación a mitad de la sesión
+        assert _nombre(sesion) == "en la primaria"
+
+    replica._marcar(True)
+    with _sesion(servidores) as sesion:
+        assert _nombre(sesion) == "en la réplica"
+
+
+def test_una_replica_inaccesible_queda_fuera_de_rotacion(servidores, tmp_path):
+    primaria, _ = servidores
+    enrutador = EnrutadorReplicas([f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}"])
+    try:
+        enrutador.verificar()
+        assert not enrutador.replicas[0].sana
+        assert enrutador.elegir() is None
+        with SesionEnrutada(bind=primaria, enrutador=enrutador) as sesion:
+            assert _nombre(sesion) == "en la primaria"
+    finally:
+        asyncio.run(enrutador.cerrar())
+
+
+def test_la_sesion_async_usa_la_misma_politica(servidores, tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from app.database import SesionEnrutadaAsync
+
+    _, enrutador = servidores
+    primaria = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primaria.db'}")
+
+    async def probar():
+        async with AsyncSession(primaria, sync_session_class=SesionEnrutadaAsync, enrutador=enrutador) as sesion:
+            assert await sesion.scalar(select(Producto.nombre).where(Producto.id == ID_COMUN)) == "en la réplica"
+            sesion.add(Producto(nombre="async", precio=1, stock=1))
+            await sesion.commit()
+            assert await sesion.scalar(select(Producto.nombre).where(Producto.id == ID_COMUN)) == "en la primaria"
+        await primaria.dispose()
+
+    asyncio.run(probar())
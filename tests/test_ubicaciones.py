@@ -0,0 +1,97 @@
+"""
+Ingesta de posiciones GPS: POST /distribuidores/ubicaciones y el vaciado
+del buffer a la BD.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models.distribuidor_model import Distribuidor
+from app.models.historial_ubicacion_model import HistorialUbicacion
+from app.services.ubicacion_service import BufferUbicaciones, buffer_ubicaciones
+
+
+def _posicion_guardada(db, distribuidor_id):
+    db.expire_all()
+    d = db.get(Distribuidor, distribuidor_id)
+    return d.latitud, d.longitud, d.ubicacion_actualizada_en
+
+
+def _historial(db, distribuidor_id) -> int:
+    return db.scalar(select(func.count()).where(HistorialUbicacion.distribuidor_id == distribuidor_id))
+
+
+def test_vaciar_guarda_la_ultima_posicion_y_el_historial(db, distribuidor):
+    buffer = BufferUbicaciones(guardar_historial=True)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    buffer.agregar([
+        (distribuidor.id, -17.30, -66.10, ahora - timedelta(seconds=20)),
+        (distribuidor.id, -17.31, -66.11, ahora),
+        (distribuidor.id, -17.32, -66.12, ahora - timedelta(seconds=10)),
+    ])
+
+    assert buffer.vaciar() == 1
+    assert buffer.pendientes() == 0
+    assert _posicion_guardada(db, distribuidor.id) == (-17.31, -66.11, ahora)
+    assert _historial(db, distribuidor.id) == 3
+    assert buffer.estadisticas["filas_actualizadas"] == 1
+    assert buffer.estadisticas["historial_insertadas"] == 3
+
+
+def test_vaciar_no_pisa_una_posicion_mas_nueva(db, distribuidor):
+    ahora = datetime.utcnow().replace(microsecond=0)
+    distribuidor.latitud, distribuidor.longitud = -17.40, -66.20
+    distribuidor.ubicacion_actualizada_en = ahora
+    db.commit()
+
+    buffer = BufferUbicaciones(guardar_historial=False)
+    buffer.agregar([(distribuidor.id, -17.30, -66.10, ahora - timedelta(minutes=1))])
+
+    assert buffer.vaciar() == 0
+    assert buffer.pendientes() == 0
+    assert _posicion_guardada(db, distribuidor.id) == (-17.40, -66.20, ahora)
+
+
+def test_vaciar_actualiza_varios_distribuidores(db, distribuidor):
+    otro = Distribuidor(
+        nombre="Otro", apellido="Prueba", carnet=uuid.uuid4().hex[:10], telefono="1",
+        email=f"otro-{uuid.uuid4().hex[:10]}@pruebas.com", licencia="B", password="-",
+    )
+    db.add(otro)
+    db.commit()
+    ahora = datetime.utcnow().replace(microsecond=0)
+
+    buffer = BufferUbicaciones(guardar_historial=False)
+    buffer.agregar([(distribuidor.id, -17.1, -66.1, ahora), (otro.id, -17.2, -66.2, ahora)])
+
+    assert buffer.vaciar() == 2
+    assert _posicion_guardada(db, distribuidor.id)[:2] == (-17.1, -66.1)
+    assert _posicion_guardada(db, otro.id)[:2] == (-17.2, -66.2)
+
+
+def test_post_ubicaciones_encola_las_validas_y_el_vaciado_las_guarda(db, distribuidor, llamar_api):
+    ahora = datetime.utcnow().replace(microsecond=0)
+    cuerpo = {"ubicaciones": [
+        {"latitud": -17.35, "longitud": -66.15, "registrado_en": (ahora - timedelta(seconds=5)).isoformat()},
+        {"latitud": -17.36, "longitud": -66.16, "registrado_en": ahora.isoformat() + "Z"},
+        # Otro distribuidor, demasiado antigua y demasiado adelantada: rechazadas
+        {"distribuidor_id": str(uuid.uuid4()), "latitud": -17.0, "longitud": -66.0},
+        {"latitud": -17.0, "longitud": -66.0, "registrado_en": (ahora - timedelta(days=2)).isoformat()},
+        {"latitud": -17.0, "longitud": -66.0, "registrado_en": (ahora + timedelta(hours=1)).isoformat()},
+    ]}
+
+    status, _, respuesta = llamar_api("POST", "/distribuidores/ubicaciones", token=distribuidor.token, cuerpo=cuerpo)
+
+    assert status == 202, respuesta
+    assert respuesta == {"aceptadas": 2, "rechazadas": 3, "distribuidores": 1}
+    buffer_ubicaciones.vaciar()
+    latitud, longitud, actualizada_en = _posicion_guardada(db, distribuidor.id)
+    assert (latitud, longitud) == (-17.36, -66.16)
+    assert actualizada_en == ahora
+
+
+def test_post_ubicaciones_exige_token_de_distribuidor(llamar_api):
+    cuerpo = {"ubicaciones": [{"latitud": -17.35, "longitud": -66.15}]}
+    status, _, _ = llamar_api("POST", "/distribuidores/ubicaciones", cuerpo=cuerpo)
+    assert status in (401, 403)